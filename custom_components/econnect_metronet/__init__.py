@@ -2,18 +2,20 @@
 
 import asyncio
 import logging
+from datetime import timedelta
 from functools import partial
 
 import voluptuous as vol
-from elmo.api.client import ElmoClient
 from elmo.systems import ELMO_E_CONNECT as E_CONNECT_DEFAULT
 from homeassistant.config_entries import ConfigEntry, ConfigType
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, SupportsResponse
 
 from . import services
 from .const import (
     CONF_DOMAIN,
     CONF_EXPERIMENTAL,
+    CONF_MANAGE_SECTORS,
+    CONF_RECORD_TRAFFIC,
     CONF_SCAN_INTERVAL,
     CONF_SYSTEM_URL,
     DOMAIN,
@@ -24,6 +26,13 @@ from .const import (
 )
 from .coordinator import AlarmCoordinator
 from .devices import AlarmDevice
+from .helpers import (
+    flow_device_key,
+    flow_devices,
+    poll_scheduler,
+    sector_index,
+    shared_connections,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -80,7 +89,43 @@ async def async_setup(hass: HomeAssistant, config: ConfigType):
     Use YAML configurations only to expose experimental settings, otherwise use
     the configuration flow.
     """
-    hass.data[DOMAIN] = config.get(DOMAIN, {})
+    # Keep devices connected by a config flow that run before the integration setup
+    hass.data[DOMAIN] = {**hass.data.get(DOMAIN, {}), **config.get(DOMAIN, {})}
+
+    # Register e-Connect services once for all entries: each call selects the alarm panel
+    # from its data (sectors entities or `config_entry_id`)
+    hass.services.async_register(DOMAIN, "arm_sectors", partial(services.arm_sectors, hass))
+    hass.services.async_register(DOMAIN, "disarm_sectors", partial(services.disarm_sectors, hass))
+    hass.services.async_register(
+        DOMAIN, "update_state", partial(services.update_state, hass), schema=services.ENTRY_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_history",
+        partial(services.get_history, hass),
+        schema=services.GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "run_sequence",
+        partial(services.run_sequence, hass),
+        schema=services.RUN_SEQUENCE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "profile",
+        partial(services.profile, hass),
+        schema=services.PROFILE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    # Export metrics of all config entries for Prometheus (the HTTP server is not available in tests)
+    if hass.http is not None:
+        from .views import MetricsView
+
+        hass.http.register_view(MetricsView())
     return True
 
 
@@ -107,11 +152,30 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     experimental = hass.data[DOMAIN].get(CONF_EXPERIMENTAL, {})
 
     # Initialize Components
+    # NOTE: the client is imported here to keep the integration import (done during bootstrap) lightweight
+    from elmo.api.client import ElmoClient
+
     scan_interval = config.options.get(CONF_SCAN_INTERVAL, SCAN_INTERVAL_DEFAULT)
-    client = ElmoClient(config.data[CONF_SYSTEM_URL], config.data[CONF_DOMAIN])
-    device = AlarmDevice(client, {**config.options, **experimental})
+    device = flow_devices(hass).pop(flow_device_key(config.data), None)
+    if device is None:
+        client = shared_connections(hass, ElmoClient(config.data[CONF_SYSTEM_URL], config.data[CONF_DOMAIN]))
+        if experimental.get(CONF_RECORD_TRAFFIC):
+            # Store the (redacted) traffic to reproduce performance issues offline with `TrafficReplay`
+            from .traffic import TrafficRecorder
+
+            path = hass.config.path(f"{DOMAIN}_traffic_{config.entry_id}.jsonl")
+            _LOGGER.warning(f"Recording e-Connect traffic in {path}")
+            client = TrafficRecorder(client, path)
+        device = AlarmDevice(client, {**config.options, **experimental})
+
     coordinator = AlarmCoordinator(hass, device, scan_interval)
-    await coordinator.async_config_entry_first_refresh()
+    poll_scheduler(hass).register(config.entry_id)
+    if device.connected:
+        # The config flow already authenticated and fetched the inventory while validating the credentials
+        _LOGGER.debug("Setup | Reusing the session and the inventory of the config flow")
+        coordinator.async_set_updated_data(device._inventory)
+    else:
+        await coordinator.async_config_entry_first_refresh()
 
     # Store an AlarmDevice instance to access the cloud service.
     # It includes a DataUpdateCoordinator shared across entities to get a full
@@ -125,13 +189,6 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     unsub = config.add_update_listener(options_update_listener)
     hass.data[DOMAIN][config.entry_id][KEY_UNSUBSCRIBER] = unsub
 
-    # Register e-Connect services
-    # We use a `partial` function to pass the `hass` and `config.entry_id` arguments
-    # as we need both to access the integration configurations.
-    hass.services.async_register(DOMAIN, "arm_sectors", partial(services.arm_sectors, hass, config.entry_id))
-    hass.services.async_register(DOMAIN, "disarm_sectors", partial(services.disarm_sectors, hass, config.entry_id))
-    hass.services.async_register(DOMAIN, "update_state", partial(services.update_state, hass, config.entry_id))
-
     await hass.config_entries.async_forward_entry_setups(config, PLATFORMS)
 
     return True
@@ -149,9 +206,38 @@ async def async_unload_entry(hass: HomeAssistant, config: ConfigEntry):
         hass.data[DOMAIN][config.entry_id][KEY_UNSUBSCRIBER]()
         hass.data[DOMAIN].pop(config.entry_id)
 
+        poll_scheduler(hass).unregister(config.entry_id)
+
+        # Remove sectors of this entry from the index shared by all entries
+        index = sector_index(hass)
+        for object_id in [k for k, (entry_id, _) in index.items() if entry_id == config.entry_id]:
+            del index[object_id]
+
     return unload_ok
 
 
 async def options_update_listener(hass: HomeAssistant, config: ConfigEntry):
-    """Handle options update."""
-    await hass.config_entries.async_reload(config.entry_id)
+    """Handle options update.
+
+    Options that don't change the entity set (arm profiles, scan interval, refresh policies, input debounce and
+    stale-state TTL) are applied to the running device and coordinator. Only a change of managed sectors reloads
+    the integration.
+    """
+    experimental = hass.data[DOMAIN].get(CONF_EXPERIMENTAL, {})
+    options = {**config.options, **experimental}
+    device = hass.data[DOMAIN][config.entry_id][KEY_DEVICE]
+    coordinator = hass.data[DOMAIN][config.entry_id][KEY_COORDINATOR]
+
+    if (options.get(CONF_MANAGE_SECTORS) or []) != device._managed_sectors:
+        _LOGGER.debug("Setup | Managed sectors changed, reloading the integration")
+        await hass.config_entries.async_reload(config.entry_id)
+        return
+
+    device.set_arm_profiles(options)
+    device.set_refresh_policies(options)
+    device.set_input_filter(options)
+    device.set_stale_ttl(options)
+    scan_interval = config.options.get(CONF_SCAN_INTERVAL, SCAN_INTERVAL_DEFAULT)
+    coordinator.update_interval = timedelta(seconds=scan_interval)
+    coordinator.async_update_listeners()
+    _LOGGER.debug("Setup | Options applied without reloading the integration")
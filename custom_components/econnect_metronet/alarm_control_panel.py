@@ -2,6 +2,7 @@
 
 import logging
 
+from elmo import query as q
 from homeassistant.components.alarm_control_panel import (
     AlarmControlPanelEntity,
     AlarmControlPanelState,
@@ -17,7 +18,7 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import CONF_SYSTEM_NAME, DOMAIN, KEY_COORDINATOR, KEY_DEVICE
 from .decorators import retry_refresh_token, set_device_state
-from .helpers import generate_entity_id
+from .helpers import StaleStateMixin, generate_entity_id
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -39,9 +40,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_d
     )
 
 
-class EconnectAlarm(CoordinatorEntity, AlarmControlPanelEntity):
+class EconnectAlarm(StaleStateMixin, CoordinatorEntity, AlarmControlPanelEntity):
     """E-connect alarm entity."""
 
+    stale_query = q.SECTORS
     _attr_has_entity_name = True
 
     def __init__(self, unique_id, config, device, coordinator):
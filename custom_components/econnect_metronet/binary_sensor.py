@@ -1,5 +1,7 @@
 """Module for e-connect binary sensors (sectors, inputs and alert)."""
 
+from typing import cast
+
 from elmo import query as q
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
@@ -14,15 +16,13 @@ from homeassistant.helpers.update_coordinator import (
 )
 
 from .const import (
-    CONF_EXPERIMENTAL,
-    CONF_FORCE_UPDATE,
     DEVICE_CLASS_SECTORS,
     DOMAIN,
     KEY_COORDINATOR,
     KEY_DEVICE,
 )
 from .devices import AlarmDevice
-from .helpers import generate_entity_id
+from .helpers import EntityFactory, StaleStateMixin, sector_index
 
 
 async def async_setup_entry(
@@ -33,38 +33,35 @@ async def async_setup_entry(
     """Set up e-connect binary sensors from a config entry."""
     device = hass.data[DOMAIN][entry.entry_id][KEY_DEVICE]
     coordinator = hass.data[DOMAIN][entry.entry_id][KEY_COORDINATOR]
+    factory = EntityFactory(entry, coordinator, device)
     # Load all entities and register sectors and inputs
 
     sensors = []
 
-    # Iterate through the sectors of the provided device and create InputBinarySensor objects
-    for sector_id, name in device.sectors:
-        unique_id = f"{entry.entry_id}_{DOMAIN}_{q.SECTORS}_{sector_id}"
-        sensors.append(SectorBinarySensor(unique_id, sector_id, entry, name, coordinator, device))
-
-    # Iterate through the inputs of the provided device and create InputBinarySensor objects
-    for input_id, name in device.inputs:
-        unique_id = f"{entry.entry_id}_{DOMAIN}_{q.INPUTS}_{input_id}"
-        sensors.append(InputBinarySensor(unique_id, input_id, entry, name, coordinator, device))
+    # Create SectorBinarySensor and InputBinarySensor objects for the sectors and inputs of the provided device
+    sensors.extend(factory.create(SectorBinarySensor, device.sectors, q.SECTORS))
+    sensors.extend(factory.create(InputBinarySensor, device.inputs, q.INPUTS))
 
-    # Iterate through the alerts of the provided device and create AlertBinarySensor objects
+    # Create AlertBinarySensor objects for the alerts of the provided device
     # except for alarm_led, inputs_led and tamper_led as they have three states
-    for alert_id, name in device.alerts:
-        if name not in ["alarm_led", "inputs_led", "tamper_led"]:
-            unique_id = f"{entry.entry_id}_{DOMAIN}_{name}"
-            sensors.append(AlertBinarySensor(unique_id, alert_id, entry, name, coordinator, device))
+    alerts = [
+        (alert_id, name) for alert_id, name in device.alerts if name not in ["alarm_led", "inputs_led", "tamper_led"]
+    ]
+    sensors.extend(factory.create(AlertBinarySensor, alerts))
 
     # Binary sensor to keep track of the device connection status
-    unique_id = f"{entry.entry_id}_{DOMAIN}_connection_status"
-    sensors.append(AlertBinarySensor(unique_id, -1, entry, "connection_status", coordinator, device))
+    sensors.extend(factory.create(AlertBinarySensor, [(-1, "connection_status")]))
 
     async_add_entities(sensors)
 
 
-class AlertBinarySensor(CoordinatorEntity, BinarySensorEntity):
+class AlertBinarySensor(StaleStateMixin, CoordinatorEntity, BinarySensorEntity):
     """Representation of a e-Connect alert binary sensor"""
 
+    stale_query = q.ALERTS
     _attr_has_entity_name = True
+    _attr_icon = "hass:alarm-light"
+    _attr_device_class = BinarySensorDeviceClass.PROBLEM
 
     def __init__(
         self,
@@ -74,38 +71,21 @@ class AlertBinarySensor(CoordinatorEntity, BinarySensorEntity):
         name: str,
         coordinator: DataUpdateCoordinator,
         device: AlarmDevice,
+        factory: EntityFactory,
     ) -> None:
         """Construct."""
-        # Enable experimental settings from the configuration file
-        experimental = coordinator.hass.data[DOMAIN].get(CONF_EXPERIMENTAL, {})
-        self._attr_force_update = experimental.get(CONF_FORCE_UPDATE, False)
+        self._attr_force_update = factory.force_update
 
         super().__init__(coordinator)
-        self.entity_id = generate_entity_id(config, name)
+        self.entity_id = factory.entity_id(name)
         self._name = name
         self._device = device
-        self._unique_id = unique_id
+        self._attr_unique_id = unique_id
         self._alert_id = alert_id
-
-    @property
-    def unique_id(self) -> str:
-        """Return the unique identifier."""
-        return self._unique_id
-
-    @property
-    def translation_key(self) -> str:
-        """Return the translation key to translate the entity's name and states."""
-        return self._name
-
-    @property
-    def icon(self) -> str:
-        """Return the icon used by this entity."""
-        return "hass:alarm-light"
-
-    @property
-    def device_class(self) -> str:
-        """Return the device class."""
-        return BinarySensorDeviceClass.PROBLEM
+        self._attr_translation_key = name
+        if alert_id == -1:
+            # The connection status is not reported by the backend, so it's available while data is stale
+            self.stale_query = None
 
     @property
     def is_on(self) -> bool:
@@ -117,10 +97,12 @@ class AlertBinarySensor(CoordinatorEntity, BinarySensorEntity):
             return bool(status)
 
 
-class InputBinarySensor(CoordinatorEntity, BinarySensorEntity):
+class InputBinarySensor(StaleStateMixin, CoordinatorEntity, BinarySensorEntity):
     """Representation of a e-connect input binary sensor."""
 
+    stale_query = q.INPUTS
     _attr_has_entity_name = True
+    _attr_icon = "hass:electric-switch"
 
     def __init__(
         self,
@@ -130,33 +112,18 @@ class InputBinarySensor(CoordinatorEntity, BinarySensorEntity):
         name: str,
         coordinator: DataUpdateCoordinator,
         device: AlarmDevice,
+        factory: EntityFactory,
     ) -> None:
         """Construct."""
-        # Enable experimental settings from the configuration file
-        experimental = coordinator.hass.data[DOMAIN].get(CONF_EXPERIMENTAL, {})
-        self._attr_force_update = experimental.get(CONF_FORCE_UPDATE, False)
+        self._attr_force_update = factory.force_update
 
         super().__init__(coordinator)
-        self.entity_id = generate_entity_id(config, name)
+        self.entity_id = factory.entity_id(name)
         self._name = name
         self._device = device
-        self._unique_id = unique_id
+        self._attr_unique_id = unique_id
         self._input_id = input_id
-
-    @property
-    def unique_id(self) -> str:
-        """Return the unique identifier."""
-        return self._unique_id
-
-    @property
-    def name(self) -> str:
-        """Return the name of this entity."""
-        return self._name
-
-    @property
-    def icon(self) -> str:
-        """Return the icon used by this entity."""
-        return "hass:electric-switch"
+        self._attr_name = name
 
     @property
     def is_on(self) -> bool:
@@ -164,10 +131,14 @@ class InputBinarySensor(CoordinatorEntity, BinarySensorEntity):
         return bool(self._device.get_status(q.INPUTS, self._input_id))
 
 
-class SectorBinarySensor(CoordinatorEntity, BinarySensorEntity):
+class SectorBinarySensor(StaleStateMixin, CoordinatorEntity, BinarySensorEntity):
     """Representation of a e-connect sector binary sensor."""
 
+    stale_query = q.SECTORS
     _attr_has_entity_name = True
+    _attr_icon = "hass:shield-home-outline"
+    # Sectors use a device class of this integration, that is not part of `BinarySensorDeviceClass`
+    _attr_device_class = cast(BinarySensorDeviceClass, DEVICE_CLASS_SECTORS)
 
     def __init__(
         self,
@@ -177,41 +148,23 @@ class SectorBinarySensor(CoordinatorEntity, BinarySensorEntity):
         name: str,
         coordinator: DataUpdateCoordinator,
         device: AlarmDevice,
+        factory: EntityFactory,
     ) -> None:
         """Construct."""
-        # Enable experimental settings from the configuration file
-        experimental = coordinator.hass.data[DOMAIN].get(CONF_EXPERIMENTAL, {})
-        self._attr_force_update = experimental.get(CONF_FORCE_UPDATE, False)
+        self._attr_force_update = factory.force_update
 
         super().__init__(coordinator)
-        self.entity_id = generate_entity_id(config, name)
+        self.entity_id = factory.entity_id(name)
         self._name = name
         self._device = device
-        self._unique_id = unique_id
+        self._attr_unique_id = unique_id
         self._sector_id = sector_id
+        self._attr_name = name
 
-        # Register the sector with the device
+        # Register the sector with the device, and in the index shared by all entries
         device._register_sector(self)
-
-    @property
-    def unique_id(self) -> str:
-        """Return the unique identifier."""
-        return self._unique_id
-
-    @property
-    def device_class(self) -> str:
-        """Return the device class."""
-        return DEVICE_CLASS_SECTORS
-
-    @property
-    def name(self) -> str:
-        """Return the name of this entity."""
-        return self._name
-
-    @property
-    def icon(self) -> str:
-        """Return the icon used by this entity."""
-        return "hass:shield-home-outline"
+        object_id = self.entity_id.split(".")[1]
+        sector_index(coordinator.hass)[object_id] = (config.entry_id, device._sectors[object_id])
 
     @property
     def is_on(self) -> bool:
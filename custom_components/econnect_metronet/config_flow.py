@@ -1,13 +1,14 @@
 import logging
+from functools import partial
 
 import voluptuous as vol
 from elmo import query as q
-from elmo.api.client import ElmoClient
 from elmo.api.exceptions import CredentialError
 from elmo.systems import ELMO_E_CONNECT as E_CONNECT_DEFAULT
 from homeassistant import config_entries
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
 from requests.exceptions import ConnectionError, HTTPError
 
 from .const import (
@@ -16,14 +17,23 @@ from .const import (
     CONF_AREAS_ARM_NIGHT,
     CONF_AREAS_ARM_VACATION,
     CONF_DOMAIN,
+    CONF_EXPERIMENTAL,
+    CONF_INPUT_MIN_OFF,
+    CONF_INPUT_MIN_ON,
+    CONF_INPUT_SETTLE,
+    CONF_REFRESH_OUTPUTS,
+    CONF_REFRESH_PANEL,
     CONF_SCAN_INTERVAL,
+    CONF_STALE_TTL,
     CONF_SYSTEM_NAME,
     CONF_SYSTEM_URL,
     DOMAIN,
+    FLOW_DEVICE_TTL,
     KEY_DEVICE,
     SUPPORTED_SYSTEMS,
 )
-from .helpers import select
+from .devices import AlarmDevice
+from .helpers import flow_device_key, flow_devices, select, shared_connections
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -44,11 +54,17 @@ class EconnectConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ign
         """Handle the initial configuration."""
         errors = {}
         if user_input is not None:
+            # Imported when the flow is used, as the integration setup doesn't need it
+            from elmo.api.client import ElmoClient
+
             try:
                 # Validate credentials
                 client = ElmoClient(user_input.get(CONF_SYSTEM_URL), domain=user_input.get(CONF_DOMAIN))
+                shared_connections(self.hass, client)
+                experimental = self.hass.data.get(DOMAIN, {}).get(CONF_EXPERIMENTAL, {})
+                device = AlarmDevice(client, experimental)
                 await self.hass.async_add_executor_job(
-                    client.auth, user_input.get(CONF_USERNAME), user_input.get(CONF_PASSWORD)
+                    device.connect, user_input.get(CONF_USERNAME), user_input.get(CONF_PASSWORD)
                 )
             except ConnectionError:
                 errors["base"] = "cannot_connect"
@@ -66,6 +82,7 @@ class EconnectConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ign
                 _LOGGER.error("Unexpected exception %s", err)
                 errors["base"] = "unknown"
             else:
+                await self._async_fetch_inventory(device, user_input)
                 return self.async_create_entry(title="e-Connect/Metronet Alarm", data=user_input)
 
         # Populate with latest changes
@@ -100,6 +117,32 @@ class EconnectConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ign
             errors=errors,
         )
 
+    async def _async_fetch_inventory(self, device: AlarmDevice, user_input: dict) -> None:
+        """Fetch the inventory of the validated device and hand it to the config entry setup.
+
+        The setup reuses the session and the inventory, so onboarding doesn't authenticate
+        and update twice. Errors are not raised as the setup fetches the inventory anyway.
+        """
+        try:
+            await self.hass.async_add_executor_job(device.update)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.debug(f"Config Flow | Unable to fetch the inventory, it's fetched during the setup: {err}")
+            return
+
+        key = flow_device_key(user_input)
+        flow_devices(self.hass)[key] = device
+        # The device is discarded if the entry is never set up (e.g. it's disabled or removed right away)
+        async_call_later(self.hass, FLOW_DEVICE_TTL, partial(_async_evict_device, self.hass, key, device))
+
+
+@callback
+def _async_evict_device(hass: HomeAssistant, key: tuple, device: AlarmDevice, _now) -> None:
+    """Discard a device connected by the config flow, if it's still waiting for its entry setup."""
+    devices = flow_devices(hass)
+    if devices.get(key) is device:
+        _LOGGER.debug("Config Flow | Discarding the device not used by the entry setup")
+        del devices[key]
+
 
 class OptionsFlowHandler(config_entries.OptionsFlowWithConfigEntry):
     """Reconfigure integration options.
@@ -109,6 +152,10 @@ class OptionsFlowHandler(config_entries.OptionsFlowWithConfigEntry):
         * Areas armed in Arm Home state
         * Areas armed in Arm Night state
         * Areas armed in Arm Vacation state
+        * Scan interval
+        * Refresh cadence of outputs and panel details (in number of updates, 0 to refresh on change only)
+        * Debounce of flapping inputs (settle time, minimum on and off time, in seconds)
+        * Stale-state TTL (in seconds, 0 to keep the last known state forever)
     """
 
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
@@ -153,6 +200,30 @@ class OptionsFlowHandler(config_entries.OptionsFlowWithConfigEntry):
                         CONF_SCAN_INTERVAL,
                         description={"suggested_value": suggest_scan_interval},
                     ): int,
+                    vol.Optional(
+                        CONF_REFRESH_OUTPUTS,
+                        description={"suggested_value": self.config_entry.options.get(CONF_REFRESH_OUTPUTS)},
+                    ): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_REFRESH_PANEL,
+                        description={"suggested_value": self.config_entry.options.get(CONF_REFRESH_PANEL)},
+                    ): vol.All(int, vol.Range(min=1)),
+                    vol.Optional(
+                        CONF_INPUT_SETTLE,
+                        description={"suggested_value": self.config_entry.options.get(CONF_INPUT_SETTLE)},
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_INPUT_MIN_ON,
+                        description={"suggested_value": self.config_entry.options.get(CONF_INPUT_MIN_ON)},
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_INPUT_MIN_OFF,
+                        description={"suggested_value": self.config_entry.options.get(CONF_INPUT_MIN_OFF)},
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_STALE_TTL,
+                        description={"suggested_value": self.config_entry.options.get(CONF_STALE_TTL)},
+                    ): vol.All(int, vol.Range(min=0)),
                 }
             ),
             errors=errors,
@@ -15,6 +15,13 @@ CONF_AREAS_ARM_NIGHT = "areas_arm_night"
 CONF_AREAS_ARM_VACATION = "areas_arm_vacation"
 CONF_SCAN_INTERVAL = "scan_interval"
 CONF_MANAGE_SECTORS = "managed_sectors"
+CONF_REFRESH_OUTPUTS = "refresh_outputs"
+CONF_REFRESH_PANEL = "refresh_panel"
+CONF_INPUT_SETTLE = "input_settle_time"
+CONF_INPUT_MIN_ON = "input_min_on"
+CONF_INPUT_MIN_OFF = "input_min_off"
+CONF_STALE_TTL = "stale_state_ttl"
+CONF_CONFIG_ENTRY_ID = "config_entry_id"
 DEVICE_CLASS_SECTORS = "sector"
 DOMAIN = "econnect_metronet"
 NOTIFICATION_MESSAGE = (
@@ -28,11 +35,52 @@ NOTIFICATION_IDENTIFIER = "econnect_metronet_output_fail"
 KEY_DEVICE = "device"
 KEY_COORDINATOR = "coordinator"
 KEY_UNSUBSCRIBER = "options_unsubscriber"
+KEY_SECTOR_INDEX = "sector_index"
+KEY_FLOW_DEVICES = "flow_devices"
+KEY_SCHEDULER = "scheduler"
+KEY_HTTP_ADAPTER = "http_adapter"
+# Events fired on the HA event bus when an item changes its status
+EVENT_INPUT_CHANGED = f"{DOMAIN}_input_changed"
+EVENT_SECTOR_CHANGED = f"{DOMAIN}_sector_changed"
 # Defines the default scan interval in seconds.
 # Fast scanning is required for real-time updates of the alarm state.
 SCAN_INTERVAL_DEFAULT = 5
 POLLING_TIMEOUT = 20
+# Maximum number of sector and input transitions kept in memory by each device
+HISTORY_SIZE = 1024
+# Upper bounds (in seconds) of the command-to-confirmation latency histogram
+LATENCY_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 60, 120)
+# Upper bounds (in seconds) of the request duration histograms, including the long-polling
+QUERY_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 20, 30)
+# Commands not confirmed by the backend within this time (in seconds) are not tracked anymore
+COMMAND_EXPIRATION = 300
+# Devices connected by the config flow and not picked by the entry setup within this time (in seconds) are discarded
+FLOW_DEVICE_TTL = 300
+# Time window (in seconds) used to collect output commands that are sent together
+OUTPUT_QUEUE_WINDOW = 0.3
+# Optimistic statuses not confirmed by an update within this time (in seconds) are rolled back.
+# It must be greater than POLLING_TIMEOUT so that at least one long-polling cycle can confirm them.
+OPTIMISTIC_TIMEOUT = 30
+# Delays (in seconds) between the targeted queries used to confirm a command, right after it is sent
+FAST_REFRESH_SCHEDULE = (0.5, 1, 2, 4)
+# Maximum number of full updates running at the same time, across all config entries
+MAX_CONCURRENT_UPDATES = 2
+# Delay (in seconds) between the first refresh of two consecutive config entries
+POLL_STAGGER = 0.5
+# Connections kept open for each host of the cloud service, shared by all config entries. Each entry
+# uses up to two connections at once (the long-polling and a query or a command)
+HTTP_POOL_SIZE = 16
+# Minimum time (in seconds) between two warnings or errors with the same message, on polling paths
+LOG_THROTTLE_INTERVAL = 300
+# Refresh policies of inventory categories that rarely change: a category is queried once every N full
+# updates, or only when the long-polling reports a change of the category (REFRESH_ON_CHANGE)
+REFRESH_ON_CHANGE = 0
+REFRESH_OUTPUTS_DEFAULT = REFRESH_ON_CHANGE
+REFRESH_PANEL_DEFAULT = 20
+# Age (in seconds) after which data not confirmed by the backend makes entities unavailable (0 = never)
+STALE_TTL_DEFAULT = 0
 
 # Experimental Settings
 CONF_EXPERIMENTAL = "experimental"
 CONF_FORCE_UPDATE = "force_update"
+CONF_RECORD_TRAFFIC = "record_traffic"
@@ -1,23 +1,55 @@
+import asyncio
 import logging
 from datetime import timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import async_timeout
+from elmo import query as q
 from elmo.api.exceptions import DeviceDisconnectedError, InvalidToken
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, POLLING_TIMEOUT
+from .const import (
+    DOMAIN,
+    EVENT_INPUT_CHANGED,
+    EVENT_SECTOR_CHANGED,
+    FAST_REFRESH_SCHEDULE,
+    OUTPUT_QUEUE_WINDOW,
+    POLLING_TIMEOUT,
+)
 from .devices import AlarmDevice
+from .helpers import poll_scheduler
+from .log import ThrottledLogger
 
 _LOGGER = logging.getLogger(__name__)
 
+# Inventory categories that fire an event on the HA bus when an item changes its status
+TRANSITION_EVENTS = {
+    q.SECTORS: EVENT_SECTOR_CHANGED,
+    q.INPUTS: EVENT_INPUT_CHANGED,
+}
+
 
 class AlarmCoordinator(DataUpdateCoordinator):
     def __init__(self, hass: HomeAssistant, device: AlarmDevice, scan_interval: int) -> None:
         # Store the device to update the state
         self._device = device
+        # Output commands waiting to be sent, stored as `(output_id, status, future)` tuples
+        self._output_commands: List[Tuple[int, bool, asyncio.Future]] = []
+        # Task that sends the queued output commands once the batching window expires
+        self._output_flush: Optional[asyncio.Task] = None
+        # Fast refresh tasks scheduled after a command, stored as `{query: task}`
+        self._fast_refreshes: Dict[int, asyncio.Task] = {}
+        # Errors logged at each poll are rate limited, so that outages don't flood the log
+        self._log = ThrottledLogger(_LOGGER)
+        # Result of the full update in progress, awaited by concurrent callers (e.g. `update_state` service)
+        self._update_flight: Optional[asyncio.Future] = None
+        # Timer that exposes input changes delayed by the debouncer, once they are due
+        self._debounce_unsub: Optional[Callable[[], None]] = None
 
         # Configure the coordinator
         super().__init__(
@@ -27,6 +59,12 @@ class AlarmCoordinator(DataUpdateCoordinator):
             update_interval=timedelta(seconds=scan_interval),
         )
 
+    @property
+    def _entry(self) -> ConfigEntry:
+        """Return the config entry of the coordinator, assigned by Home Assistant while the entry is set up."""
+        assert self.config_entry is not None
+        return self.config_entry
+
     async def _async_update_data(self) -> Optional[Dict[str, Any]]:
         """Update device data asynchronously using the long-polling method.
 
@@ -44,13 +82,25 @@ class AlarmCoordinator(DataUpdateCoordinator):
             InvalidToken: When the token used for the connection is invalid.
             UpdateFailed: When there's an error in updating the data.
         """
+        try:
+            return await self._async_update_cycle()
+        finally:
+            # Profiling sessions started by the `profile` service last a number of update cycles,
+            # including the ones without changes
+            if (profiler := self._device.profiler) is not None:
+                profiler.cycle_done()
+
+    async def _async_update_cycle(self) -> Optional[Dict[str, Any]]:
+        """Run a single iteration of `_async_update_data`: a long-polling request or a full update."""
         try:
             if self.data is None:
-                # First update, no need to wait for changes
+                # First update, no need to wait for changes. Entries are staggered to avoid
+                # hitting the cloud service at the same moment after a restart.
+                await asyncio.sleep(poll_scheduler(self.hass).offset(self.config_entry.entry_id))
                 username = self.config_entry.data[CONF_USERNAME]
                 password = self.config_entry.data[CONF_PASSWORD]
                 await self.hass.async_add_executor_job(self._device.connect, username, password)
-                return await self.hass.async_add_executor_job(self._device.update)
+                return await self._async_update_device()
 
             async with async_timeout.timeout(POLLING_TIMEOUT):
                 if not self.last_update_success or not self._device.connected:
@@ -60,18 +110,22 @@ class AlarmCoordinator(DataUpdateCoordinator):
                     # the integration remains stuck.
                     # See: https://github.com/palazzem/ha-econnect-alarm/issues/51
                     _LOGGER.debug("Coordinator | Central unit disconnected, forcing a full update")
-                    return await self.hass.async_add_executor_job(self._device.update)
+                    return await self._async_update_device()
 
                 # `device.has_updates` implements e-Connect long-polling API. This
                 # action blocks the thread for 15 seconds, or when the backend publishes an update
                 # POLLING_TIMEOUT ensures an upper bound regardless of the underlying implementation.
                 _LOGGER.debug("Coordinator | Waiting for changes (long-polling)")
                 status = await self.hass.async_add_executor_job(self._device.has_updates)
+                self._log.flush()
                 if status["has_changes"]:
                     _LOGGER.debug("Coordinator | Changes detected, sending an update")
-                    return await self.hass.async_add_executor_job(self._device.update)
+                    return await self._async_update_device()
                 else:
                     _LOGGER.debug("Coordinator | No changes detected")
+                    self._device.metrics.inc("econnect_metronet_coordinator_cycles_total", (("result", "no_changes"),))
+                    # Roll back optimistic statuses that are not confirmed in time
+                    await self.hass.async_add_executor_job(self._device.reconcile)
                     return {}
         except InvalidToken:
             # This exception is expected to happen when the token expires. In this case,
@@ -81,12 +135,225 @@ class AlarmCoordinator(DataUpdateCoordinator):
             password = self.config_entry.data[CONF_PASSWORD]
             await self.hass.async_add_executor_job(self._device.connect, username, password)
             _LOGGER.debug("Coordinator | Authentication completed with success")
-            return await self.hass.async_add_executor_job(self._device.update)
+            return await self._async_update_device()
         except DeviceDisconnectedError as err:
             # If the device is disconnected, we keep the previous state and try again later
             # This is required as the device might be temporarily disconnected, and we don't want
             # to make all entities unavailable for a temporary issue. Furthermore, if the device goes
             # in an unavailable state, it might trigger unwanted automations.
             # See: https://github.com/palazzem/ha-econnect-alarm/issues/148
-            _LOGGER.error(f"Coordinator | {err}. Keeping the last known state.")
+            self._log.error("Coordinator | %s. Keeping the last known state.", err)
+            self._device.metrics.inc("econnect_metronet_disconnections_total")
+            self._device.metrics.inc("econnect_metronet_coordinator_cycles_total", (("result", "disconnected"),))
+            await self.hass.async_add_executor_job(self._device.reconcile)
             return {}
+
+    async def _async_update_device(self) -> Dict[str, Any]:
+        """Run a full device update, or join the one in progress.
+
+        Callers that request an update while another one is running (e.g. the `update_state` service
+        during the scheduled refresh, or the token recovery) await the same update and get its result.
+        In this way the backend is queried once and transitions are not fired twice. If the caller
+        running the update is cancelled (e.g. by the polling timeout), the other callers run it again.
+
+        Returns:
+            A dictionary containing the updated data.
+        """
+        while (flight := self._update_flight) is not None:
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+
+        self._update_flight = flight = self.hass.loop.create_future()
+        try:
+            data = await self._async_full_update()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as err:
+            flight.set_exception(err)
+            # The exception is raised by this call: joined callers are optional
+            flight.exception()
+            raise
+        else:
+            flight.set_result(data)
+            return data
+        finally:
+            self._update_flight = None
+
+    async def _async_full_update(self) -> Dict[str, Any]:
+        """Run a full device update and fire an event for each sector or input transition.
+
+        Statuses are captured before the update and compared with the refreshed inventory, so that
+        automations can react to a single event type instead of tracking hundreds of entities.
+        Items that are not known before the update (e.g. during the first refresh) don't fire events.
+        Transitions are also stored in the device history, so that recent changes can be inspected
+        without querying the recorder database.
+
+        Returns:
+            A dictionary containing the updated data.
+        """
+        async with poll_scheduler(self.hass).full_update(self._entry.entry_id):
+            timestamp = dt_util.utcnow()
+            data = await self.hass.async_add_executor_job(self._device.update)
+        self._log.flush()
+        self._device.metrics.inc("econnect_metronet_coordinator_cycles_total", (("result", "updated"),))
+        self._fire_transitions(timestamp)
+        self._async_schedule_debounce()
+        return data
+
+    @callback
+    def _async_schedule_debounce(self) -> None:
+        """Schedule the evaluation of input changes delayed by the debouncer, replacing the previous timer."""
+        if self._debounce_unsub is not None:
+            self._debounce_unsub()
+            self._debounce_unsub = None
+        if (delay := self._device.debounce_delay()) is not None:
+            self._debounce_unsub = async_call_later(self.hass, delay, self._async_debounce_expired)
+
+    @callback
+    def _async_debounce_expired(self, _now) -> None:
+        """Expose input changes that are due, firing their transitions like a full update."""
+        self._debounce_unsub = None
+        timestamp = dt_util.utcnow()
+        self._device.debounce_inputs()
+        self._fire_transitions(timestamp)
+        self.async_update_listeners()
+        self._async_schedule_debounce()
+
+    async def async_shutdown(self) -> None:
+        """Cancel the debounce timer and the queued output commands when the config entry is unloaded."""
+        if self._debounce_unsub is not None:
+            self._debounce_unsub()
+            self._debounce_unsub = None
+        if self._output_flush is not None:
+            self._output_flush.cancel()
+            self._output_flush = None
+        commands, self._output_commands = self._output_commands, []
+        for _, _, future in commands:
+            future.cancel()
+        await super().async_shutdown()
+
+    def _fire_transitions(self, timestamp) -> None:
+        """Record and fire an event for each transition detected by the device since the previous call.
+
+        Transitions are detected by the device while the inventory is written, so a fast refresh that
+        overlaps a full update doesn't report the same change twice.
+        """
+        for query, item_id, item, old_status, new_status in self._device.pop_transitions():
+            self._device.record_transition(query, item_id, old_status, new_status, timestamp.timestamp())
+            self.hass.bus.async_fire(
+                TRANSITION_EVENTS[query],
+                {
+                    "entry_id": self._entry.entry_id,
+                    "id": item_id,
+                    "element": item.get("element"),
+                    "name": item.get("name"),
+                    "old_status": old_status,
+                    "new_status": new_status,
+                    "timestamp": timestamp.isoformat(),
+                },
+            )
+
+    def async_schedule_fast_refresh(self, query: int) -> None:
+        """Schedule a refresh of a single inventory category, right after a command.
+
+        A previously scheduled refresh for the same category is cancelled, so that
+        consecutive commands don't run parallel refreshes.
+
+        Args:
+            query: The query index of the category affected by the command (e.g. `q.SECTORS`).
+        """
+        if (task := self._fast_refreshes.get(query)) is not None and not task.done():
+            task.cancel()
+        self._fast_refreshes[query] = self._entry.async_create_background_task(
+            self.hass, self._async_fast_refresh(query), f"{DOMAIN}_fast_refresh_{query}"
+        )
+
+    async def _async_fast_refresh(self, query: int) -> None:
+        """Query a single category until the expected statuses are reported by the backend.
+
+        The category is queried following `FAST_REFRESH_SCHEDULE`, and the refresh stops as soon as
+        all optimistic statuses of the category are confirmed. Transitions are detected like in
+        a full update, so events and history are not affected by this shortcut. Errors are not
+        raised: the regular polling takes care of them.
+
+        Args:
+            query: The query index of the category affected by the command (e.g. `q.SECTORS`).
+        """
+        for delay in FAST_REFRESH_SCHEDULE:
+            await asyncio.sleep(delay)
+            timestamp = dt_util.utcnow()
+            try:
+                settled = await self.hass.async_add_executor_job(self._device.refresh, query)
+            except Exception as err:
+                _LOGGER.debug("Coordinator | Fast refresh of query %s failed: %s", query, err)
+                return
+
+            self._fire_transitions(timestamp)
+            self.async_update_listeners()
+            if settled:
+                _LOGGER.debug("Coordinator | Fast refresh of query %s completed", query)
+                return
+
+        _LOGGER.debug("Coordinator | Fast refresh of query %s not confirmed, waiting for the next update", query)
+
+    async def async_send_output(self, output_id: int, status: bool) -> bool:
+        """Queue an output command and wait for its result.
+
+        Commands received within `OUTPUT_QUEUE_WINDOW` seconds are collected and sent together
+        with a single executor job, so that scenes toggling many outputs don't schedule one job
+        (and one connection) for each switch.
+
+        Args:
+            output_id: The ID of the output.
+            status: True to turn the output on, False to turn it off.
+
+        Returns:
+            The result of `AlarmDevice.turn_on()` or `AlarmDevice.turn_off()` for this command.
+
+        Raises:
+            Any exception raised while sending this command.
+        """
+        future = self.hass.loop.create_future()
+        self._output_commands.append((output_id, status, future))
+        if len(self._output_commands) == 1:
+            # The first command of a batch schedules the flush
+            self._output_flush = self._entry.async_create_background_task(
+                self.hass, self._async_flush_outputs(), f"{DOMAIN}_flush_outputs"
+            )
+        return await future
+
+    async def _async_flush_outputs(self) -> None:
+        """Send all queued output commands and report each result to its caller.
+
+        The flush runs as a background task of the config entry, so it's cancelled when the entry
+        is unloaded. In that case, callers waiting for a result are cancelled as well.
+        """
+        await asyncio.sleep(OUTPUT_QUEUE_WINDOW)
+        commands, self._output_commands = self._output_commands, []
+        _LOGGER.debug("Coordinator | Sending %s output commands", len(commands))
+        try:
+            results = await self.hass.async_add_executor_job(
+                self._device.turn_outputs, [(output_id, status) for output_id, status, _ in commands]
+            )
+        except asyncio.CancelledError:
+            for _, _, future in commands:
+                future.cancel()
+            raise
+        except Exception as err:
+            _LOGGER.error("Coordinator | Unable to send %s output commands: %s", len(commands), err)
+            results = [err] * len(commands)
+
+        if any(result is True for result in results):
+            self.async_schedule_fast_refresh(q.OUTPUTS)
+
+        for (_, _, future), result in zip(commands, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,91 @@
+"""Debounce and hysteresis filter used to hide flapping inputs."""
+
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class InputDebouncer:
+    """Filter the status of each input, so that short glitches (e.g. vibration sensors) are not reported.
+
+    A new status is reported when both conditions are met:
+        * The input kept the new status for at least `settle` seconds (debounce).
+        * The reported status has been held for at least `min_on` seconds if the input is on, or
+          `min_off` seconds if it is off (hysteresis).
+
+    A change that is reverted before being reported is counted as a suppressed transition. Changes
+    that are only delayed are reported once they are due: `deadline()` returns when the next pending
+    change is due, so that the caller can evaluate the inputs again without waiting for an update.
+    With all durations set to 0 the filter is disabled and statuses are reported as they are.
+
+    Usage:
+        debouncer = InputDebouncer(settle=2, min_on=10)
+        status = debouncer.filter(input_id, raw_status)
+        debouncer.deadline()
+
+    Args:
+        settle: Time (in seconds) a new status must be stable before it's reported.
+        min_on: Minimum time (in seconds) an input is reported as on.
+        min_off: Minimum time (in seconds) an input is reported as off.
+        clock: Function that returns the current time, used to measure durations.
+    """
+
+    def __init__(
+        self,
+        settle: float = 0,
+        min_on: float = 0,
+        min_off: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.settle = settle
+        self.min_on = min_on
+        self.min_off = min_off
+        self.clock = clock
+        # Status of each input, stored as `{input_id: [reported, reported_at, raw, raw_since]}`
+        self._inputs: Dict[int, List] = {}
+        # Changes reverted before being reported, for each input
+        self.suppressed: Dict[int, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settle or self.min_on or self.min_off)
+
+    def filter(self, input_id: int, raw, now: Optional[float] = None):
+        """Record the status reported by the backend and return the status that must be exposed.
+
+        Args:
+            input_id: The ID of the input.
+            raw: The status reported by the backend. Use `None` to evaluate the last one again.
+            now: The current time. If not provided, the clock is used.
+        """
+        now = self.clock() if now is None else now
+        state = self._inputs.get(input_id)
+        if state is None:
+            # Statuses seen for the first time don't have a history to filter
+            if raw is not None:
+                self._inputs[input_id] = [raw, now, raw, now]
+            return raw
+
+        reported, _, previous, _ = state
+        if raw is not None and raw != previous:
+            state[2], state[3] = raw, now
+            if raw == reported:
+                self.suppressed[input_id] = self.suppressed.get(input_id, 0) + 1
+
+        if state[2] != reported and now >= self._due(state):
+            state[0], state[1] = state[2], now
+        return state[0]
+
+    def _due(self, state: List) -> float:
+        reported, reported_at, _, raw_since = state
+        hold = self.min_on if reported else self.min_off
+        return max(raw_since + self.settle, reported_at + hold)
+
+    def deadline(self) -> Optional[float]:
+        """Return the clock time when the next pending change is due, or `None` if no change is pending."""
+        due = [self._due(state) for state in self._inputs.values() if state[2] != state[0]]
+        return min(due, default=None)
+
+    @property
+    def suppressed_total(self) -> int:
+        """Return the number of changes suppressed across all inputs."""
+        return sum(self.suppressed.values())
@@ -3,6 +3,7 @@
 import functools
 import logging
 
+from elmo import query as q
 from elmo.api.exceptions import CodeError, InvalidToken, LockError
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
 
@@ -30,6 +31,9 @@ def set_device_state(new_state, loader_state):
                 result = await func(*args, **kwargs)
                 self._device.state = new_state
                 self.async_write_ha_state()
+                # Propagate optimistic sector statuses to other entities, then confirm them
+                self.coordinator.async_update_listeners()
+                self.coordinator.async_schedule_fast_refresh(q.SECTORS)
                 return result
             except LockError:
                 _LOGGER.warning(
@@ -78,8 +82,8 @@ def retry_refresh_token_service(func):
             except InvalidToken as err:
                 _LOGGER.debug(f"Device | Invalid access token: {err}")
                 if attempts < 1:
-                    hass, config_id, _ = args
-                    config = hass.config_entries.async_entries(DOMAIN)[0]
+                    hass, config_id = args[:2]
+                    config = hass.config_entries.async_get_entry(config_id)
                     device = hass.data[DOMAIN][config_id][KEY_DEVICE]
                     username = config.data[CONF_USERNAME]
                     password = config.data[CONF_PASSWORD]
@@ -88,3 +92,50 @@ def retry_refresh_token_service(func):
                 attempts += 1
 
     return wrapper
+
+
+def profiled(func):
+    """Run an `AlarmDevice` method through the active `CycleProfiler`, if a profiling session is running.
+
+    The `profile` service sets `device.profiler` for the duration of the session, so that
+    methods run as usual (without any overhead) when no session is running.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None:
+            return func(self, *args, **kwargs)
+        return profiler.runcall(func, self, *args, **kwargs)
+
+    return wrapper
+
+
+def command_metrics(func):
+    """Count the outcome of an `AlarmDevice` command in `device.metrics`, labelled with the command name.
+
+    The outcome is `success`, `denied` when the command is not sent (e.g. an output that can't be
+    controlled by users), `failed` when a command sequence is not completed, or the name of the
+    exception raised by the command.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            result = func(self, *args, **kwargs)
+        except Exception as err:
+            self.metrics.inc(
+                "econnect_metronet_commands_total", (("command", func.__name__), ("outcome", type(err).__name__))
+            )
+            raise
+
+        if result is False:
+            outcome = "denied"
+        elif isinstance(result, dict) and not result.get("success", True):
+            outcome = "failed"
+        else:
+            outcome = "success"
+        self.metrics.inc("econnect_metronet_commands_total", (("command", func.__name__), ("outcome", outcome)))
+        return result
+
+    return wrapper
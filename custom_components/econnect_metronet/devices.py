@@ -1,5 +1,9 @@
 import logging
-from typing import Union
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, Union
 
 from elmo import query as q
 from elmo.api.exceptions import (
@@ -11,20 +15,78 @@ from elmo.api.exceptions import (
     ParseError,
 )
 from homeassistant.components.alarm_control_panel import AlarmControlPanelState
+from homeassistant.util import dt as dt_util
 from requests.exceptions import HTTPError
 
 from .const import (
+    COMMAND_EXPIRATION,
     CONF_AREAS_ARM_AWAY,
     CONF_AREAS_ARM_HOME,
     CONF_AREAS_ARM_NIGHT,
     CONF_AREAS_ARM_VACATION,
+    CONF_INPUT_MIN_OFF,
+    CONF_INPUT_MIN_ON,
+    CONF_INPUT_SETTLE,
     CONF_MANAGE_SECTORS,
+    CONF_REFRESH_OUTPUTS,
+    CONF_REFRESH_PANEL,
+    CONF_STALE_TTL,
+    HISTORY_SIZE,
+    LATENCY_BUCKETS,
     NOTIFICATION_MESSAGE,
+    OPTIMISTIC_TIMEOUT,
+    REFRESH_ON_CHANGE,
+    REFRESH_OUTPUTS_DEFAULT,
+    REFRESH_PANEL_DEFAULT,
+    STALE_TTL_DEFAULT,
 )
+from .debounce import InputDebouncer
+from .decorators import command_metrics, profiled
 from .helpers import split_code
+from .log import ResponseText, ThrottledLogger
+from .metrics import POLL_LABELS, QUERY_LABELS, Histogram, Metrics
 
 _LOGGER = logging.getLogger(__name__)
 
+# Actions available in a command sequence, mapped to the action that reverts them
+SEQUENCE_ACTIONS = {
+    "arm": "disarm",
+    "disarm": "arm",
+    "turn_on": "turn_off",
+    "turn_off": "turn_on",
+}
+
+# Inventory categories that can be refreshed on their own, mapped to the key used in the query response
+REFRESH_KEYS = {
+    q.SECTORS: "sectors",
+    q.INPUTS: "inputs",
+    q.OUTPUTS: "outputs",
+    q.ALERTS: "alerts",
+}
+
+# Inventory categories queried by a full update, mapped to the key used in the query response
+UPDATE_KEYS = {
+    q.SECTORS: "sectors",
+    q.INPUTS: "inputs",
+    q.OUTPUTS: "outputs",
+    q.ALERTS: "alerts",
+    q.PANEL: "panel",
+}
+
+# Inventory categories reported by the long-polling API, mapped to the key used in the poll response
+POLL_KEYS = {
+    q.SECTORS: "areas",
+    q.INPUTS: "inputs",
+    q.OUTPUTS: "outputs",
+    q.ALERTS: "statusadv",
+}
+
+# Human readable categories used to expose the transitions history
+HISTORY_CATEGORIES = {
+    q.SECTORS: "sector",
+    q.INPUTS: "input",
+}
+
 
 class AlarmDevice:
     """AlarmDevice class represents an e-connect alarm system. This method wraps around
@@ -47,23 +109,232 @@ class AlarmDevice:
         self._inventory = {}
         self._sectors = {}
         self._connection = connection
+        # Errors of the polling paths are rate limited, so that outages don't flood the log
+        self._log = ThrottledLogger(_LOGGER)
         self._last_ids = {
             q.SECTORS: 0,
             q.INPUTS: 0,
             q.OUTPUTS: 0,
             q.ALERTS: 0,
         }
+        # Transitions are stored as `(timestamp, query, item_id, old_status, new_status)` tuples
+        # in a ring buffer, so that the oldest entries are dropped when the buffer is full
+        self._history = deque(maxlen=HISTORY_SIZE)
+        # Transitions detected while the inventory is written, waiting to be collected by `pop_transitions()`.
+        # They are stored as `(query, item_id, item, old_status, new_status)` tuples.
+        self._transitions = deque(maxlen=HISTORY_SIZE)
+        # Commands waiting for the backend confirmation, stored as
+        # `(dispatched_at, query, {element: expected_status})` tuples
+        self._pending_commands = []
+        self.command_latency = Histogram(LATENCY_BUCKETS)
+        # Counters and histograms exported by the metrics endpoint
+        self.metrics = Metrics()
+        self.last_command_latency = None
+        # Statuses expected after a successful command, stored as `{(query, item_id): (status, expires_at)}`.
+        # They are returned by `get_status()` until an update confirms them or they expire.
+        self._optimistic = {}
+        # Full updates run so far, and categories changed according to the last poll (`None` if unknown).
+        # They are used to skip categories that are not due for a refresh (see `set_refresh_policies()`).
+        self._update_count = 0
+        self._changes = None
+        # Update in progress, shared by callers that invoke `update()` at the same time
+        self._update_lock = threading.Lock()
+        self._update_flight: Optional[Future] = None
+        # Full updates and single category refreshes query and write `_inventory` and `_last_ids` one
+        # at a time, so that the long-polling never reads IDs that don't match the inventory
+        self._inventory_lock = threading.Lock()
+        # Profiling session started by the `profile` service (see `CycleProfiler`)
+        self.profiler = None
+        # Input statuses are filtered to hide flapping inputs (see `set_input_filter()`). The lock keeps
+        # the debouncer and the inputs inventory aligned between updates and due changes.
+        self._debouncer = InputDebouncer()
+        self._inputs_lock = threading.Lock()
+        # Last time (monotonic clock) the backend confirmed the data of each category, either with
+        # a query or with a poll that reports no changes. It's used to detect stale data (see `is_stale()`).
+        self._confirmed_at = {}
+
+        # Alarm state
+        self.state = None
 
         # Load user configuration
         config = config or {}
         self._managed_sectors = config.get(CONF_MANAGE_SECTORS) or []
+        self.set_arm_profiles(config)
+        self.set_refresh_policies(config)
+        self.set_input_filter(config)
+        self.set_stale_ttl(config)
+
+    def set_arm_profiles(self, config):
+        """Load the sectors armed by each profile (away, home, night, vacation) from the user configuration.
+
+        When the inventory is available, the alarm state is computed again, so that profiles
+        can be changed without reloading the integration.
+
+        Args:
+            config (dict): The user configuration (config entry options and experimental settings).
+        """
         self._sectors_away = config.get(CONF_AREAS_ARM_AWAY) or []
         self._sectors_home = config.get(CONF_AREAS_ARM_HOME) or []
         self._sectors_night = config.get(CONF_AREAS_ARM_NIGHT) or []
         self._sectors_vacation = config.get(CONF_AREAS_ARM_VACATION) or []
 
-        # Alarm state
-        self.state = None
+        if self._inventory:
+            self.state = self.get_state()
+
+    def set_refresh_policies(self, config):
+        """Load how often categories that rarely change are queried by a full update.
+
+        Each policy is the number of full updates between two periodic queries of the category (1 queries
+        it at every update), or `REFRESH_ON_CHANGE` to query it only when the long-polling reports a change.
+        A category is always queried when the long-polling reports its change. Categories without a policy
+        (sectors, inputs and alerts) are queried at every update.
+
+        The long-polling doesn't report panel changes, so the panel is always refreshed periodically:
+        `REFRESH_ON_CHANGE` (accepted by previous versions) falls back to the default policy.
+
+        Args:
+            config (dict): The user configuration (config entry options and experimental settings).
+        """
+        outputs = config.get(CONF_REFRESH_OUTPUTS)
+        panel = config.get(CONF_REFRESH_PANEL)
+        self._refresh_policies = {
+            q.OUTPUTS: REFRESH_OUTPUTS_DEFAULT if outputs is None else outputs,
+            q.PANEL: panel or REFRESH_PANEL_DEFAULT,
+        }
+
+    def set_input_filter(self, config):
+        """Load the debounce and hysteresis durations (in seconds) used to filter input statuses.
+
+        A new input status is exposed only when it's stable for the settle time, and once the previous
+        status has been held for the minimum on/off time (see `InputDebouncer`). Durations set to 0
+        disable the filter. The filter state is kept, so that durations can be changed at any time.
+
+        Args:
+            config (dict): The user configuration (config entry options and experimental settings).
+        """
+        self._debouncer.settle = config.get(CONF_INPUT_SETTLE) or 0
+        self._debouncer.min_on = config.get(CONF_INPUT_MIN_ON) or 0
+        self._debouncer.min_off = config.get(CONF_INPUT_MIN_OFF) or 0
+
+    def _set_inputs(self, items):
+        """Store the inputs inventory, after filtering flapping statuses through the debouncer."""
+        with self._inputs_lock:
+            previous = self._statuses(q.INPUTS)
+            if self._debouncer.enabled:
+                for input_id, item in items.items():
+                    item["status"] = self._debouncer.filter(input_id, item["status"])
+            self._inventory[q.INPUTS] = items
+            self._queue_transitions(q.INPUTS, previous)
+
+    def _set_sectors(self, items):
+        """Store the sectors inventory, keeping only the managed sectors if any."""
+        # NOTE: this change is internal and not exposed to users as the feature is experimental. Further
+        # development requires that users can register multiple devices and alarm panels to control
+        # sectors in a more granular way. See: https://github.com/palazzem/ha-econnect-alarm/issues/95
+        if self._managed_sectors:
+            items = {k: v for k, v in items.items() if v["element"] in self._managed_sectors}
+        previous = self._statuses(q.SECTORS)
+        self._inventory[q.SECTORS] = items
+        self._queue_transitions(q.SECTORS, previous)
+
+    def debounce_inputs(self):
+        """Expose input changes that are due, without querying the backend.
+
+        Changes delayed by the debouncer are not reported by the backend again, so this method must be
+        called once `debounce_delay()` seconds are elapsed.
+        """
+        with self._inputs_lock:
+            previous = self._statuses(q.INPUTS)
+            for input_id, item in self._inventory.get(q.INPUTS, {}).items():
+                status = self._debouncer.filter(input_id, None)
+                if status is not None:
+                    item["status"] = status
+            self._queue_transitions(q.INPUTS, previous)
+
+    def debounce_delay(self):
+        """Return the time (in seconds) until the next debounced input change is due, or `None` if none is pending."""
+        with self._inputs_lock:
+            deadline = self._debouncer.deadline()
+        if deadline is None:
+            return None
+        return max(deadline - self._debouncer.clock(), 0)
+
+    @property
+    def suppressed_transitions(self):
+        """Return the number of input changes hidden by the debouncer."""
+        return self._debouncer.suppressed_total
+
+    def set_stale_ttl(self, config):
+        """Load the age (in seconds) after which data not confirmed by the backend is stale (0 = never).
+
+        When the central unit is disconnected, the last known state is kept so that temporary issues
+        don't make entities unavailable (see `is_stale()`).
+
+        Args:
+            config (dict): The user configuration (config entry options and experimental settings).
+        """
+        ttl = config.get(CONF_STALE_TTL)
+        self._stale_ttl = STALE_TTL_DEFAULT if ttl is None else ttl
+
+    def _confirm_data(self, queries):
+        """Record that the backend confirmed the data of the given categories."""
+        now = time.monotonic()
+        for query in queries:
+            self._confirmed_at[query] = now
+
+    def data_age(self, query=None):
+        """Return the time (in seconds) since the backend confirmed the data of a category.
+
+        Args:
+            query (int): The query index of the category (e.g. `q.INPUTS`). If not provided, the age
+                of the oldest category reported by the long-polling is returned.
+
+        Returns:
+            float: The age of the data, or `None` if the category has never been confirmed.
+        """
+        queries = list(POLL_KEYS) if query is None else [query]
+        confirmed = [self._confirmed_at[query] for query in queries if query in self._confirmed_at]
+        if not confirmed:
+            return None
+        return time.monotonic() - min(confirmed)
+
+    def is_stale(self, query):
+        """Check if the data of a category is older than the stale-state TTL.
+
+        Until the TTL expires, the cached inventory is used as the last known good state. Categories
+        that have never been confirmed are not stale, as they are not exposed yet.
+
+        Args:
+            query (int): The query index of the category (e.g. `q.INPUTS`).
+
+        Returns:
+            bool: True if entities of the category must be reported as unavailable.
+        """
+        if not self._stale_ttl:
+            return False
+        age = self.data_age(query)
+        return age is not None and age > self._stale_ttl
+
+    def _update_queries(self):
+        """Return the categories due for a refresh in the current full update.
+
+        All categories are queried when the inventory is incomplete (e.g. the first update), or when
+        changes are unknown because the update is not triggered by the long-polling (e.g. after
+        an error or a reconnection), so that skipped categories never stay out of date.
+        """
+        changes = self._changes
+        if changes is None or any(query not in self._inventory for query in UPDATE_KEYS):
+            return list(UPDATE_KEYS)
+
+        queries = []
+        for query in UPDATE_KEYS:
+            # Reported changes are always queried, so that the long-polling gets the new last IDs.
+            # Periodic refreshes are an addition to them.
+            policy = self._refresh_policies.get(query, 1)
+            periodic = policy != REFRESH_ON_CHANGE and self._update_count % policy == 0
+            if query in changes or periodic:
+                queries.append(query)
+        return queries
 
     def _register_sector(self, entity):
         """Register a sector entity in the device's internal inventory."""
@@ -155,6 +426,170 @@ class AlarmDevice:
             if status is None or item.get("status") == status:
                 yield item_id, item
 
+    def _statuses(self, query):
+        """Return the current status of each item of the category, used to detect transitions."""
+        return {item_id: item["status"] for item_id, item in self.items(query)}
+
+    def _queue_transitions(self, query, previous):
+        """Queue a transition for each item whose status differs from the `previous` statuses.
+
+        Items that are not known before (e.g. during the first update) don't have a transition.
+        """
+        for item_id, item in self.items(query):
+            if item_id in previous and previous[item_id] != item["status"]:
+                self._transitions.append((query, item_id, item, previous[item_id], item["status"]))
+
+    def pop_transitions(self):
+        """Return and clear the sector and input transitions detected since the previous call.
+
+        Transitions are detected when the inventory is written, while updates and refreshes hold the
+        inventory lock. In this way each change is returned once, even if a refresh and a full update
+        run at the same time.
+
+        Returns:
+            list: A list of `(query, item_id, item, old_status, new_status)` tuples, from the oldest.
+        """
+        transitions = []
+        while self._transitions:
+            transitions.append(self._transitions.popleft())
+        return transitions
+
+    def record_transition(self, query, item_id, old_status, new_status, timestamp):
+        """Store a sector or input transition in the device history.
+
+        Args:
+            query (int): The query index of the item (e.g. `q.SECTORS` or `q.INPUTS`).
+            item_id (int): The item ID in the device inventory.
+            old_status (Any): The status before the transition.
+            new_status (Any): The status after the transition.
+            timestamp (float): The POSIX timestamp of the update that detected the transition.
+        """
+        self._history.append((timestamp, query, item_id, old_status, new_status))
+
+    def history(self, category: Optional[str] = None, since: Optional[float] = None):
+        """Return the recorded transitions, from the oldest to the newest.
+
+        Args:
+            category (Optional[str]): If provided, only transitions of this category (`sector` or `input`)
+                                      are returned.
+            since (Optional[float]): If provided, only transitions recorded at or after this POSIX timestamp
+                                     are returned.
+
+        Returns:
+            list: A list of dictionaries describing each transition.
+
+        Example:
+            >>> device.history(category="input")
+            [{'timestamp': '2024-01-01T00:00:00+00:00', 'category': 'input', 'id': 0, ...}]
+        """
+        transitions = []
+        for timestamp, query, item_id, old_status, new_status in self._history:
+            if since is not None and timestamp < since:
+                continue
+            if category is not None and HISTORY_CATEGORIES[query] != category:
+                continue
+
+            item = self._inventory.get(query, {}).get(item_id, {})
+            transitions.append(
+                {
+                    "timestamp": dt_util.utc_from_timestamp(timestamp).isoformat(),
+                    "category": HISTORY_CATEGORIES[query],
+                    "id": item_id,
+                    "name": item.get("name"),
+                    "old_status": old_status,
+                    "new_status": new_status,
+                }
+            )
+        return transitions
+
+    def _track_command(self, query, elements, status, dispatched_at):
+        """Track a command until an update confirms that all its elements reached the expected status.
+
+        Args:
+            query (int): The query index of the elements (e.g. `q.SECTORS` or `q.OUTPUTS`).
+            elements (list): The elements targeted by the command.
+            status (bool): The status expected once the command is applied by the main unit.
+            dispatched_at (float): The monotonic time when the command has been sent.
+        """
+        self._pending_commands.append((dispatched_at, query, {element: status for element in elements}))
+
+    def _confirm_commands(self):
+        """Measure the latency of pending commands confirmed by the latest inventory.
+
+        A command is confirmed when all its elements available in the inventory report the expected
+        status. Confirmed commands are recorded in the latency histogram, while commands that are
+        not confirmed within `COMMAND_EXPIRATION` seconds are discarded.
+        """
+        now = time.monotonic()
+        pending = []
+        for dispatched_at, query, expected in self._pending_commands:
+            statuses = {
+                item["element"]: item["status"] for _, item in self.items(query) if item.get("element") in expected
+            }
+            if statuses and all(expected[element] == status for element, status in statuses.items()):
+                self.last_command_latency = now - dispatched_at
+                self.command_latency.observe(self.last_command_latency)
+            elif now - dispatched_at < COMMAND_EXPIRATION:
+                pending.append((dispatched_at, query, expected))
+        self._pending_commands = pending
+
+    def _set_optimistic(self, query, elements, status):
+        """Apply the expected status to the targeted items, right after a successful command.
+
+        The status is returned by `get_status()` until an update confirms it, or until it's rolled back
+        after `OPTIMISTIC_TIMEOUT` seconds. The inventory is not changed, so it always reflects the
+        status reported by the backend.
+
+        Args:
+            query (int): The query index of the elements (e.g. `q.SECTORS` or `q.OUTPUTS`).
+            elements (list): The elements targeted by the command.
+            status (bool): The status expected once the command is applied by the main unit.
+        """
+        expires_at = time.monotonic() + OPTIMISTIC_TIMEOUT
+        for item_id, item in self.items(query):
+            if item.get("element") in elements:
+                self._optimistic[(query, item_id)] = (status, expires_at)
+
+        if query == q.SECTORS:
+            self.state = self.get_state()
+
+    def reconcile(self):
+        """Confirm or roll back optimistic statuses using the latest inventory.
+
+        An optimistic status is confirmed (and removed) when the inventory reports the same status.
+        If it's not confirmed within `OPTIMISTIC_TIMEOUT` seconds, it's rolled back so that `get_status()`
+        returns the status reported by the backend. This method must be called after each update,
+        even when the backend doesn't report any change, so that expired statuses are rolled back.
+
+        The inventory lock is acquired, so that updates and refreshes running in other threads don't
+        reconcile the same statuses at the same time. This method blocks and must run in the executor.
+
+        Returns:
+            bool: True if at least one optimistic status has been removed.
+        """
+        with self._inventory_lock:
+            return self._reconcile()
+
+    def _reconcile(self):
+        """Confirm or roll back optimistic statuses. Use `reconcile()` to run it under the inventory lock."""
+        now = time.monotonic()
+        changed = False
+        for (query, item_id), (status, expires_at) in list(self._optimistic.items()):
+            item = self._inventory.get(query, {}).get(item_id)
+            confirmed = item is None or item["status"] == status
+            if not confirmed and now < expires_at:
+                continue
+
+            if not confirmed:
+                self._log.debug("Device | Status of item %s (query %s) not confirmed, rolling back", item_id, query)
+            # Commands running in other threads may replace the status in the meantime
+            self._optimistic.pop((query, item_id), None)
+            changed = True
+
+        if changed:
+            self.state = self.get_state()
+        return changed
+
     def connect(self, username, password):
         """Establish a connection with the E-connect backend, to retrieve an access
         token. This method stores the `session_id` within the `ElmoClient` object
@@ -166,13 +601,25 @@ class AlarmDevice:
         try:
             self._connection.auth(username, password)
             self.connected = True
+            self.metrics.inc("econnect_metronet_auth_total", (("outcome", "success"),))
         except HTTPError as err:
-            _LOGGER.error(f"Device | Error while authenticating with e-Connect: {err}")
+            self.metrics.inc("econnect_metronet_auth_total", (("outcome", "HTTPError"),))
+            _LOGGER.error("Device | Error while authenticating with e-Connect: %s", err)
             raise err
         except CredentialError as err:
-            _LOGGER.error(f"Device | Username or password are not correct: {err}")
+            self.metrics.inc("econnect_metronet_auth_total", (("outcome", "CredentialError"),))
+            _LOGGER.error("Device | Username or password are not correct: %s", err)
             raise err
 
+    def _query(self, query):
+        """Query a category through the connection, recording the request duration."""
+        started_at = time.monotonic()
+        try:
+            return self._connection.query(query)
+        finally:
+            elapsed = time.monotonic() - started_at
+            self.metrics.observe("econnect_metronet_query_duration_seconds", elapsed, QUERY_LABELS[query])
+
     def has_updates(self):
         """Check if there have been any updates using the established connection.
 
@@ -189,15 +636,30 @@ class AlarmDevice:
             dict: Dictionary with the updates if any, based on the last known IDs.
         """
         try:
-            self._connection.query(q.ALERTS)
-            data = self._connection.poll({key: value for key, value in self._last_ids.items()})
+            self._query(q.ALERTS)
+            started_at = time.monotonic()
+            try:
+                with self._inventory_lock:
+                    ids = dict(self._last_ids)
+                data = self._connection.poll(ids)
+            finally:
+                elapsed = time.monotonic() - started_at
+                self.metrics.observe("econnect_metronet_query_duration_seconds", elapsed, POLL_LABELS)
             self.connected = True
+            self.metrics.inc("econnect_metronet_poll_cycles_total")
+            if data is not None:
+                if data.get("has_changes"):
+                    self.metrics.inc("econnect_metronet_poll_changes_total")
+                self._changes = {query for query, key in POLL_KEYS.items() if data.get(key)}
+                # Categories without changes are still up to date
+                self._confirm_data(query for query in POLL_KEYS if query not in self._changes)
+            self._log.flush()
             return data
         except HTTPError as err:
-            _LOGGER.error(f"Device | Error while polling for updates: {err.response.text}")
+            self._log.error("Device | Error while polling for updates: %s", ResponseText(err))
             raise err
         except ParseError as err:
-            _LOGGER.error(f"Device | Error parsing the poll response: {err}")
+            self._log.error("Device | Error parsing the poll response: %s", err)
             raise err
         except DeviceDisconnectedError as err:
             self.connected = False
@@ -219,12 +681,13 @@ class AlarmDevice:
         if self.state in [AlarmControlPanelState.ARMING, AlarmControlPanelState.DISARMING]:
             return self.state
 
-        sectors_armed = dict(self.items(q.SECTORS, status=True))
-        if not sectors_armed:
+        # Note: `element` is the sector ID you use to arm/disarm the sector.
+        sectors = [
+            sector["element"] for sector_id, sector in self.items(q.SECTORS) if self.get_status(q.SECTORS, sector_id)
+        ]
+        if not sectors:
             return AlarmControlPanelState.DISARMED
 
-        # Note: `element` is the sector ID you use to arm/disarm the sector.
-        sectors = [sectors["element"] for sectors in sectors_armed.values()]
         # Sort lists here for robustness, ensuring accurate comparisons
         # regardless of whether the input lists were pre-sorted or not.
         sectors_armed_sorted = sorted(sectors)
@@ -254,17 +717,28 @@ class AlarmDevice:
             # NOTE: we should turn on the sensor (alert) if the device is not connected, hence the `not`
             return not self.connected
 
+        if (optimistic := self._optimistic.get((query, id))) is not None:
+            return optimistic[0]
+
         return self._inventory[query][id]["status"]
 
+    @profiled
     def update(self):
         """Updates the internal state of the device based on the latest data.
 
         This method performs the following actions:
-        1. Queries for the latest sectors and inputs using the internal connection.
+        1. Queries for the latest sectors and inputs using the internal connection. Categories that
+           rarely change (outputs and panel) are queried only when due (see `set_refresh_policies()`),
+           and the previous values are kept in the inventory otherwise.
         2. Filters the retrieved sectors and inputs to categorize them based on their status.
-        3. Updates the last known IDs for sectors and inputs.
+        3. Updates the last known IDs of the queried categories.
         4. Updates internal state for sectors' and inputs' statuses.
 
+        Updates are single-flight: a caller that invokes this method while another update is in
+        progress (e.g. a service call during the scheduled refresh) doesn't query the backend again,
+        but waits for the in-flight update and gets its result (or its exception). In this way
+        executor threads don't race on `_inventory` and `_last_ids`.
+
         Returns:
             dict: A dictionary containing the latest retrieved inventory.
 
@@ -273,21 +747,44 @@ class AlarmDevice:
             ParseError: If there's an error while parsing the response.
 
         Attributes updated:
-            _last_ids (dict): Updated last known IDs for sectors and inputs.
+            _last_ids (dict): Updated last known IDs of the queried categories.
             state (str): Updated internal state of the device.
         """
-        # Retrieve sectors and inputs
+        with self._update_lock:
+            flight = self._update_flight
+            leader = flight is None
+            if flight is None:
+                flight = self._update_flight = Future()
+
+        if not leader:
+            return flight.result()
+
+        try:
+            with self._inventory_lock:
+                result = self._update()
+        except BaseException as err:
+            flight.set_exception(err)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._update_lock:
+                self._update_flight = None
+
+    def _update(self):
+        """Query the backend and update the inventory. Use `update()` to run it as a single-flight update."""
+        # Retrieve the categories due for a refresh. Changes reported by the last poll are consumed
+        # here, so that an update not triggered by the long-polling queries all categories.
+        queries = self._update_queries()
+        self._changes = None
         try:
-            sectors = self._connection.query(q.SECTORS)
-            inputs = self._connection.query(q.INPUTS)
-            outputs = self._connection.query(q.OUTPUTS)
-            alerts = self._connection.query(q.ALERTS)
-            panel = self._connection.query(q.PANEL)
+            results = {query: self._query(query) for query in queries}
         except HTTPError as err:
-            _LOGGER.error(f"Device | Error during the update: {err.response.text}")
+            self._log.error("Device | Error during the update: %s", ResponseText(err))
             raise err
         except ParseError as err:
-            _LOGGER.error(f"Device | Error during the update: {err}")
+            self._log.error("Device | Error during the update: %s", err)
             raise err
         except DeviceDisconnectedError as err:
             self.connected = False
@@ -295,39 +792,106 @@ class AlarmDevice:
 
         # `last_id` equal to 1 means the connection has been reset and the update
         # is an empty state. See: https://github.com/palazzem/ha-econnect-alarm/issues/148
-        if sectors.get("last_id") == 1:
-            _LOGGER.debug("Device | The connection has been reset, skipping the update")
+        if results[q.SECTORS].get("last_id") == 1:
+            self._log.debug("Device | The connection has been reset, skipping the update")
             return self._inventory
 
-        # Update the _inventory
+        # Update the _inventory and the _last_ids. Categories that are not queried keep their previous values.
         self.connected = True
-        self._inventory.update({q.SECTORS: sectors["sectors"]})
-        self._inventory.update({q.INPUTS: inputs["inputs"]})
-        self._inventory.update({q.OUTPUTS: outputs["outputs"]})
-        self._inventory.update({q.ALERTS: alerts["alerts"]})
-        self._inventory.update({q.PANEL: panel["panel"]})
-
-        # Update the _last_ids
-        self._last_ids[q.SECTORS] = sectors.get("last_id", 0)
-        self._last_ids[q.INPUTS] = inputs.get("last_id", 0)
-        self._last_ids[q.OUTPUTS] = outputs.get("last_id", 0)
-        self._last_ids[q.ALERTS] = alerts.get("last_id", 0)
-        self._last_ids[q.PANEL] = panel.get("last_id", 0)
-
-        # Filter out the sectors that are not managed
-        # NOTE: this change is internal and not exposed to users as the feature is experimental. Further
-        # development requires that users can register multiple devices and alarm panels to control
-        # sectors in a more granular way. See: https://github.com/palazzem/ha-econnect-alarm/issues/95
-        if self._managed_sectors:
-            self._inventory[q.SECTORS] = {
-                k: v for k, v in self._inventory[q.SECTORS].items() if v["element"] in self._managed_sectors
-            }
+        self._update_count += 1
+        self._confirm_data(results)
+        for query, data in results.items():
+            if query == q.INPUTS:
+                self._set_inputs(data[UPDATE_KEYS[query]])
+            elif query == q.SECTORS:
+                self._set_sectors(data[UPDATE_KEYS[query]])
+            else:
+                self._inventory[query] = data[UPDATE_KEYS[query]]
+            self._last_ids[query] = data.get("last_id", 0)
+
+        # Measure how long it took to confirm previously sent commands
+        self._confirm_commands()
+        self._reconcile()
 
         # Update the internal state machine (mapping state)
         self.state = self.get_state()
 
+        # Report errors suppressed during an outage, now that the backend is reachable
+        self._log.flush()
         return self._inventory
 
+    @profiled
+    def refresh(self, query):
+        """Refresh a single category of the inventory, without running a full update.
+
+        This method is used right after a command to learn its outcome with one request, instead of
+        querying all categories. The last known ID of the category is updated as well, so that the
+        long-polling doesn't report the same change again.
+
+        Args:
+            query (int): The query index of the category (e.g. `q.SECTORS` or `q.OUTPUTS`).
+
+        A refresh that starts while a full update is in progress waits for it, so that they don't
+        race on `_inventory` and `_last_ids`.
+
+        Returns:
+            bool: True if no optimistic status is still waiting for a confirmation in this category.
+
+        Raises:
+            HTTPError: If there's an error while making the HTTP request.
+            ParseError: If there's an error while parsing the response.
+        """
+        with self._inventory_lock:
+            return self._refresh(query)
+
+    def _refresh(self, query):
+        """Query a single category and update the inventory. Use `refresh()` to run it under the inventory lock."""
+        try:
+            data = self._query(query)
+        except HTTPError as err:
+            self._log.error("Device | Error during the refresh: %s", ResponseText(err))
+            raise err
+        except ParseError as err:
+            self._log.error("Device | Error during the refresh: %s", err)
+            raise err
+        except DeviceDisconnectedError as err:
+            self.connected = False
+            raise err
+
+        # `last_id` equal to 1 means the connection has been reset (see `update()`)
+        if data.get("last_id") == 1:
+            self._log.debug("Device | The connection has been reset, skipping the refresh")
+            return not self.is_pending(query)
+
+        self.connected = True
+        self._confirm_data([query])
+        items = data[REFRESH_KEYS[query]]
+        if query == q.INPUTS:
+            self._set_inputs(items)
+        elif query == q.SECTORS:
+            self._set_sectors(items)
+        else:
+            self._inventory[query] = items
+        self._last_ids[query] = data.get("last_id", 0)
+
+        self._confirm_commands()
+        self._reconcile()
+        self.state = self.get_state()
+        return not self.is_pending(query)
+
+    def is_pending(self, query):
+        """Check if an optimistic status is still waiting for a confirmation in the given category.
+
+        Args:
+            query (int): The query index of the category (e.g. `q.SECTORS` or `q.OUTPUTS`).
+
+        Returns:
+            bool: True if at least one item of the category has an unconfirmed optimistic status.
+        """
+        return any(optimistic_query == query for optimistic_query, _ in self._optimistic)
+
+    @profiled
+    @command_metrics
     def arm(self, code, sectors=None):
         try:
             # Detect if the user is trying to arm a system that requires a user ID
@@ -336,21 +900,29 @@ class AlarmDevice:
             else:
                 user_id = 1
 
+            dispatched_at = time.monotonic()
             with self._connection.lock(code, user_id=user_id):
                 self._connection.arm(sectors=sectors)
+
+            # Arming without sectors arms the whole system
+            elements = sectors or [sector["element"] for _, sector in self.items(q.SECTORS)]
+            self._track_command(q.SECTORS, elements, True, dispatched_at)
+            self._set_optimistic(q.SECTORS, elements, True)
         except HTTPError as err:
-            _LOGGER.error(f"Device | Error while arming the system: {err.response.text}")
+            _LOGGER.error("Device | Error while arming the system: %s", ResponseText(err))
             raise err
         except LockError as err:
-            _LOGGER.error(f"Device | Error while acquiring the system lock: {err}")
+            _LOGGER.error("Device | Error while acquiring the system lock: %s", err)
             raise err
         except CodeError as err:
-            _LOGGER.error(f"Device | Credentials (alarm code) is incorrect: {err}")
+            _LOGGER.error("Device | Credentials (alarm code) is incorrect: %s", err)
             raise err
         except CommandError as err:
-            _LOGGER.error(f"Device | Error while arming the system: {err}")
+            _LOGGER.error("Device | Error while arming the system: %s", err)
             raise err
 
+    @profiled
+    @command_metrics
     def disarm(self, code, sectors=None):
         try:
             # Detect if the user is trying to arm a system that requires a user ID
@@ -361,23 +933,35 @@ class AlarmDevice:
 
             # Detect which sectors should be disarmed
             if sectors is None:
-                sectors = [sector["element"] for _, sector in self.items(q.SECTORS, status=True)]
+                sectors = [
+                    sector["element"]
+                    for sector_id, sector in self.items(q.SECTORS)
+                    if self.get_status(q.SECTORS, sector_id)
+                ]
 
+            dispatched_at = time.monotonic()
             with self._connection.lock(code, user_id=user_id):
                 self._connection.disarm(sectors=sectors)
+
+            # Disarming without sectors disarms the whole system
+            elements = sectors or [sector["element"] for _, sector in self.items(q.SECTORS)]
+            self._track_command(q.SECTORS, elements, False, dispatched_at)
+            self._set_optimistic(q.SECTORS, elements, False)
         except HTTPError as err:
-            _LOGGER.error(f"Device | Error while disarming the system: {err.response.text}")
+            _LOGGER.error("Device | Error while disarming the system: %s", ResponseText(err))
             raise err
         except LockError as err:
-            _LOGGER.error(f"Device | Error while acquiring the system lock: {err}")
+            _LOGGER.error("Device | Error while acquiring the system lock: %s", err)
             raise err
         except CodeError as err:
-            _LOGGER.error(f"Device | Credentials (alarm code) is incorrect: {err}")
+            _LOGGER.error("Device | Credentials (alarm code) is incorrect: %s", err)
             raise err
         except CommandError as err:
-            _LOGGER.error(f"Device | Error while disarming the system: {err}")
+            _LOGGER.error("Device | Error while disarming the system: %s", err)
             raise err
 
+    @profiled
+    @command_metrics
     def turn_off(self, output):
         """
         Turn off a specified output.
@@ -407,29 +991,36 @@ class AlarmDevice:
             # If the output isn't manual controllable by users write an error il log
             if item.get("control_denied_to_users"):
                 _LOGGER.warning(
-                    f"Device | Error while turning off output: {item.get('name')}, Can't be manual controlled"
+                    "Device | Error while turning off output: %s, Can't be manual controlled", item.get("name")
                 )
                 _LOGGER.warning(NOTIFICATION_MESSAGE)
                 break
 
             # If the output require authentication for control write an error il log
             if not item.get("do_not_require_authentication"):
-                _LOGGER.warning(f"Device | Error while turning off output: {item.get('name')}, Required authentication")
+                _LOGGER.warning(
+                    "Device | Error while turning off output: %s, Required authentication", item.get("name")
+                )
                 _LOGGER.warning(NOTIFICATION_MESSAGE)
                 break
 
             try:
                 element_id = item.get("element")
+                dispatched_at = time.monotonic()
                 self._connection.turn_off(element_id)
+                self._track_command(q.OUTPUTS, [element_id], False, dispatched_at)
+                self._set_optimistic(q.OUTPUTS, [element_id], False)
                 return True
             except HTTPError as err:
-                _LOGGER.error(f"Device | Error while turning off output: {err.response.text}")
+                _LOGGER.error("Device | Error while turning off output: %s", ResponseText(err))
                 raise err
             except CommandError as err:
-                _LOGGER.error(f"Device | Error while turning off output: {err}")
+                _LOGGER.error("Device | Error while turning off output: %s", err)
                 raise err
         return False
 
+    @profiled
+    @command_metrics
     def turn_on(self, output):
         """
         Turn on a specified output.
@@ -459,25 +1050,177 @@ class AlarmDevice:
             # If the output isn't manual controllable by users write an error log
             if item.get("control_denied_to_users"):
                 _LOGGER.warning(
-                    f"Device | Error while turning on output: {item.get('name')}, Can't be manual controlled"
+                    "Device | Error while turning on output: %s, Can't be manual controlled", item.get("name")
                 )
                 _LOGGER.warning(NOTIFICATION_MESSAGE)
                 break
 
             # If the output require authentication for control write an error log
             if not item.get("do_not_require_authentication"):
-                _LOGGER.warning(f"Device | Error while turning on output: {item.get('name')}, Required authentication")
+                _LOGGER.warning("Device | Error while turning on output: %s, Required authentication", item.get("name"))
                 _LOGGER.warning(NOTIFICATION_MESSAGE)
                 break
 
             try:
                 element_id = item.get("element")
+                dispatched_at = time.monotonic()
                 self._connection.turn_on(element_id)
+                self._track_command(q.OUTPUTS, [element_id], True, dispatched_at)
+                self._set_optimistic(q.OUTPUTS, [element_id], True)
                 return True
             except HTTPError as err:
-                _LOGGER.error(f"Device | Error while turning on outputs: {err.response.text}")
+                _LOGGER.error("Device | Error while turning on outputs: %s", ResponseText(err))
                 raise err
             except CommandError as err:
-                _LOGGER.error(f"Device | Error while turning on outputs: {err}")
+                _LOGGER.error("Device | Error while turning on outputs: %s", err)
                 raise err
         return False
+
+    @profiled
+    def turn_outputs(self, commands):
+        """
+        Turn on or off multiple outputs, sending commands in order through the same connection.
+
+        Args:
+            commands: A list of `(output, status)` tuples, where `output` is the ID of the output
+                and `status` is True to turn it on, or False to turn it off.
+
+        Returns:
+            list: The result of each command, in the same order. A result is either the value returned
+                by `turn_on()`/`turn_off()`, or the exception raised while sending the command.
+
+        Example:
+            To turn on the output '1' and turn off the output '2', use:
+            >>> device_instance.turn_outputs([(1, True), (2, False)])
+            [True, True]
+        """
+        results = []
+        for output, status in commands:
+            try:
+                results.append(self.turn_on(output) if status else self.turn_off(output))
+            except Exception as err:
+                # A failing command must not prevent the others from being sent
+                results.append(err)
+        return results
+
+    def _run_step(self, action, targets):
+        """Send a single command of a sequence. A system lock must be already acquired.
+
+        Args:
+            action (str): One of the `SEQUENCE_ACTIONS`.
+            targets (list): The sector or output elements targeted by the command.
+
+        Returns:
+            tuple: The query index and the status expected for the targets once the command is applied.
+
+        Raises:
+            CommandError: If an output can't be manually controlled by users.
+        """
+        if action in ("arm", "disarm"):
+            command = self._connection.arm if action == "arm" else self._connection.disarm
+            command(sectors=targets)
+            return q.SECTORS, action == "arm"
+
+        for element in targets:
+            item = next((item for _, item in self.items(q.OUTPUTS) if item.get("element") == element), None)
+            if item is None or item.get("control_denied_to_users"):
+                raise CommandError(f"Output {element} can't be manually controlled")
+
+            command = self._connection.turn_on if action == "turn_on" else self._connection.turn_off
+            command(element)
+        return q.OUTPUTS, action == "turn_on"
+
+    @profiled
+    @command_metrics
+    def run_sequence(self, code, steps, rollback=True):
+        """Run multiple arm, disarm and output commands within a single lock session.
+
+        Steps are executed in order and the sequence stops at the first failure. If `rollback` is
+        enabled, completed steps are reverted (newest first) within the same lock session. Only
+        targets that were not already in the expected status are reverted, so that a rollback
+        never changes items that were not modified by the sequence.
+
+        Args:
+            code (str): The alarm code used to acquire the lock.
+            steps (list): A list of steps in the format `{"action": "disarm", "sectors": [2]}` or
+                `{"action": "turn_on", "output": 5}`, where sectors and outputs are elements.
+            rollback (bool): Revert completed steps if a step fails.
+
+        Returns:
+            dict: The overall outcome and the result of each step.
+
+        Raises:
+            LockError: If the system lock can't be acquired. No steps are executed.
+            CodeError: If the alarm code is incorrect. No steps are executed.
+
+        Example:
+            >>> device.run_sequence("1234", [{"action": "disarm", "sectors": [2]}, {"action": "turn_on", "output": 5}])
+            {'success': True, 'rolled_back': False, 'steps': [{'step': 0, 'action': 'disarm', 'success': True}, ...]}
+        """
+        results = [{"step": index, "action": step["action"], "success": False} for index, step in enumerate(steps)]
+        completed = []
+        rolled_back = False
+        try:
+            # Detect if the user is trying to arm a system that requires a user ID
+            if not self.panel.get("login_without_user_id", True):
+                user_id, code = split_code(code)
+            else:
+                user_id = 1
+
+            with self._connection.lock(code, user_id=user_id):
+                for result, step in zip(results, steps):
+                    action = step["action"]
+                    query = q.SECTORS if action in ("arm", "disarm") else q.OUTPUTS
+                    targets = step["sectors"] if query == q.SECTORS else [step["output"]]
+                    expected = action in ("arm", "turn_on")
+                    # Keep track of targets that are changed by this step, to revert only them
+                    changed = [
+                        item["element"]
+                        for _, item in self.items(query)
+                        if item.get("element") in targets and item.get("status") != expected
+                    ]
+                    try:
+                        dispatched_at = time.monotonic()
+                        self._run_step(action, targets)
+                        self._track_command(query, targets, expected, dispatched_at)
+                        self._set_optimistic(query, targets, expected)
+                        result["success"] = True
+                        completed.append((result, action, changed))
+                    except Exception as err:
+                        _LOGGER.error("Device | Error while running step %s (%s): %s", result["step"], action, err)
+                        result["error"] = str(err) or type(err).__name__
+                        break
+
+                # Steps after a failure are never executed
+                for result in results:
+                    if not result["success"] and "error" not in result:
+                        result["skipped"] = True
+
+                if rollback and len(completed) < len(steps):
+                    rolled_back = True
+                    for result, action, changed in reversed(completed):
+                        try:
+                            if changed:
+                                query, status = self._run_step(SEQUENCE_ACTIONS[action], changed)
+                                self._set_optimistic(query, changed, status)
+                            result["rolled_back"] = True
+                        except Exception as err:
+                            _LOGGER.error(
+                                "Device | Error while rolling back step %s (%s): %s", result["step"], action, err
+                            )
+                            result["rolled_back"] = False
+        except HTTPError as err:
+            _LOGGER.error("Device | Error while running the command sequence: %s", ResponseText(err))
+            raise err
+        except LockError as err:
+            _LOGGER.error("Device | Error while acquiring the system lock: %s", err)
+            raise err
+        except CodeError as err:
+            _LOGGER.error("Device | Credentials (alarm code) is incorrect: %s", err)
+            raise err
+
+        return {
+            "success": len(completed) == len(steps),
+            "rolled_back": rolled_back,
+            "steps": results,
+        }
@@ -0,0 +1,23 @@
+"""Diagnostics support for the E-connect Alarm integration."""
+
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, KEY_DEVICE
+from .helpers import poll_scheduler
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    """Return diagnostics for a config entry, including the recent transitions history and its poll schedule."""
+    device = hass.data[DOMAIN][entry.entry_id][KEY_DEVICE]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "history": device.history(),
+        "schedule": poll_scheduler(hass).slots(entry.entry_id),
+    }
@@ -1,14 +1,45 @@
 import logging
-from typing import List, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
 import voluptuous as vol
 from elmo.api.exceptions import CodeError
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_USERNAME
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.config_validation import multi_select
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util import slugify
+from requests.adapters import HTTPAdapter
 
-from .const import CONF_SYSTEM_NAME, DOMAIN
+from .const import (
+    CONF_DOMAIN,
+    CONF_EXPERIMENTAL,
+    CONF_FORCE_UPDATE,
+    CONF_SYSTEM_NAME,
+    CONF_SYSTEM_URL,
+    DOMAIN,
+    HTTP_POOL_SIZE,
+    KEY_FLOW_DEVICES,
+    KEY_HTTP_ADAPTER,
+    KEY_SCHEDULER,
+    KEY_SECTOR_INDEX,
+)
+from .scheduler import PollScheduler
+
+if TYPE_CHECKING:
+    from .devices import AlarmDevice
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -75,7 +106,10 @@ def generate_entity_id(config: ConfigEntry, name: Union[str, None] = None) -> st
     """
     # Retrieve the system name or username from the ConfigEntry
     system_name = config.data.get(CONF_SYSTEM_NAME) or config.data.get(CONF_USERNAME)
+    return _entity_id(system_name, name)
+
 
+def _entity_id(system_name: Optional[str], name: Union[str, None] = None) -> str:
     # Default to empty string if a name is not provided
     additional_name = name or ""
 
@@ -87,6 +121,100 @@ def generate_entity_id(config: ConfigEntry, name: Union[str, None] = None) -> st
     return f"{DOMAIN}.{DOMAIN}_{entity_name}"
 
 
+class EntityFactory:
+    """Create the entities of a platform in bulk, computing the settings shared by all of them once.
+
+    Entity IDs, unique IDs and experimental settings depend on the configuration entry and on
+    `hass.data`, that don't change while a platform is set up. The factory reads them once, so
+    that panels with thousands of inputs don't repeat the same lookups in each entity constructor.
+
+    Usage:
+        factory = EntityFactory(entry, coordinator, device)
+        sensors = factory.create(InputBinarySensor, device.inputs, q.INPUTS)
+
+    Args:
+        config: The configuration entry that owns the entities.
+        coordinator: The coordinator shared by the entities.
+        device: The `AlarmDevice` shared by the entities.
+    """
+
+    def __init__(self, config: ConfigEntry, coordinator: DataUpdateCoordinator, device: "AlarmDevice") -> None:
+        self.config = config
+        self.coordinator = coordinator
+        self.device = device
+
+        # Enable experimental settings from the configuration file
+        experimental = coordinator.hass.data[DOMAIN].get(CONF_EXPERIMENTAL, {})
+        self.force_update = experimental.get(CONF_FORCE_UPDATE, False)
+
+        self._system_name = config.data.get(CONF_SYSTEM_NAME) or config.data.get(CONF_USERNAME)
+        self._system_slug = slugify(self._system_name)
+        self._unique_id_prefix = f"{config.entry_id}_{DOMAIN}"
+
+    def entity_id(self, name: Union[str, None] = None) -> str:
+        """Return the same entity ID of `generate_entity_id()`, slugifying only the entity name.
+
+        Slugify collapses separators and strips them from both ends, so slugifying the system name
+        and the entity name apart and joining them gives the same result of slugifying them together.
+        Names that slugify to an empty string (or to `unknown`) use the full computation.
+        """
+        name_slug = slugify(name)
+        if self._system_slug in ("", "unknown") or name_slug in ("", "unknown"):
+            return _entity_id(self._system_name, name)
+        return f"{DOMAIN}.{DOMAIN}_{self._system_slug}_{name_slug}"
+
+    def unique_id(self, *parts: Any) -> str:
+        """Return the unique ID of an entity, made by the entry ID, the domain and the given parts.
+
+        Example:
+            >>> factory.unique_id(q.INPUTS, 3)
+            "01J0..._econnect_metronet_10_3"
+        """
+        return "_".join([self._unique_id_prefix, *(str(part) for part in parts)])
+
+    def create(
+        self, entity_class: Type[Entity], items: Iterable[Tuple[int, str]], query: Optional[int] = None
+    ) -> List[Entity]:
+        """Create an entity of `entity_class` for each item.
+
+        Args:
+            entity_class: The entity class, constructed with the signature shared by all e-Connect entities.
+            items: `(item_id, name)` tuples, as returned by `AlarmDevice.inputs` and similar properties.
+            query: The category of the items, used in the unique ID with the item ID. If not provided,
+                the unique ID is made by the item name (e.g. alerts).
+
+        Returns:
+            The list of entities, ready for `async_add_entities()`.
+        """
+        entities = []
+        for item_id, name in items:
+            unique_id = self.unique_id(name) if query is None else self.unique_id(query, item_id)
+            # e-Connect entities share a constructor signature that `Entity` doesn't declare
+            entity = entity_class(
+                unique_id, item_id, self.config, name, self.coordinator, self.device, factory=self
+            )  # type: ignore[call-arg]
+            entities.append(entity)
+        return entities
+
+
+class StaleStateMixin(Entity):
+    """Make an entity unavailable when the data of its category is older than the stale-state TTL.
+
+    Entities set `stale_query` to the query index of their category (e.g. `q.SECTORS`). Entities
+    with a status that is not reported by the backend keep it to `None`, so they are never stale.
+    """
+
+    stale_query: Optional[int] = None
+    _device: "AlarmDevice"
+
+    @property
+    def available(self) -> bool:
+        """Return False if the data of the entity category is older than the stale-state TTL."""
+        if self.stale_query is None:
+            return super().available
+        return super().available and not self._device.is_stale(self.stale_query)
+
+
 def split_code(code: str) -> Tuple[str, str]:
     """Splits the given code into two parts: user ID and code.
 
@@ -116,3 +244,87 @@ def split_code(code: str) -> Tuple[str, str]:
         raise CodeError("Both user ID and code must be numbers.")
 
     return user_id_part, code_part
+
+
+def sector_index(hass: HomeAssistant) -> Dict[str, Tuple[str, int]]:
+    """Return the index of sector entities shared by all configuration entries.
+
+    The index maps the object ID of a sector entity (the part after the dot) to the
+    configuration entry that owns it and the sector `element` used to arm/disarm it, so
+    that services can resolve targets of different alarm panels with a single lookup.
+
+    Args:
+        hass: The Home Assistant instance.
+
+    Returns:
+        A dictionary in the format `{object_id: (entry_id, element)}`.
+
+    Example:
+        >>> sector_index(hass)
+        {"econnect_metronet_seaside_home_s1_living_room": ("01J0...", 1)}
+    """
+    return hass.data[DOMAIN].setdefault(KEY_SECTOR_INDEX, {})
+
+
+def flow_devices(hass: HomeAssistant) -> Dict[Tuple[Optional[str], Optional[str], Optional[str]], Any]:
+    """Return the devices connected by the config flow, waiting for their config entry setup.
+
+    The config flow validates credentials by connecting an `AlarmDevice` and fetching its inventory.
+    The device is stored here, so that the first setup of the entry can reuse the session and
+    the inventory instead of authenticating and updating again. The setup removes the device before
+    using it, even if the setup fails; devices never picked by a setup are discarded after `FLOW_DEVICE_TTL`.
+
+    Args:
+        hass: The Home Assistant instance.
+
+    Returns:
+        A dictionary in the format `{(system_url, domain, username): device}`. Use `flow_device_key()`
+        to build the key from the entry data.
+    """
+    return hass.data.setdefault(DOMAIN, {}).setdefault(KEY_FLOW_DEVICES, {})
+
+
+def flow_device_key(data: Mapping[str, Any]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Return the key used to match a device connected by the config flow with its config entry data."""
+    return (data.get(CONF_SYSTEM_URL), data.get(CONF_DOMAIN), data.get(CONF_USERNAME))
+
+
+def poll_scheduler(hass: HomeAssistant) -> PollScheduler:
+    """Return the scheduler shared by the coordinators of all configuration entries.
+
+    Args:
+        hass: The Home Assistant instance.
+
+    Returns:
+        The `PollScheduler` stored in `hass.data[DOMAIN]`, created on first use.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if KEY_SCHEDULER not in domain_data:
+        domain_data[KEY_SCHEDULER] = PollScheduler()
+    return domain_data[KEY_SCHEDULER]
+
+
+def shared_connections(hass: HomeAssistant, client: Any) -> Any:
+    """Make an `ElmoClient` use the HTTP connection pool shared by all configuration entries.
+
+    The e-Connect cloud service binds the access token (and the web login cookies) to a single
+    panel domain, so each `ElmoClient` keeps its own session and authenticates on its own. The
+    session transport is replaced by an adapter shared by all clients: a single `HTTPAdapter` is
+    created for each Home Assistant instance and the same object is mounted on every session, so
+    panels of the same site reuse open TLS connections to the cloud service instead of opening their own.
+
+    Args:
+        hass: The Home Assistant instance.
+        client: The `ElmoClient` to configure.
+
+    Returns:
+        The same client, so that the call can wrap the client construction.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if KEY_HTTP_ADAPTER not in domain_data:
+        domain_data[KEY_HTTP_ADAPTER] = HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE)
+
+    adapter = domain_data[KEY_HTTP_ADAPTER]
+    client._session.mount("https://", adapter)
+    client._session.mount("http://", adapter)
+    return client
@@ -0,0 +1,113 @@
+"""Logging helpers used on the polling paths of the integration."""
+
+import logging
+import time
+from typing import Any, Callable, Dict, List
+
+from .const import LOG_THROTTLE_INTERVAL
+
+
+class ThrottledLogger:
+    """Wrap a `logging.Logger` to limit how often the same message is logged.
+
+    Messages use lazy `%`-style formatting, so arguments are formatted only when the record is
+    emitted. Warnings and errors are rate limited by their message template: within `interval`
+    seconds only the first occurrence is logged, while the following ones are counted. The next
+    occurrence after the interval reports how many similar messages were suppressed, and `flush()`
+    reports pending counts (e.g. when the backend is reachable again). Debug and info messages are
+    never throttled, as they are filtered by the log level.
+
+    Usage:
+        log = ThrottledLogger(logging.getLogger(__name__))
+        log.error("Device | Error while polling for updates: %s", ResponseText(err))
+        log.flush()
+
+    Args:
+        logger: The logger used to emit records.
+        interval: Minimum time (in seconds) between two records with the same message template.
+        clock: Function that returns the current time, used to measure the interval.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        interval: float = LOG_THROTTLE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.logger = logger
+        self.interval = interval
+        self._clock = clock
+        # Throttled templates, stored as `{msg: [emitted_at, suppressed, level, args]}`
+        self._messages: Dict[str, List[Any]] = {}
+
+    def debug(self, msg: str, *args: Any) -> None:
+        """Log a debug message, formatted only if the level is enabled."""
+        self.logger.debug(msg, *args)
+
+    def info(self, msg: str, *args: Any) -> None:
+        """Log an info message, formatted only if the level is enabled."""
+        self.logger.info(msg, *args)
+
+    def warning(self, msg: str, *args: Any) -> None:
+        """Log a warning, unless the same template has been logged within the interval."""
+        self._log(logging.WARNING, msg, args)
+
+    def error(self, msg: str, *args: Any) -> None:
+        """Log an error, unless the same template has been logged within the interval."""
+        self._log(logging.ERROR, msg, args)
+
+    def _log(self, level: int, msg: str, args: tuple) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+
+        now = self._clock()
+        state = self._messages.get(msg)
+        if state is not None and now - state[0] < self.interval:
+            state[1] += 1
+            state[3] = args
+            return
+
+        suppressed = state[1] if state is not None else 0
+        self._messages[msg] = [now, 0, level, args]
+        if suppressed:
+            self.logger.log(level, msg + " (suppressed %d similar messages)", *args, suppressed)
+        else:
+            self.logger.log(level, msg, *args)
+
+    def flush(self) -> None:
+        """Report messages suppressed since their last record.
+
+        Templates are still throttled until their interval expires, so that intermittent errors
+        don't flood the log.
+        """
+        for msg, state in self._messages.items():
+            _, suppressed, level, args = state
+            if suppressed:
+                self.logger.log(level, "Suppressed %d similar messages, last one: " + msg, suppressed, *args)
+                state[1] = 0
+
+
+class ResponseText:
+    """Log argument that renders the body of the response attached to a `requests` error.
+
+    The body is read only when the record is formatted, so records dropped by the log level or by
+    `ThrottledLogger` don't decode it. Errors without a response (e.g. raised before the request is
+    sent) are rendered with their message.
+
+    Usage:
+        _LOGGER.error("Device | Error during the update: %s", ResponseText(err))
+
+    Args:
+        err: The error raised by the client.
+    """
+
+    __slots__ = ("_err",)
+
+    def __init__(self, err: Exception) -> None:
+        self._err = err
+
+    def __str__(self) -> str:
+        response = getattr(self._err, "response", None)
+        if response is None:
+            return str(self._err)
+        return response.text
@@ -0,0 +1,173 @@
+"""Lightweight instrumentation primitives used by the integration."""
+
+import bisect
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from elmo import query as q
+
+from .const import QUERY_LATENCY_BUCKETS
+
+# Labels of a sample, as a tuple of `(name, value)` pairs. Call sites use constant tuples, so that
+# recording a sample doesn't allocate new objects.
+Labels = Tuple[Tuple[str, str], ...]
+
+# Metrics exported in the Prometheus text format, mapped to their type and description
+METRICS = {
+    "econnect_metronet_poll_cycles_total": ("counter", "Long-polling requests completed."),
+    "econnect_metronet_poll_changes_total": ("counter", "Long-polling requests that reported changes."),
+    "econnect_metronet_poll_has_changes_ratio": ("gauge", "Ratio of long-polling requests that reported changes."),
+    "econnect_metronet_query_duration_seconds": ("histogram", "Duration of requests to the cloud service."),
+    "econnect_metronet_auth_total": ("counter", "Authentications (including access token refreshes) by outcome."),
+    "econnect_metronet_commands_total": ("counter", "Commands sent to the alarm panel by type and outcome."),
+    "econnect_metronet_command_latency_seconds": ("histogram", "Time between a command and its confirmation."),
+    "econnect_metronet_coordinator_cycles_total": ("counter", "Coordinator update cycles by result."),
+    "econnect_metronet_disconnections_total": ("counter", "Update cycles that found the central unit disconnected."),
+    "econnect_metronet_inventory_items": ("gauge", "Items stored in the inventory by category."),
+}
+
+# Inventory categories, mapped to the label used in the exported metrics
+CATEGORY_LABELS = {
+    q.SECTORS: "sectors",
+    q.INPUTS: "inputs",
+    q.OUTPUTS: "outputs",
+    q.ALERTS: "alerts",
+}
+
+# Labels of the request duration histogram, for each query and for the long-polling
+QUERY_LABELS = {query: (("query", label),) for query, label in {**CATEGORY_LABELS, q.PANEL: "panel"}.items()}
+POLL_LABELS = (("query", "poll"),)
+
+
+class Histogram:
+    """Histogram with fixed upper bounds, used to track the distribution of observed values.
+
+    Observing a value costs a binary search over the bucket bounds, so the histogram can be
+    used on hot paths. Buckets are exported as cumulative counts, following the same semantics
+    of Prometheus histograms.
+
+    Usage:
+        histogram = Histogram([1, 5, 10])
+        histogram.observe(3.2)
+        histogram.as_dict()
+        # {"buckets": {"1": 0, "5": 1, "10": 1, "+Inf": 1}, "count": 1, "sum": 3.2}
+    """
+
+    def __init__(self, buckets: Iterable[Union[int, float]]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record a new value in the histogram."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> Dict:
+        """Return cumulative bucket counts, the number of observations and their sum."""
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+class Metrics:
+    """Registry of counters and histograms of an alarm panel, exported in the Prometheus text format.
+
+    Recording a sample costs a dictionary lookup (and a binary search for histograms), so it can be
+    used on polling and command paths. Samples are recorded without locks: as increments can be
+    lost only when two threads record the same sample at the same time, counters may be slightly
+    underestimated but they never decrease.
+
+    Usage:
+        metrics = Metrics()
+        metrics.inc("econnect_metronet_auth_total", (("outcome", "success"),))
+        metrics.observe("econnect_metronet_query_duration_seconds", 0.2, (("query", "sectors"),))
+    """
+
+    def __init__(self) -> None:
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1) -> None:
+        """Increment a counter."""
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = (), buckets=QUERY_LATENCY_BUCKETS) -> None:
+        """Record a value in a histogram, created with the given buckets at its first sample."""
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def counter(self, name: str, labels: Labels = ()) -> float:
+        """Return the value of a counter, or 0 if it has never been incremented."""
+        return self.counters.get((name, labels), 0)
+
+
+def _format_labels(labels: Iterable[Tuple[str, Any]]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def collect(entry_id: str, device) -> List[Tuple[str, Labels, float]]:
+    """Return the samples of an alarm panel as `(name, labels, value)` tuples, labelled with its entry.
+
+    Counters and histograms are read from `device.metrics`, while gauges (e.g. inventory sizes) are
+    computed from the device state, so that they don't cost anything between two scrapes.
+    """
+    entry = (("entry_id", entry_id),)
+    metrics = device.metrics
+    samples = [(name, entry + labels, value) for (name, labels), value in list(metrics.counters.items())]
+
+    polls = metrics.counter("econnect_metronet_poll_cycles_total")
+    changes = metrics.counter("econnect_metronet_poll_changes_total")
+    samples.append(("econnect_metronet_poll_has_changes_ratio", entry, changes / polls if polls else 0))
+
+    histograms = list(metrics.histograms.items())
+    histograms.append((("econnect_metronet_command_latency_seconds", ()), device.command_latency))
+    for (name, labels), histogram in histograms:
+        data = histogram.as_dict()
+        for bound, count in data["buckets"].items():
+            samples.append((f"{name}_bucket", entry + labels + (("le", bound),), count))
+        samples.append((f"{name}_count", entry + labels, data["count"]))
+        samples.append((f"{name}_sum", entry + labels, data["sum"]))
+
+    for query, label in CATEGORY_LABELS.items():
+        items = sum(1 for _ in device.items(query))
+        samples.append(("econnect_metronet_inventory_items", entry + (("category", label),), items))
+    return samples
+
+
+def render(devices: Dict[str, Any]) -> str:
+    """Render the samples of all alarm panels in the Prometheus text exposition format (version 0.0.4).
+
+    Args:
+        devices: The `AlarmDevice` of each config entry, as `{entry_id: device}`.
+    """
+    families: Dict[str, List[str]] = {}
+    for entry_id, device in devices.items():
+        for name, labels, value in collect(entry_id, device):
+            family = next(
+                (metric for metric in (name, name.rsplit("_", 1)[0]) if metric in METRICS),
+                name,
+            )
+            families.setdefault(family, []).append(f"{name}{_format_labels(labels)} {value}")
+
+    lines = []
+    for family, samples in families.items():
+        kind, description = METRICS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,140 @@
+"""On-demand profiler of coordinator cycles and device commands."""
+
+import asyncio
+import cProfile
+import pstats
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Function key used by `pstats`, in the format `(filename, line, function)`
+Function = Tuple[str, int, str]
+
+
+def _function_name(function: Function) -> str:
+    """Format a function key like `pstats` does (e.g. `devices.py:702(update)` or `{built-in method ...}`)."""
+    filename, line, name = function
+    if (filename, line) == ("~", 0):
+        # Built-in functions
+        return f"{{{name[1:-1]}}}" if name.startswith("<") and name.endswith(">") else name
+    return f"{filename}:{line}({name})"
+
+
+class CycleProfiler:
+    """Collect `cProfile` statistics of device calls until a number of coordinator cycles is completed.
+
+    Only device calls that run in the executor (full updates, single category refreshes and commands)
+    are profiled, so the event loop is never instrumented by this class. The long-polling is not
+    profiled as it's spent waiting for the backend. Each call gets its own `cProfile.Profile` and the
+    statistics are merged when the call returns. As the interpreter allows a single active profiler
+    (and since Python 3.12 it observes all threads), calls are profiled one at a time: calls that
+    start while another one is profiled, or while another profiling tool is active, run as usual and
+    are counted as skipped.
+
+    Usage:
+        profiler = CycleProfiler(cycles=3)
+        device.profiler = profiler
+        await profiler.done.wait()  # `cycle_done()` is called by the coordinator
+        device.profiler = None
+        summary = await hass.async_add_executor_job(profiler.write, "/config/profile.pstats", 20)
+
+    Args:
+        cycles: Number of coordinator cycles to profile.
+    """
+
+    def __init__(self, cycles: int) -> None:
+        self.cycles = cycles
+        self.completed = 0
+        self.calls = 0
+        self.skipped = 0
+        self.started_at = time.monotonic()
+        self.done = asyncio.Event()
+        self._lock = threading.Lock()
+        self._owner: Optional[int] = None
+        self._stats: Optional[pstats.Stats] = None
+
+    def runcall(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run `func` with the profiler enabled, if no other call is profiled at the moment."""
+        if self._owner == threading.get_ident():
+            # Nested device calls (e.g. `turn_outputs()` calling `turn_on()`) are already profiled
+            return func(*args, **kwargs)
+
+        if not self._lock.acquire(blocking=False):
+            self.skipped += 1
+            return func(*args, **kwargs)
+
+        try:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiling tool is active (e.g. the Home Assistant `profiler` integration)
+                self.skipped += 1
+                return func(*args, **kwargs)
+
+            self._owner = threading.get_ident()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._owner = None
+                self.calls += 1
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+        finally:
+            self._lock.release()
+
+    def cycle_done(self) -> None:
+        """Count a completed coordinator cycle, and set `done` once all cycles are profiled.
+
+        This method must be called from the event loop.
+        """
+        self.completed += 1
+        if self.completed >= self.cycles:
+            self.done.set()
+
+    def write(self, path: str, top: int) -> Dict[str, Any]:
+        """Dump the collected statistics to a `.pstats` file and summarize the most expensive functions.
+
+        This method blocks while writing the file, so it must run in the executor. It waits for
+        the call profiled at the moment (if any) to be merged.
+
+        Args:
+            path: The destination of the `.pstats` file. No file is written if no call was profiled.
+            top: Number of functions included in the summary, sorted by cumulative time.
+
+        Returns:
+            A dictionary with the profiled `cycles`, `calls` and `skipped` calls, the `duration` of the
+            session, the `path` of the statistics, and the `top` functions with their `calls`,
+            `total_time` (spent in the function) and `cumulative_time` (including sub-calls).
+        """
+        with self._lock:
+            stats = self._stats
+            summary: Dict[str, Any] = {
+                "cycles": self.completed,
+                "calls": self.calls,
+                "skipped": self.skipped,
+                "duration": round(time.monotonic() - self.started_at, 3),
+                "path": None,
+                "top": [],
+            }
+            if stats is None:
+                return summary
+
+            stats.dump_stats(path)
+            summary["path"] = path
+            # Raw statistics in the format `{function: (primitive_calls, calls, total, cumulative, callers)}`
+            raw: Dict[Function, Tuple[int, int, float, float, Any]] = vars(stats)["stats"]
+            entries = sorted(raw.items(), key=lambda entry: entry[1][3], reverse=True)
+            for function, (_, calls, total, cumulative, _) in entries[:top]:
+                summary["top"].append(
+                    {
+                        "function": _function_name(function),
+                        "calls": calls,
+                        "total_time": round(total, 6),
+                        "cumulative_time": round(cumulative, 6),
+                    }
+                )
+            return summary
@@ -0,0 +1,91 @@
+"""Domain-level scheduler shared by the coordinators of all config entries."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Set
+
+from .const import MAX_CONCURRENT_UPDATES, POLL_STAGGER
+
+
+class PollScheduler:
+    """Stagger the polling of all config entries and cap how many full updates run at once.
+
+    Each entry is assigned the lowest free slot when it's set up. The first refresh of an entry
+    is delayed by `slot * stagger` seconds, so that after a restart entries don't query the cloud
+    service at the same moment. As each coordinator schedules the next poll when the previous one
+    is completed, the offset is kept by steady-state polls as well. Full updates (five queries each)
+    are limited by a semaphore shared by all entries.
+
+    Usage:
+        scheduler = PollScheduler()
+        scheduler.register("entry_id")
+        await asyncio.sleep(scheduler.offset("entry_id"))
+        async with scheduler.full_update("entry_id"):
+            ...
+
+    Args:
+        max_concurrent: Maximum number of full updates running at the same time.
+        stagger: Delay (in seconds) between two consecutive slots.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_UPDATES, stagger: float = POLL_STAGGER) -> None:
+        self.max_concurrent = max_concurrent
+        self.stagger = stagger
+        self._slots: Dict[str, int] = {}
+        self._running: Set[str] = set()
+        self._waiting: Dict[str, int] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def register(self, entry_id: str) -> int:
+        """Assign the lowest free slot to the entry, or return the slot already assigned."""
+        if entry_id not in self._slots:
+            used = set(self._slots.values())
+            self._slots[entry_id] = next(slot for slot in range(len(used) + 1) if slot not in used)
+        return self._slots[entry_id]
+
+    def unregister(self, entry_id: str) -> None:
+        """Release the slot of the entry, so that it can be reused by other entries."""
+        self._slots.pop(entry_id, None)
+
+    def offset(self, entry_id: str) -> float:
+        """Return the delay (in seconds) of the first refresh of the entry. Unknown entries are not delayed."""
+        slot = self._slots.get(entry_id)
+        return 0 if slot is None else slot * self.stagger
+
+    @asynccontextmanager
+    async def full_update(self, entry_id: str):
+        """Wait until a full update can run without exceeding `max_concurrent` updates."""
+        self._waiting[entry_id] = self._waiting.get(entry_id, 0) + 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting[entry_id] -= 1
+            if not self._waiting[entry_id]:
+                del self._waiting[entry_id]
+
+        self._running.add(entry_id)
+        try:
+            yield
+        finally:
+            self._running.discard(entry_id)
+            self._semaphore.release()
+
+    def slots(self, entry_id: Optional[str] = None) -> Dict[str, Any]:
+        """Report the schedule slot of each entry, or of a single entry.
+
+        Returns:
+            A dictionary in the format `{entry_id: {"slot", "offset", "running", "waiting"}}`, or only
+            the inner dictionary when `entry_id` is provided (empty if the entry is not registered).
+        """
+        report = {
+            registered: {
+                "slot": slot,
+                "offset": self.offset(registered),
+                "running": registered in self._running,
+                "waiting": self._waiting.get(registered, 0),
+            }
+            for registered, slot in self._slots.items()
+        }
+        if entry_id is not None:
+            return report.get(entry_id, {})
+        return report
@@ -1,8 +1,13 @@
-"""Module for e-connect sensors (alert) """
+"""Module for e-connect sensors (alert)"""
 
 from elmo import query as q
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import (
@@ -11,14 +16,14 @@ from homeassistant.helpers.update_coordinator import (
 )
 
 from .const import (
-    CONF_EXPERIMENTAL,
-    CONF_FORCE_UPDATE,
+    CONF_SYSTEM_URL,
     DOMAIN,
     KEY_COORDINATOR,
     KEY_DEVICE,
+    SUPPORTED_SYSTEMS,
 )
 from .devices import AlarmDevice
-from .helpers import generate_entity_id
+from .helpers import EntityFactory, StaleStateMixin
 
 
 async def async_setup_entry(
@@ -29,24 +34,33 @@ async def async_setup_entry(
     """Set up e-connect sensors from a config entry."""
     device = hass.data[DOMAIN][entry.entry_id][KEY_DEVICE]
     coordinator = hass.data[DOMAIN][entry.entry_id][KEY_COORDINATOR]
+    factory = EntityFactory(entry, coordinator, device)
     # Load all entities and register sectors and inputs
 
     sensors = []
 
-    # Iterate through the alerts of the provided device and create AlertSensor objects
-    # only for alarm_led, inputs_led and tamper_led
-    for alert_id, name in device.alerts:
-        if name in ["alarm_led", "inputs_led", "tamper_led"]:
-            unique_id = f"{entry.entry_id}_{DOMAIN}_{q.ALERTS}_{alert_id}"
-            sensors.append(AlertSensor(unique_id, alert_id, entry, name, coordinator, device))
+    # Create AlertSensor objects only for alarm_led, inputs_led and tamper_led alerts of the provided device
+    alerts = [(alert_id, name) for alert_id, name in device.alerts if name in ["alarm_led", "inputs_led", "tamper_led"]]
+    sensors.extend(factory.create(AlertSensor, alerts, q.ALERTS))
+
+    # Diagnostic sensors to keep track of the command-to-confirmation latency, of input changes hidden
+    # by the debouncer, and of how old the last known state is
+    for sensor_class, name in (
+        (CommandLatencySensor, "last_command_latency"),
+        (SuppressedTransitionsSensor, "suppressed_transitions"),
+        (DataAgeSensor, "data_age"),
+    ):
+        sensors.append(sensor_class(factory.unique_id(name), entry, coordinator, device, factory=factory))
 
     async_add_entities(sensors)
 
 
-class AlertSensor(CoordinatorEntity, SensorEntity):
+class AlertSensor(StaleStateMixin, CoordinatorEntity, SensorEntity):
     """Representation of a e-Connect alert sensor"""
 
+    stale_query = q.ALERTS
     _attr_has_entity_name = True
+    _attr_icon = "hass:alarm-light"
 
     def __init__(
         self,
@@ -56,34 +70,131 @@ class AlertSensor(CoordinatorEntity, SensorEntity):
         name: str,
         coordinator: DataUpdateCoordinator,
         device: AlarmDevice,
+        factory: EntityFactory,
     ) -> None:
         """Construct."""
-        # Enable experimental settings from the configuration file
-        experimental = coordinator.hass.data[DOMAIN].get(CONF_EXPERIMENTAL, {})
-        self._attr_force_update = experimental.get(CONF_FORCE_UPDATE, False)
+        self._attr_force_update = factory.force_update
 
         super().__init__(coordinator)
-        self.entity_id = generate_entity_id(config, name)
+        self.entity_id = factory.entity_id(name)
         self._name = name
         self._device = device
-        self._unique_id = unique_id
+        self._attr_unique_id = unique_id
         self._alert_id = alert_id
+        self._attr_translation_key = name
 
     @property
-    def unique_id(self) -> str:
-        """Return the unique identifier."""
-        return self._unique_id
+    def native_value(self) -> int | None:
+        return self._device.get_status(q.ALERTS, self._alert_id)
+
+
+class CommandLatencySensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor that reports the time between a command and its confirmation from the cloud."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "last_command_latency"
+    _attr_icon = "hass:timer-outline"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_display_precision = 1
+    _unrecorded_attributes = frozenset({"histogram"})
+
+    def __init__(
+        self,
+        unique_id: str,
+        config: ConfigEntry,
+        coordinator: DataUpdateCoordinator,
+        device: AlarmDevice,
+        factory: EntityFactory,
+    ) -> None:
+        """Construct."""
+        super().__init__(coordinator)
+        self.entity_id = factory.entity_id("last_command_latency")
+        self._device = device
+        self._attr_unique_id = unique_id
+        self._system = SUPPORTED_SYSTEMS.get(config.data.get(CONF_SYSTEM_URL), config.data.get(CONF_SYSTEM_URL))
 
     @property
-    def translation_key(self) -> str:
-        """Return the translation key to translate the entity's name and states."""
-        return self._name
+    def native_value(self) -> float | None:
+        return self._device.last_command_latency
 
     @property
-    def icon(self) -> str:
-        """Return the icon used by this entity."""
-        return "hass:alarm-light"
+    def extra_state_attributes(self) -> dict:
+        """Return the system type and the latency histogram to compare different systems."""
+        return {
+            "system": self._system,
+            "histogram": self._device.command_latency.as_dict(),
+        }
+
+
+class SuppressedTransitionsSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor that reports how many input changes have been hidden by the debouncer."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "suppressed_transitions"
+    _attr_icon = "hass:filter-variant-remove"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(
+        self,
+        unique_id: str,
+        config: ConfigEntry,
+        coordinator: DataUpdateCoordinator,
+        device: AlarmDevice,
+        factory: EntityFactory,
+    ) -> None:
+        """Construct."""
+        super().__init__(coordinator)
+        self.entity_id = factory.entity_id("suppressed_transitions")
+        self._device = device
+        self._attr_unique_id = unique_id
 
     @property
-    def native_value(self) -> int | None:
-        return self._device.get_status(q.ALERTS, self._alert_id)
+    def native_value(self) -> int:
+        return self._device.suppressed_transitions
+
+
+class DataAgeSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor that reports the time since the backend confirmed the last known state."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "data_age"
+    _attr_icon = "hass:clock-alert-outline"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_display_precision = 0
+    _unrecorded_attributes = frozenset({"sectors", "inputs", "outputs", "alerts"})
+
+    def __init__(
+        self,
+        unique_id: str,
+        config: ConfigEntry,
+        coordinator: DataUpdateCoordinator,
+        device: AlarmDevice,
+        factory: EntityFactory,
+    ) -> None:
+        """Construct."""
+        super().__init__(coordinator)
+        self.entity_id = factory.entity_id("data_age")
+        self._device = device
+        self._attr_unique_id = unique_id
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the age of the oldest category, so that automations can detect a stale state."""
+        age = self._device.data_age()
+        return None if age is None else round(age, 1)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the age of each category."""
+        attributes = {}
+        for query, name in ((q.SECTORS, "sectors"), (q.INPUTS, "inputs"), (q.OUTPUTS, "outputs"), (q.ALERTS, "alerts")):
+            age = self._device.data_age(query)
+            attributes[name] = None if age is None else round(age, 1)
+        return attributes
@@ -1,36 +1,213 @@
+import asyncio
 import logging
+from typing import Dict, List
 
-from homeassistant.core import HomeAssistant, ServiceCall
+import voluptuous as vol
+from elmo import query as q
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, KEY_COORDINATOR, KEY_DEVICE
+from .const import CONF_CONFIG_ENTRY_ID, DOMAIN, KEY_COORDINATOR, KEY_DEVICE
 from .decorators import retry_refresh_token_service
+from .helpers import sector_index
 
 _LOGGER = logging.getLogger(__name__)
 
+ENTRY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_CONFIG_ENTRY_ID): cv.string,
+    }
+)
 
-@retry_refresh_token_service
-async def arm_sectors(hass: HomeAssistant, config_id: str, call: ServiceCall):
+GET_HISTORY_SCHEMA = ENTRY_SCHEMA.extend(
+    {
+        vol.Optional("category"): vol.In(["sector", "input"]),
+        vol.Optional("minutes"): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+    }
+)
+
+
+def _loaded_entries(hass: HomeAssistant) -> List[str]:
+    return [key for key, value in hass.data[DOMAIN].items() if isinstance(value, dict) and KEY_DEVICE in value]
+
+
+def _entry_id(hass: HomeAssistant, call: ServiceCall) -> str:
+    """Return the configuration entry targeted by the service call.
+
+    Services are registered once for all entries, so the alarm panel is selected with `config_entry_id`.
+    The field can be omitted when a single alarm panel is configured.
+
+    Raises:
+        HomeAssistantError: If the entry is not loaded, or if it's omitted with multiple alarm panels.
+    """
+    entries = _loaded_entries(hass)
+    config_id = call.data.get(CONF_CONFIG_ENTRY_ID)
+    if config_id is None:
+        if len(entries) != 1:
+            raise HomeAssistantError("Multiple alarm panels are configured: select one with `config_entry_id`")
+        return entries[0]
+    if config_id not in entries:
+        raise HomeAssistantError(f"The alarm panel {config_id} is not loaded")
+    return config_id
+
+
+SEQUENCE_STEP_SCHEMA = vol.Any(
+    vol.Schema(
+        {
+            vol.Required("action"): vol.In(["arm", "disarm"]),
+            vol.Required("sectors"): vol.All(cv.ensure_list, [vol.Coerce(int)], vol.Length(min=1)),
+        }
+    ),
+    vol.Schema(
+        {
+            vol.Required("action"): vol.In(["turn_on", "turn_off"]),
+            vol.Required("output"): vol.Coerce(int),
+        }
+    ),
+)
+
+RUN_SEQUENCE_SCHEMA = ENTRY_SCHEMA.extend(
+    {
+        vol.Required("code"): cv.string,
+        vol.Required("steps"): vol.All(cv.ensure_list, [SEQUENCE_STEP_SCHEMA], vol.Length(min=1)),
+        vol.Optional("rollback", default=True): cv.boolean,
+    }
+)
+
+PROFILE_SCHEMA = ENTRY_SCHEMA.extend(
+    {
+        vol.Optional("cycles", default=3): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+        vol.Optional("top", default=20): vol.All(vol.Coerce(int), vol.Range(min=1, max=200)),
+        vol.Optional("timeout", default=300): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+    }
+)
+
+
+async def arm_sectors(hass: HomeAssistant, call: ServiceCall):
     _LOGGER.debug(f"Service | Triggered action {call.service}")
-    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
-    sectors = [device._sectors[x.split(".")[1]] for x in call.data["entity_id"]]
-    code = call.data.get("code")
-    _LOGGER.debug(f"Service | Arming sectors: {sectors}")
-    await hass.async_add_executor_job(device.arm, code, sectors)
+    await _dispatch_sectors(hass, "arm", call)
 
 
-@retry_refresh_token_service
-async def disarm_sectors(hass: HomeAssistant, config_id: str, call: ServiceCall):
+async def disarm_sectors(hass: HomeAssistant, call: ServiceCall):
     _LOGGER.debug(f"Service | Triggered action {call.service}")
-    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
-    sectors = [device._sectors[x.split(".")[1]] for x in call.data["entity_id"]]
+    await _dispatch_sectors(hass, "disarm", call)
+
+
+async def _dispatch_sectors(hass: HomeAssistant, action: str, call: ServiceCall):
+    """Group the targeted sectors by configuration entry and run the action on each alarm panel concurrently.
+
+    Targets are resolved through the sector index shared by all entries, so a single call can
+    drive sectors of different alarm panels. Panels are not affected by failures of other panels:
+    all commands are completed before the first error is raised.
+
+    Args:
+        hass: The Home Assistant instance.
+        action: The `AlarmDevice` method to call (`arm` or `disarm`).
+        call: The service call with the targeted `entity_id` list and the `code`.
+    """
+    index = sector_index(hass)
+    targets: Dict[str, List[int]] = {}
+    for entity_id in call.data["entity_id"]:
+        object_id = entity_id.split(".")[1]
+        if object_id not in index:
+            _LOGGER.warning(f"Service | Entity {entity_id} is not a sector of a configured alarm, skipping")
+            continue
+        entry_id, element = index[object_id]
+        targets.setdefault(entry_id, []).append(element)
+
     code = call.data.get("code")
-    _LOGGER.debug(f"Service | Disarming sectors: {sectors}")
-    await hass.async_add_executor_job(device.disarm, code, sectors)
+    results = await asyncio.gather(
+        *[_send_sectors_command(hass, entry_id, action, code, sectors) for entry_id, sectors in targets.items()],
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
 
 
 @retry_refresh_token_service
-async def update_state(hass: HomeAssistant, config_id: str, call: ServiceCall):
+async def _send_sectors_command(hass: HomeAssistant, config_id: str, action: str, code: str, sectors: list):
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    _LOGGER.debug(f"Service | Running '{action}' on sectors {sectors} (entry {config_id})")
+    await hass.async_add_executor_job(getattr(device, action), code, sectors)
+    coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
+    coordinator.async_update_listeners()
+    coordinator.async_schedule_fast_refresh(q.SECTORS)
+
+
+async def update_state(hass: HomeAssistant, call: ServiceCall):
+    """Refresh the alarm panel selected with `config_entry_id`, or all alarm panels if it's omitted."""
     _LOGGER.debug(f"Service | Triggered action {call.service}")
+    if CONF_CONFIG_ENTRY_ID in call.data:
+        entries = [_entry_id(hass, call)]
+    else:
+        entries = _loaded_entries(hass)
+    await asyncio.gather(*[_refresh_entry(hass, config_id) for config_id in entries])
+
+
+@retry_refresh_token_service
+async def _refresh_entry(hass: HomeAssistant, config_id: str):
     coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
-    _LOGGER.debug("Service | Updating alarm state...")
+    _LOGGER.debug(f"Service | Updating alarm state (entry {config_id})...")
     await coordinator.async_refresh()
+
+
+async def get_history(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    _LOGGER.debug(f"Service | Triggered action {call.service}")
+    config_id = _entry_id(hass, call)
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    since = None
+    if minutes := call.data.get("minutes"):
+        since = dt_util.utcnow().timestamp() - minutes * 60
+    return {"transitions": device.history(category=call.data.get("category"), since=since)}
+
+
+async def run_sequence(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    _LOGGER.debug(f"Service | Triggered action {call.service}")
+    return await _run_sequence(hass, _entry_id(hass, call), call)
+
+
+@retry_refresh_token_service
+async def _run_sequence(hass: HomeAssistant, config_id: str, call: ServiceCall) -> ServiceResponse:
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    steps = call.data["steps"]
+    _LOGGER.debug(f"Service | Running command sequence: {steps}")
+    result = await hass.async_add_executor_job(device.run_sequence, call.data["code"], steps, call.data["rollback"])
+    coordinator = hass.data[DOMAIN][config_id][KEY_COORDINATOR]
+    coordinator.async_update_listeners()
+    for query in {q.SECTORS if step["action"] in ("arm", "disarm") else q.OUTPUTS for step in steps}:
+        coordinator.async_schedule_fast_refresh(query)
+    return result
+
+
+async def profile(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Profile the next update cycles and the commands sent meanwhile, then report the results.
+
+    The session ends when `cycles` update cycles (with or without changes) are completed, or after
+    `timeout` seconds with the statistics collected so far. Statistics are written to
+    `econnect_metronet_profile_<entry_id>.pstats` in the configuration folder (overwriting the previous
+    session) from the executor, so that the event loop is not blocked. Only one session per entry can
+    run at a time.
+    """
+    _LOGGER.debug(f"Service | Triggered action {call.service}")
+    config_id = _entry_id(hass, call)
+    device = hass.data[DOMAIN][config_id][KEY_DEVICE]
+    if device.profiler is not None:
+        raise HomeAssistantError("A profiling session is already running for this alarm panel")
+
+    # `cProfile` and `pstats` are needed only when a session starts
+    from .profiler import CycleProfiler
+
+    profiler = device.profiler = CycleProfiler(call.data["cycles"])
+    _LOGGER.info(f"Service | Profiling the next {profiler.cycles} update cycles (entry {config_id})")
+    try:
+        await asyncio.wait_for(profiler.done.wait(), call.data["timeout"])
+    except asyncio.TimeoutError:
+        _LOGGER.warning(f"Service | Profiling timed out after {profiler.completed} of {profiler.cycles} cycles")
+    finally:
+        device.profiler = None
+
+    path = hass.config.path(f"{DOMAIN}_profile_{config_id}.pstats")
+    return await hass.async_add_executor_job(profiler.write, path, call.data["top"])
@@ -4,14 +4,9 @@ from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-)
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
-    CONF_EXPERIMENTAL,
-    CONF_FORCE_UPDATE,
     DOMAIN,
     KEY_COORDINATOR,
     KEY_DEVICE,
@@ -19,8 +14,9 @@ from .const import (
     NOTIFICATION_MESSAGE,
     NOTIFICATION_TITLE,
 )
+from .coordinator import AlarmCoordinator
 from .devices import AlarmDevice
-from .helpers import generate_entity_id
+from .helpers import EntityFactory, StaleStateMixin
 
 
 async def async_setup_entry(
@@ -30,20 +26,20 @@ async def async_setup_entry(
 ) -> None:
     device = hass.data[DOMAIN][entry.entry_id][KEY_DEVICE]
     coordinator = hass.data[DOMAIN][entry.entry_id][KEY_COORDINATOR]
-    outputs = []
+    factory = EntityFactory(entry, coordinator, device)
 
-    # Iterate through the outputs of the provided device and create OutputSwitch objects
-    for output_id, name in device.outputs:
-        unique_id = f"{entry.entry_id}_{DOMAIN}_{q.OUTPUTS}_{output_id}"
-        outputs.append(OutputSwitch(unique_id, output_id, entry, name, coordinator, device))
+    # Create OutputSwitch objects for the outputs of the provided device
+    outputs = factory.create(OutputSwitch, device.outputs, q.OUTPUTS)
 
     async_add_entities(outputs)
 
 
-class OutputSwitch(CoordinatorEntity, SwitchEntity):
+class OutputSwitch(StaleStateMixin, CoordinatorEntity, SwitchEntity):
     """Representation of a e-connect output switch."""
 
+    stale_query = q.OUTPUTS
     _attr_has_entity_name = True
+    _attr_icon = "hass:toggle-switch-variant"
 
     def __init__(
         self,
@@ -51,35 +47,20 @@ class OutputSwitch(CoordinatorEntity, SwitchEntity):
         output_id: int,
         config: ConfigEntry,
         name: str,
-        coordinator: DataUpdateCoordinator,
+        coordinator: AlarmCoordinator,
         device: AlarmDevice,
+        factory: EntityFactory,
     ) -> None:
         """Construct."""
-        # Enable experimental settings from the configuration file
-        experimental = coordinator.hass.data[DOMAIN].get(CONF_EXPERIMENTAL, {})
-        self._attr_force_update = experimental.get(CONF_FORCE_UPDATE, False)
+        self._attr_force_update = factory.force_update
 
         super().__init__(coordinator)
-        self.entity_id = generate_entity_id(config, name)
+        self.entity_id = factory.entity_id(name)
         self._name = name
         self._device = device
-        self._unique_id = unique_id
+        self._attr_unique_id = unique_id
         self._output_id = output_id
-
-    @property
-    def unique_id(self) -> str:
-        """Return the unique identifier."""
-        return self._unique_id
-
-    @property
-    def name(self) -> str:
-        """Return the name of this entity."""
-        return self._name
-
-    @property
-    def icon(self) -> str:
-        """Return the icon used by this entity."""
-        return "hass:toggle-switch-variant"
+        self._attr_name = name
 
     @property
     def is_on(self) -> bool:
@@ -88,14 +69,22 @@ class OutputSwitch(CoordinatorEntity, SwitchEntity):
 
     async def async_turn_off(self):
         """Turn the entity off."""
-        if not await self.hass.async_add_executor_job(self._device.turn_off, self._output_id):  # pragma: no cover
+        if not await self.coordinator.async_send_output(self._output_id, False):  # pragma: no cover
             persistent_notification.async_create(
                 self.hass, NOTIFICATION_MESSAGE, NOTIFICATION_TITLE, NOTIFICATION_IDENTIFIER
             )
+            return
+
+        # Show the optimistic status until the next update confirms it
+        self.async_write_ha_state()
 
     async def async_turn_on(self):
         """Turn the entity off."""
-        if not await self.hass.async_add_executor_job(self._device.turn_on, self._output_id):  # pragma: no cover
+        if not await self.coordinator.async_send_output(self._output_id, True):  # pragma: no cover
             persistent_notification.async_create(
                 self.hass, NOTIFICATION_MESSAGE, NOTIFICATION_TITLE, NOTIFICATION_IDENTIFIER
             )
+            return
+
+        # Show the optimistic status until the next update confirms it
+        self.async_write_ha_state()
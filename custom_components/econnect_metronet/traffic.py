@@ -0,0 +1,206 @@
+"""Record and replay the traffic exchanged with the e-Connect cloud service.
+
+`TrafficRecorder` wraps an `ElmoClient` and appends each call (redacted) to a JSONL file, together
+with its duration. `TrafficReplay` reads that file and can be used by `AlarmDevice` in place of
+`ElmoClient`, so that real traffic shapes can be reproduced offline and deterministically.
+
+Usage:
+    # Recording
+    client = TrafficRecorder(ElmoClient(base_url, domain), "/config/econnect_metronet_traffic.jsonl")
+    device = AlarmDevice(client)
+
+    # Replay at 10x speed
+    client = TrafficReplay("/config/econnect_metronet_traffic.jsonl", speed=10)
+    device = AlarmDevice(client)
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from elmo.api import exceptions
+from requests.exceptions import HTTPError
+from requests.models import Response
+
+_LOGGER = logging.getLogger(__name__)
+
+REDACTED = "**REDACTED**"
+
+# Client methods stored in the traffic file. Other attributes are delegated to the wrapped client.
+RECORDED_METHODS = ("auth", "query", "poll", "arm", "disarm", "turn_on", "turn_off")
+
+# Methods whose arguments (credentials, alarm codes) or results (access token) are never stored
+REDACTED_ARGS = ("auth", "lock")
+REDACTED_RESULTS = ("auth",)
+
+
+def _replay_key(method: str, args: List[Any], kwargs: Optional[Dict[str, Any]] = None) -> Tuple[Any, ...]:
+    """Return the key used to match a call with the recorded traffic.
+
+    Queries are matched by query index, as the same cycle queries several categories.
+    All other calls are matched by method name, in the recorded order. Keyword arguments
+    (e.g. the `sectors` of `arm()`) are part of the key, so that calls are matched with
+    the same arguments.
+    """
+    key: Tuple[Any, ...] = (method, args[0]) if method == "query" else (method,)
+    if kwargs:
+        key += (json.dumps(kwargs, sort_keys=True, default=str),)
+    return key
+
+
+def _restore_keys(value: Any) -> Any:
+    """Convert numeric dictionary keys back to integers, as JSON stores keys as strings."""
+    if isinstance(value, dict):
+        return {int(k) if isinstance(k, str) and k.isdigit() else k: _restore_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_restore_keys(item) for item in value]
+    return value
+
+
+def _serialize_error(err: Exception) -> Dict[str, Any]:
+    """Store an exception raised by the client, so that it can be raised again during the replay."""
+    error = {"type": type(err).__name__, "message": str(err)}
+    if isinstance(err, HTTPError) and err.response is not None:
+        error["status_code"] = err.response.status_code
+        error["text"] = err.response.text
+    return error
+
+
+def _deserialize_error(error: Dict[str, Any]) -> Exception:
+    """Build the exception stored in the traffic file."""
+    if error["type"] == "HTTPError":
+        response = Response()
+        response.status_code = error.get("status_code")
+        response._content = (error.get("text") or "").encode()
+        return HTTPError(error["message"], response=response)
+
+    exception_class = getattr(exceptions, error["type"], None)
+    if exception_class is None:
+        return Exception(error["message"])
+    return exception_class(error["message"]) if error["message"] else exception_class()
+
+
+class TrafficRecorder:
+    """Wrap an `ElmoClient` and record each call in a JSONL file.
+
+    Each line stores the call offset from the beginning of the recording, its duration, the method
+    name with its (positional and keyword) arguments, and the result or the raised exception. Credentials, alarm codes
+    and access tokens are redacted. Calls are always made from the executor, so writing
+    the file doesn't block the event loop.
+
+    Args:
+        client: The `ElmoClient` instance used to communicate with the cloud service.
+        path: The JSONL file where the traffic is appended.
+    """
+
+    def __init__(self, client, path: str) -> None:
+        self._client = client
+        self._path = path
+        self._started_at = time.monotonic()
+        self._write_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name not in RECORDED_METHODS:
+            return attr
+
+        def recorded(*args, **kwargs):
+            started_at = time.monotonic()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as err:
+                self._write(name, args, started_at, kwargs, error=_serialize_error(err))
+                raise
+            self._write(name, args, started_at, kwargs, result=REDACTED if name in REDACTED_RESULTS else result)
+            return result
+
+        return recorded
+
+    @contextmanager
+    def lock(self, code, user_id=1):
+        """Record the lock acquisition and keep the lock until the context manager is closed."""
+        started_at = time.monotonic()
+        acquired = False
+        try:
+            with self._client.lock(code, user_id):
+                acquired = True
+                self._write("lock", (code, user_id), started_at, result=None)
+                yield self
+        except Exception as err:
+            if not acquired:
+                self._write("lock", (code, user_id), started_at, error=_serialize_error(err))
+            raise
+
+    def _write(
+        self, method: str, args: tuple, started_at: float, kwargs: Optional[Dict[str, Any]] = None, **outcome: Any
+    ) -> None:
+        entry = {
+            "offset": round(started_at - self._started_at, 6),
+            "duration": round(time.monotonic() - started_at, 6),
+            "method": method,
+            "args": [REDACTED] * len(args) if method in REDACTED_ARGS else list(args),
+            **outcome,
+        }
+        if kwargs:
+            entry["kwargs"] = {key: REDACTED for key in kwargs} if method in REDACTED_ARGS else kwargs
+        line = json.dumps(entry, default=str)
+        with self._write_lock:
+            with open(self._path, "a", encoding="utf-8") as traffic:
+                traffic.write(line + "\n")
+
+
+class TrafficReplay:
+    """Connector that plays back a traffic file recorded by `TrafficRecorder`.
+
+    Each call returns the next recorded result for the same method (and query index), after waiting
+    the recorded duration divided by `speed`. Recorded exceptions are raised again, so that error
+    paths are reproduced as well.
+
+    Args:
+        path: The JSONL file recorded by `TrafficRecorder`.
+        speed: Playback speed. `1` waits the original durations, greater values accelerate the replay,
+            and `0` disables waiting.
+
+    Raises:
+        IndexError: When a call has no recorded traffic left.
+    """
+
+    def __init__(self, path: str, speed: float = 1) -> None:
+        self._speed = speed
+        self._traffic: Dict[Tuple[Any, ...], Deque[Dict[str, Any]]] = {}
+        self._replay_lock = threading.Lock()
+        with open(path, encoding="utf-8") as traffic:
+            for line in traffic:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = _replay_key(entry["method"], entry["args"], entry.get("kwargs"))
+                self._traffic.setdefault(key, deque()).append(entry)
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in RECORDED_METHODS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._play(name, list(args), kwargs)
+
+    @contextmanager
+    def lock(self, code, user_id=1):
+        """Replay the lock acquisition."""
+        self._play("lock", [code, user_id])
+        yield self
+
+    def _play(self, method: str, args: List[Any], kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        key = _replay_key(method, args, kwargs)
+        with self._replay_lock:
+            if not self._traffic.get(key):
+                raise IndexError(f"No recorded traffic left for {key}")
+            entry = self._traffic[key].popleft()
+
+        if self._speed:
+            time.sleep(entry["duration"] / self._speed)
+        if "error" in entry:
+            raise _deserialize_error(entry["error"])
+        return _restore_keys(entry["result"])
@@ -0,0 +1,33 @@
+"""HTTP views exposed by the integration."""
+
+from aiohttp import web
+from homeassistant.components.http import KEY_HASS, HomeAssistantView, require_admin
+
+from .const import DOMAIN, KEY_DEVICE
+from .metrics import render
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsView(HomeAssistantView):
+    """Export the metrics of all configured alarm panels in the Prometheus text format.
+
+    The endpoint requires an administrator (e.g. a long-lived access token used by the Prometheus
+    `bearer_token` setting). Samples are labelled with the `entry_id` of each config entry.
+    """
+
+    url = f"/api/{DOMAIN}/metrics"
+    name = f"api:{DOMAIN}:metrics"
+
+    @require_admin
+    async def get(self, request: web.Request) -> web.Response:
+        hass = request.app[KEY_HASS]
+        devices = {
+            entry_id: data[KEY_DEVICE]
+            for entry_id, data in hass.data.get(DOMAIN, {}).items()
+            if isinstance(data, dict) and KEY_DEVICE in data
+        }
+        response = web.Response(body=render(devices).encode())
+        response.headers["Content-Type"] = CONTENT_TYPE_PROMETHEUS
+        return response
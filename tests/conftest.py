@@ -2,18 +2,25 @@ import logging
 
 import pytest
 import responses
+from elmo import query as q
 from elmo.api.client import ElmoClient
 from homeassistant.config_entries import ConfigEntryState
 
 from custom_components.econnect_metronet import async_setup
 from custom_components.econnect_metronet.alarm_control_panel import EconnectAlarm
+from custom_components.econnect_metronet.binary_sensor import SectorBinarySensor
 from custom_components.econnect_metronet.config_flow import EconnectConfigFlow
 from custom_components.econnect_metronet.const import DOMAIN
 from custom_components.econnect_metronet.coordinator import AlarmCoordinator
 from custom_components.econnect_metronet.devices import AlarmDevice
+from custom_components.econnect_metronet.helpers import EntityFactory
+from custom_components.econnect_metronet.switch import OutputSwitch
 
 from .fixtures import responses as r
+from .fixtures.panels import SyntheticPanel
 from .hass.fixtures import MockConfigEntry
+from .helpers import _
+from .stress import StressBackend, StressHarness
 
 pytest_plugins = ["tests.hass.fixtures"]
 
@@ -147,6 +154,31 @@ def client(socket_enabled):
         yield client
 
 
+@pytest.fixture(scope="function")
+def synthetic_panel(request):
+    """Creates a `SyntheticPanel` to emulate large alarm systems.
+
+    The panel is built with the default arguments, unless the test provides them through indirect
+    parametrization:
+
+        >>> @pytest.mark.parametrize("synthetic_panel", [{"inputs": 1024, "in_use": 0.9}], indirect=True)
+    """
+    return SyntheticPanel(**getattr(request, "param", {}))
+
+
+@pytest.fixture(scope="function")
+def synthetic_client(socket_enabled, synthetic_panel):
+    """Creates an instance of `ElmoClient` connected to the `synthetic_panel`, like the `client` fixture.
+
+    Payloads are generated from the panel state at each request, so changes applied to the panel
+    (e.g. `synthetic_panel.apply(next(synthetic_panel.changes))`) are reported to the client.
+    """
+    client = ElmoClient(base_url="https://example.com", domain="domain")
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as server:
+        synthetic_panel.register(server)
+        yield client
+
+
 @pytest.fixture(scope="function")
 def config_entry(hass):
     """Creates a mock config entry for testing purposes.
@@ -169,3 +201,56 @@ def config_entry(hass):
     )
     config.add_to_hass(hass)
     return config
+
+
+@pytest.fixture(scope="function")
+async def stress(hass, config_entry, mocker):
+    """Builds a `StressHarness` for the integration, connected to a `StressBackend`.
+
+    The harness includes an `AlarmDevice`, its coordinator, the alarm panel entity, a binary sensor
+    for each sector and a switch for each output. Delays of fast refreshes and of the output queue
+    are shortened, so that many commands can run in a few seconds.
+
+    Yields:
+        StressHarness: The harness used to run concurrent operations against the backend.
+    """
+    mocker.patch(_("coordinator.FAST_REFRESH_SCHEDULE"), (0.01, 0.02, 0.05))
+    mocker.patch(_("coordinator.OUTPUT_QUEUE_WINDOW"), 0.01)
+    backend = StressBackend(seed=42)
+    device = AlarmDevice(backend)
+    coordinator = AlarmCoordinator(hass, device, 5)
+    coordinator.config_entry = config_entry
+    await hass.async_add_executor_job(device.connect, "test_user", "test_password")
+    await coordinator._async_update_device()
+    coordinator.data = device._inventory
+    hass.data[DOMAIN][config_entry.entry_id] = {"device": device, "coordinator": coordinator}
+
+    panel = EconnectAlarm(unique_id="test_id", config=config_entry, device=device, coordinator=coordinator)
+    panel.hass = hass
+    sectors = [
+        SectorBinarySensor(
+            "test_id",
+            sector_id,
+            config_entry,
+            item["name"],
+            coordinator,
+            device,
+            EntityFactory(config_entry, coordinator, device),
+        )
+        for sector_id, item in device.items(q.SECTORS)
+    ]
+    switches = [
+        OutputSwitch(
+            "test_id",
+            output_id,
+            config_entry,
+            item["name"],
+            coordinator,
+            device,
+            EntityFactory(config_entry, coordinator, device),
+        )
+        for output_id, item in device.items(q.OUTPUTS)
+    ]
+    for switch in switches:
+        switch.hass = hass
+    yield StressHarness(hass, config_entry, backend, device, coordinator, panel, sectors, switches, seed=42)
@@ -0,0 +1,223 @@
+"""
+Generates e-Connect payloads for synthetic panels of any size, used when the fixed panel in `responses.py`
+is too small (e.g. performance and memory tests).
+
+Payloads have the same format of the ones stored in `responses.py`, so they are parsed by the real
+`ElmoClient`. The panel keeps its state: a seeded stream of random changes updates sectors, inputs and
+outputs, and the next payloads (including the long-polling response) report them.
+
+Usage:
+    1. Build a panel with the number of items and their distributions:
+       panel = SyntheticPanel(sectors=64, inputs=1024, outputs=256, in_use=0.9, active={"inputs": 0.1})
+
+    2. Register the panel in a `responses` server, in place of the static responses:
+       panel.register(server)
+
+    3. Apply random changes between two queries:
+       panel.apply(next(panel.changes))
+"""
+
+import json
+import random
+from typing import Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+import responses
+from elmo import query as q
+
+from . import responses as r
+
+# Payload keys of each category, in the query, the descriptions (`Class`) and the long-polling requests
+CATEGORIES = {
+    "sectors": {"query": q.SECTORS, "status": "Active", "poll": "Areas"},
+    "inputs": {"query": q.INPUTS, "status": "Alarm", "poll": "Inputs"},
+    "outputs": {"query": q.OUTPUTS, "status": "Active", "poll": "Outputs"},
+}
+
+Ratio = Union[float, Dict[str, float]]
+
+
+class SyntheticPanel:
+    """Synthetic alarm panel that produces LOGIN, AREAS, INPUTS, OUTPUTS, STATUS, STRINGS and UPDATES payloads.
+
+    Each item gets a unique `Id`. When an item changes, it gets a new `Id` greater than all the others,
+    so that the last ID of its category moves forward like in the e-Connect cloud service.
+
+    Args:
+        sectors: Number of sectors.
+        inputs: Number of inputs.
+        outputs: Number of outputs.
+        in_use: Ratio of items in use (items not in use are ignored by `ElmoClient`). Either a single
+            value or a value for each category (e.g. `{"inputs": 0.5}`); missing categories are fully used.
+        active: Ratio of items active (armed sectors, open inputs, or outputs turned on) when the panel
+            is created. Either a single value or a value for each category; missing categories are inactive.
+        seed: Seed of the random generator used to build the panel and the change stream.
+    """
+
+    def __init__(
+        self,
+        sectors: int = 4,
+        inputs: int = 24,
+        outputs: int = 24,
+        in_use: Ratio = 1.0,
+        active: Ratio = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self._rng = random.Random(seed)
+        self._last_id = 0
+        self.items = {}
+        for category, size in (("sectors", sectors), ("inputs", inputs), ("outputs", outputs)):
+            in_use_ratio = self._ratio(in_use, category, 1.0)
+            active_ratio = self._ratio(active, category, 0.0)
+            self.items[category] = [
+                {
+                    "Id": self._next_id(),
+                    "Index": index,
+                    "Element": index + 1,
+                    "InUse": self._rng.random() < in_use_ratio,
+                    "Status": self._rng.random() < active_ratio,
+                }
+                for index in range(size)
+            ]
+        self.status_uid = 1
+        self.changes = self._change_stream()
+
+    @staticmethod
+    def _ratio(value: Ratio, category: str, default: float) -> float:
+        if isinstance(value, dict):
+            return value.get(category, default)
+        return value
+
+    def _next_id(self) -> int:
+        self._last_id += 1
+        return self._last_id
+
+    def last_ids(self) -> Dict[int, int]:
+        """Return the last ID of each category, as reported by `ElmoClient.query()`."""
+        ids = {
+            CATEGORIES[category]["query"]: max(item["Id"] for item in items) for category, items in self.items.items()
+        }
+        ids[q.ALERTS] = self.status_uid
+        return ids
+
+    def _change_stream(self) -> Iterator[Tuple[str, int, bool]]:
+        """Yield random changes of items in use as `(category, index, status)` tuples. Inputs change more often."""
+        weights = {"sectors": 1, "inputs": 8, "outputs": 1}
+        categories = [category for category in CATEGORIES if any(item["InUse"] for item in self.items[category])]
+        while categories:
+            category = self._rng.choices(categories, [weights[category] for category in categories])[0]
+            item = self._rng.choice([item for item in self.items[category] if item["InUse"]])
+            yield category, item["Index"], not item["Status"]
+
+    def apply(self, change: Tuple[str, int, bool]) -> None:
+        """Apply a change produced by `changes` (or built by the test) to the panel."""
+        category, index, status = change
+        item = self.items[category][index]
+        item["Status"] = status
+        item["Id"] = self._next_id()
+
+    def login(self) -> str:
+        payload = json.loads(r.LOGIN)
+        sectors = self.items["sectors"]
+        payload["Panel"].update(
+            {
+                "Areas": max(len(sectors) // 4, 1),
+                "SectorsPerArea": 4,
+                "TotalSectors": len(sectors),
+                "Inputs": len(self.items["inputs"]),
+                "Outputs": len(self.items["outputs"]),
+                "SectorsInUse": [item["InUse"] for item in sectors],
+            }
+        )
+        return json.dumps(payload)
+
+    def strings(self) -> str:
+        payload = []
+        for category, items in self.items.items():
+            name = category[:-1].capitalize()
+            for item in items:
+                payload.append(
+                    {
+                        "AccountId": 1,
+                        "Class": CATEGORIES[category]["query"],
+                        "Index": item["Index"],
+                        "Description": f"{name} {item['Element']}",
+                        "Created": "/Date(1546004120767+0100)/",
+                        "Version": "AAAAAAAAgPc=",
+                    }
+                )
+        return json.dumps(payload)
+
+    def _entries(self, category: str, **fields) -> str:
+        status = CATEGORIES[category]["status"]
+        payload = [
+            {
+                status: item["Status"],
+                "InUse": item["InUse"],
+                "Id": item["Id"],
+                "Index": item["Index"],
+                "Element": item["Element"],
+                "CommandId": 0,
+                "InProgress": False,
+                **fields,
+            }
+            for item in self.items[category]
+        ]
+        return json.dumps(payload)
+
+    def areas(self) -> str:
+        return self._entries("sectors", ActivePartial=False, Max=False, Activable=True, ActivablePartial=False)
+
+    def inputs(self) -> str:
+        return self._entries("inputs", MemoryAlarm=False, Excluded=False, IsVideo=False)
+
+    def outputs(self) -> str:
+        return self._entries("outputs", DoNotRequireAuthentication=True, ControlDeniedToUsers=False)
+
+    def status(self) -> str:
+        payload = json.loads(r.STATUS)
+        payload["StatusUid"] = self.status_uid
+        return json.dumps(payload)
+
+    def updates(self, ids: Optional[Dict[str, int]] = None) -> str:
+        """Return the long-polling response, reporting categories with an ID greater than the given ones.
+
+        Args:
+            ids: The last IDs sent by the client, with the keys of the poll request (e.g. `Areas`).
+                Without IDs, all categories are reported as changed.
+        """
+        payload = json.loads(r.UPDATES)
+        ids = ids or {}
+        for category, items in self.items.items():
+            key = CATEGORIES[category]["poll"]
+            payload[key] = max(item["Id"] for item in items) > ids.get(key, 0)
+        payload["StatusAdv"] = self.status_uid > ids.get("StatusAdv", 0)
+        payload["HasChanges"] = any(payload[key] for key in ("Areas", "Inputs", "Outputs", "StatusAdv"))
+        return json.dumps(payload)
+
+    def _poll_callback(self, request):
+        form = parse_qs(request.body or "")
+        ids = {key: int(values[0]) for key, values in form.items() if values[0].lstrip("-").isdigit()}
+        return 200, {}, self.updates(ids)
+
+    def register(self, server: responses.RequestsMock, base_url: str = "https://example.com") -> None:
+        """Register the panel endpoints in a `responses` server, replacing the static payloads.
+
+        Payloads are generated at each request, so changes applied to the panel are visible to the client.
+        """
+        endpoints = {
+            "/api/areas": self.areas,
+            "/api/inputs": self.inputs,
+            "/api/outputs": self.outputs,
+            "/api/statusadv": self.status,
+            "/api/strings": self.strings,
+        }
+        server.add(responses.GET, f"{base_url}/api/login", body=self.login(), status=200)
+        server.add_callback(responses.POST, f"{base_url}/api/updates", callback=self._poll_callback)
+        for path, payload in endpoints.items():
+            server.add_callback(
+                responses.POST, f"{base_url}{path}", callback=lambda _, payload=payload: (200, {}, payload())
+            )
+        server.add(responses.POST, f"{base_url}/api/panel/syncLogin", body=r.SYNC_LOGIN, status=200)
+        server.add(responses.POST, f"{base_url}/api/panel/syncLogout", body=r.SYNC_LOGOUT, status=200)
+        server.add(responses.POST, f"{base_url}/api/panel/syncSendCommand", body=r.SYNC_SEND_COMMAND, status=200)
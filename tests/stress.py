@@ -0,0 +1,294 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from elmo import query as q
+from elmo.api.exceptions import InvalidToken
+from homeassistant.core import ServiceCall
+
+from custom_components.econnect_metronet import services
+from custom_components.econnect_metronet.const import DOMAIN
+
+# Categories reported by the long-polling API, mapped to the key used in the poll response
+POLL_KEYS = {
+    q.SECTORS: "areas",
+    q.INPUTS: "inputs",
+    q.OUTPUTS: "outputs",
+    q.ALERTS: "statusadv",
+}
+
+
+class StressBackend:
+    """Connection that emulates the e-Connect cloud service and the alarm panel, in place of `ElmoClient`.
+
+    The backend keeps the status of sectors, inputs and outputs and increments the last ID of a
+    category every time it changes, like the real service. Each call waits for a random latency,
+    the long-polling returns as soon as something changes (or after `poll_timeout` seconds), and
+    the system lock serializes commands of concurrent callers. Access tokens can be expired at any
+    time to exercise the re-authentication paths.
+
+    Args:
+        seed: Seed of the random generator, so that a failing run can be reproduced.
+        sectors: Number of sectors of the panel.
+        inputs: Number of inputs of the panel.
+        outputs: Number of outputs of the panel.
+        max_latency: Upper bound (in seconds) of the latency added to each call.
+        poll_timeout: Time (in seconds) the long-polling waits for a change.
+    """
+
+    def __init__(self, seed=0, sectors=4, inputs=8, outputs=4, max_latency=0.005, poll_timeout=0.05):
+        self.max_latency = max_latency
+        self.poll_timeout = poll_timeout
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._system_lock = threading.Lock()
+        self._token = "token-0"
+        self._session_id = None
+        self.status = {
+            q.SECTORS: {element: False for element in range(1, sectors + 1)},
+            q.INPUTS: {element: False for element in range(1, inputs + 1)},
+            q.OUTPUTS: {element: False for element in range(1, outputs + 1)},
+        }
+        self.last_ids = {q.SECTORS: 2, q.INPUTS: 2, q.OUTPUTS: 2, q.ALERTS: 2}
+        self.calls = 0
+
+    def _latency(self, factor=1):
+        with self._rng_lock:
+            delay = self._rng.uniform(0, self.max_latency * factor)
+        time.sleep(delay)
+
+    def _require_session(self):
+        self.calls += 1
+        if self._session_id != self._token:
+            raise InvalidToken
+
+    def _set(self, query, elements, status):
+        with self._changed:
+            for element in elements:
+                self.status[query][element] = status
+            self.last_ids[query] += 1
+            self._changed.notify_all()
+
+    def expire_token(self):
+        """Invalidate the current access token, like the cloud service does after a while."""
+        with self._changed:
+            self._token = f"token-{int(self._token.split('-')[1]) + 1}"
+
+    def toggle_input(self, element):
+        """Change the status of an input, as it happens when a door or a window is opened."""
+        self._set(q.INPUTS, [element], not self.status[q.INPUTS][element])
+
+    def auth(self, username, password):
+        self._latency()
+        self._session_id = self._token
+        return self._session_id
+
+    def query(self, query):
+        self._latency()
+        self._require_session()
+        with self._changed:
+            if query == q.PANEL:
+                return {"last_id": 2, "panel": {"description": "Stress panel", "login_without_user_id": True}}
+            if query == q.ALERTS:
+                return {"last_id": self.last_ids[q.ALERTS], "alerts": {}}
+
+            key = {q.SECTORS: "sectors", q.INPUTS: "inputs", q.OUTPUTS: "outputs"}[query]
+            items = {}
+            for index, (element, status) in enumerate(self.status[query].items()):
+                items[index] = {
+                    "element": element,
+                    "id": element,
+                    "index": index,
+                    "name": f"{key.capitalize()} {element}",
+                    "status": status,
+                    "activable": True,
+                    "control_denied_to_users": False,
+                    "do_not_require_authentication": True,
+                }
+            return {"last_id": self.last_ids[query], key: items}
+
+    def poll(self, ids):
+        self._latency()
+        self._require_session()
+        ids = dict(ids)
+        with self._changed:
+            self._changed.wait_for(
+                lambda: any(self.last_ids[query] > ids.get(query, 0) for query in POLL_KEYS), self.poll_timeout
+            )
+            update = {key: self.last_ids[query] > ids.get(query, 0) for query, key in POLL_KEYS.items()}
+        update["has_changes"] = any(update.values())
+        return update
+
+    @contextmanager
+    def lock(self, code, user_id=1):
+        self._latency()
+        self._require_session()
+        with self._system_lock:
+            yield self
+
+    def arm(self, sectors=None):
+        self._latency()
+        self._set(q.SECTORS, sectors or list(self.status[q.SECTORS]), True)
+        return True
+
+    def disarm(self, sectors=None):
+        self._latency()
+        self._set(q.SECTORS, sectors or list(self.status[q.SECTORS]), False)
+        return True
+
+    def turn_on(self, element):
+        self._latency()
+        self._require_session()
+        self._set(q.OUTPUTS, [element], True)
+        return True
+
+    def turn_off(self, element):
+        self._latency()
+        self._require_session()
+        self._set(q.OUTPUTS, [element], False)
+        return True
+
+
+@dataclass
+class StressReport:
+    """Outcome of a stress run: latency (in seconds) of each operation, and errors raised to the caller."""
+
+    elapsed: float = 0.0
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def operations(self) -> int:
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def throughput(self) -> float:
+        return self.operations / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, value: float) -> float:
+        """Return the latency percentile (e.g. `0.99`) across all operations."""
+        latencies = sorted(latency for values in self.latencies.values() for latency in values)
+        if not latencies:
+            return 0.0
+        return latencies[min(int(len(latencies) * value), len(latencies) - 1)]
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.operations} operations in {self.elapsed:.2f}s ({self.throughput:.1f} ops/s), "
+            f"p50 {self.percentile(0.5) * 1000:.1f}ms, p99 {self.percentile(0.99) * 1000:.1f}ms, "
+            f"max {self.percentile(1) * 1000:.1f}ms"
+        ]
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            lines.append(
+                f"  {name}: {len(values)} ops, {self.errors.get(name, 0)} errors, "
+                f"p99 {values[min(int(len(values) * 0.99), len(values) - 1)] * 1000:.1f}ms"
+            )
+        return "\n".join(lines)
+
+
+class StressHarness:
+    """Run concurrent service calls, entity commands, forced refreshes and token expiries.
+
+    While operations run, a background task keeps refreshing the coordinator like the Home Assistant
+    scheduler does, so that commands race with the long-polling. Use `settle()` once the run is over
+    to wait until the integration has caught up with the backend, before checking invariants.
+
+    Args:
+        hass: The Home Assistant instance.
+        config_entry: The config entry of the alarm panel.
+        backend: The `StressBackend` used as connection by the device.
+        device: The `AlarmDevice` under test.
+        coordinator: The `AlarmCoordinator` under test.
+        panel: The `EconnectAlarm` entity.
+        sectors: The `SectorBinarySensor` entities, used as target of sector services.
+        switches: The `OutputSwitch` entities.
+        seed: Seed of the random generator used to pick operations.
+    """
+
+    def __init__(self, hass, config_entry, backend, device, coordinator, panel, sectors, switches, seed=0):
+        self.hass = hass
+        self.config_entry = config_entry
+        self.backend = backend
+        self.device = device
+        self.coordinator = coordinator
+        self.panel = panel
+        self.sectors = sectors
+        self.switches = switches
+        self._rng = random.Random(seed)
+        self.operations = {
+            "service_arm_sectors": self._service_sectors("arm_sectors"),
+            "service_disarm_sectors": self._service_sectors("disarm_sectors"),
+            "panel_arm_away": lambda: self.panel.async_alarm_arm_away("1234"),
+            "panel_disarm": lambda: self.panel.async_alarm_disarm("1234"),
+            "switch_turn_on": lambda: self._rng.choice(self.switches).async_turn_on(),
+            "switch_turn_off": lambda: self._rng.choice(self.switches).async_turn_off(),
+            "forced_refresh": self.coordinator.async_refresh,
+            "token_expiry": self._expire_token,
+            "input_change": self._toggle_input,
+        }
+
+    def _service_sectors(self, service):
+        async def call():
+            targets = self._rng.sample(self.sectors, self._rng.randint(1, len(self.sectors)))
+            data = {"entity_id": [sector.entity_id for sector in targets], "code": "1234"}
+            handler = getattr(services, service)
+            await handler(self.hass, ServiceCall(self.hass, DOMAIN, service, data))
+
+        return call
+
+    async def _expire_token(self):
+        self.backend.expire_token()
+
+    async def _toggle_input(self):
+        element = self._rng.choice(list(self.backend.status[q.INPUTS]))
+        await self.hass.async_add_executor_job(self.backend.toggle_input, element)
+
+    async def _poller(self, stop):
+        while not stop.is_set():
+            await self.coordinator.async_refresh()
+
+    async def run(self, operations=200, concurrency=8) -> StressReport:
+        """Run `operations` random operations with `concurrency` workers, and return the report."""
+        report = StressReport()
+        queue = [self._rng.choice(list(self.operations)) for _ in range(operations)]
+
+        async def worker():
+            while queue:
+                name = queue.pop()
+                started_at = time.perf_counter()
+                try:
+                    await self.operations[name]()
+                except Exception:
+                    # Errors raised to the caller are expected (e.g. a switch command with an expired token)
+                    report.errors[name] = report.errors.get(name, 0) + 1
+                report.latencies.setdefault(name, []).append(time.perf_counter() - started_at)
+
+        stop = asyncio.Event()
+        poller = asyncio.ensure_future(self._poller(stop))
+        started_at = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        report.elapsed = time.perf_counter() - started_at
+        stop.set()
+        await poller
+        return report
+
+    async def settle(self, attempts=10):
+        """Wait for pending commands and refreshes, then poll until the backend reports no changes."""
+        await self.hass.async_block_till_done()
+        tasks = [task for task in self.coordinator._fast_refreshes.values() if not task.done()]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        username = self.config_entry.data["username"]
+        password = self.config_entry.data["password"]
+        await self.hass.async_add_executor_job(self.device.connect, username, password)
+        for _ in range(attempts):
+            status = await self.hass.async_add_executor_job(self.device.has_updates)
+            if not status["has_changes"]:
+                return
+            await self.coordinator._async_update_device()
+        raise AssertionError(f"Backend still reports changes after {attempts} updates")
@@ -1,6 +1,7 @@
 import logging
 
 import pytest
+from elmo import query as q
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from custom_components.econnect_metronet.alarm_control_panel import EconnectAlarm
@@ -68,3 +69,12 @@ async def test_alarm_panel_arm_away_with_options(mocker, panel):
     await panel.async_alarm_arm_away(code=42)
     assert arm.call_count == 1
     assert arm.call_args.kwargs["sectors"] == [1, 2]
+
+
+def test_alarm_panel_unavailable_when_stale(panel):
+    # Ensure the alarm panel is unavailable when sectors data is stale
+    panel._device.set_stale_ttl({"stale_state_ttl": 60})
+    assert panel.available is True
+    # Test
+    panel._device._confirmed_at[q.SECTORS] -= 120
+    assert panel.available is False
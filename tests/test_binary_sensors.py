@@ -1,6 +1,7 @@
 import logging
 
 import pytest
+from elmo import query as q
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from custom_components.econnect_metronet.binary_sensor import (
@@ -10,6 +11,7 @@ from custom_components.econnect_metronet.binary_sensor import (
     async_setup_entry,
 )
 from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.helpers import EntityFactory, sector_index
 
 
 @pytest.mark.asyncio
@@ -100,7 +102,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("device_tamper", 7, config_entry, "device_tamper", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "device_tamper",
+            7,
+            config_entry,
+            "device_tamper",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is True
 
     def test_binary_sensor_is_off(self, hass, config_entry, alarm_device):
@@ -108,7 +118,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("device_failure", 2, config_entry, "device_failure", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "device_failure",
+            2,
+            config_entry,
+            "device_failure",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is False
 
     def test_binary_sensor_missing(self, hass, config_entry, alarm_device):
@@ -116,7 +134,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("test_id", 1000, config_entry, "test_id", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "test_id",
+            1000,
+            config_entry,
+            "test_id",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         with pytest.raises(KeyError):
             assert entity.is_on is False
 
@@ -125,7 +151,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("anomalies_led", 1, config_entry, "anomalies_led", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "anomalies_led",
+            1,
+            config_entry,
+            "anomalies_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is False
 
     def test_binary_sensor_anomalies_led_is_on(self, hass, config_entry, alarm_device):
@@ -134,7 +168,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("anomalies_led", 1, config_entry, "anomalies_led", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "anomalies_led",
+            1,
+            config_entry,
+            "anomalies_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is True
 
     def test_binary_sensor_name(self, hass, config_entry, alarm_device):
@@ -142,7 +184,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("test_id", 0, config_entry, "has_anomalies", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "test_id",
+            0,
+            config_entry,
+            "has_anomalies",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.translation_key == "has_anomalies"
 
     def test_binary_sensor_name_with_system_name(self, hass, config_entry, alarm_device):
@@ -151,7 +201,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("test_id", 0, config_entry, "has_anomalies", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "test_id",
+            0,
+            config_entry,
+            "has_anomalies",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.translation_key == "has_anomalies"
 
     def test_binary_sensor_entity_id(self, hass, config_entry, alarm_device):
@@ -159,7 +217,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("test_id", 0, config_entry, "has_anomalies", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "test_id",
+            0,
+            config_entry,
+            "has_anomalies",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_has_anomalies"
 
     def test_binary_sensor_entity_id_with_system_name(self, hass, config_entry, alarm_device):
@@ -168,7 +234,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("test_id", 0, config_entry, "has_anomalies", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "test_id",
+            0,
+            config_entry,
+            "has_anomalies",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_home_has_anomalies"
 
     def test_binary_sensor_unique_id(self, hass, config_entry, alarm_device):
@@ -176,7 +250,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("test_id", 0, config_entry, "has_anomalies", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "test_id",
+            0,
+            config_entry,
+            "has_anomalies",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.unique_id == "test_id"
 
     def test_binary_sensor_icon(self, hass, config_entry, alarm_device):
@@ -184,7 +266,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("test_id", 0, config_entry, "has_anomalies", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "test_id",
+            0,
+            config_entry,
+            "has_anomalies",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.icon == "hass:alarm-light"
 
     def test_binary_sensor_device_class(self, hass, config_entry, alarm_device):
@@ -192,7 +282,15 @@ class TestAlertBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertBinarySensor("test_id", 0, config_entry, "has_anomalies", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "test_id",
+            0,
+            config_entry,
+            "has_anomalies",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.device_class == "problem"
 
 
@@ -202,7 +300,15 @@ class TestInputBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = InputBinarySensor("test_id", 1, config_entry, "1 Tamper Sirena", coordinator, alarm_device)
+        entity = InputBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 Tamper Sirena",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.name == "1 Tamper Sirena"
 
     def test_binary_sensor_name_with_system_name(self, hass, config_entry, alarm_device):
@@ -211,7 +317,15 @@ class TestInputBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = InputBinarySensor("test_id", 1, config_entry, "1 Tamper Sirena", coordinator, alarm_device)
+        entity = InputBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 Tamper Sirena",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.name == "1 Tamper Sirena"
 
     def test_binary_sensor_entity_id(self, hass, config_entry, alarm_device):
@@ -219,7 +333,15 @@ class TestInputBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = InputBinarySensor("test_id", 1, config_entry, "1 Tamper Sirena", coordinator, alarm_device)
+        entity = InputBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 Tamper Sirena",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_1_tamper_sirena"
 
     def test_binary_sensor_entity_id_with_system_name(self, hass, config_entry, alarm_device):
@@ -228,7 +350,15 @@ class TestInputBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = InputBinarySensor("test_id", 1, config_entry, "1 Tamper Sirena", coordinator, alarm_device)
+        entity = InputBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 Tamper Sirena",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_home_1_tamper_sirena"
 
     def test_binary_sensor_unique_id(self, hass, config_entry, alarm_device):
@@ -236,7 +366,15 @@ class TestInputBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = InputBinarySensor("test_id", 1, config_entry, "1 Tamper Sirena", coordinator, alarm_device)
+        entity = InputBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 Tamper Sirena",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.unique_id == "test_id"
 
     def test_binary_sensor_icon(self, hass, config_entry, alarm_device):
@@ -244,7 +382,15 @@ class TestInputBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = InputBinarySensor("test_id", 1, config_entry, "1 Tamper Sirena", coordinator, alarm_device)
+        entity = InputBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 Tamper Sirena",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.icon == "hass:electric-switch"
 
     def test_binary_sensor_off(self, hass, config_entry, alarm_device):
@@ -252,7 +398,15 @@ class TestInputBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = InputBinarySensor("test_id", 2, config_entry, "Outdoor Sensor 2", coordinator, alarm_device)
+        entity = InputBinarySensor(
+            "test_id",
+            2,
+            config_entry,
+            "Outdoor Sensor 2",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is False
 
     def test_binary_sensor_on(self, hass, config_entry, alarm_device):
@@ -260,7 +414,15 @@ class TestInputBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = InputBinarySensor("test_id", 1, config_entry, "Outdoor Sensor 1", coordinator, alarm_device)
+        entity = InputBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "Outdoor Sensor 1",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is True
 
 
@@ -270,7 +432,15 @@ class TestSectorBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 1, config_entry, "1 S1 Living Room", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 S1 Living Room",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.device_class == "sector"
 
     def test_binary_sensor_input_name(self, hass, config_entry, alarm_device):
@@ -278,7 +448,15 @@ class TestSectorBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 1, config_entry, "1 S1 Living Room", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 S1 Living Room",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.name == "1 S1 Living Room"
 
     def test_binary_sensor_input_name_with_system_name(self, hass, config_entry, alarm_device):
@@ -287,7 +465,15 @@ class TestSectorBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 1, config_entry, "1 S1 Living Room", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 S1 Living Room",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.name == "1 S1 Living Room"
 
     def test_binary_sensor_input_entity_id(self, hass, config_entry, alarm_device):
@@ -295,16 +481,48 @@ class TestSectorBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 1, config_entry, "1 S1 Living Room", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 S1 Living Room",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_1_s1_living_room"
 
+    def test_binary_sensor_sector_index(self, hass, config_entry, alarm_device):
+        # Ensure the sector is registered in the index shared by all entries
+        coordinator = DataUpdateCoordinator(
+            hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
+        )
+        SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 S2 Bedroom",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
+        assert sector_index(hass)["econnect_metronet_test_user_1_s2_bedroom"] == ("test_entry_id", 2)
+
     def test_binary_sensor_input_entity_id_with_system_name(self, hass, config_entry, alarm_device):
         # Ensure the Entity ID takes into consideration the system name
         hass.config_entries.async_update_entry(config_entry, data={"system_name": "Home"})
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 1, config_entry, "1 S1 Living Room", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 S1 Living Room",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_home_1_s1_living_room"
 
     def test_binary_sensor_input_unique_id(self, hass, config_entry, alarm_device):
@@ -312,7 +530,15 @@ class TestSectorBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 1, config_entry, "1 S1 Living Room", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "1 S1 Living Room",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.unique_id == "test_id"
 
     def test_binary_sensor_icon(self, hass, config_entry, alarm_device):
@@ -320,7 +546,15 @@ class TestSectorBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 1, config_entry, "S2 Bedroom", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "S2 Bedroom",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.icon == "hass:shield-home-outline"
 
     def test_binary_sensor_off(self, hass, config_entry, alarm_device):
@@ -328,7 +562,15 @@ class TestSectorBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 2, config_entry, "S3 Outdoor", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            2,
+            config_entry,
+            "S3 Outdoor",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is False
 
     def test_binary_sensor_on(self, hass, config_entry, alarm_device):
@@ -336,5 +578,60 @@ class TestSectorBinarySensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = SectorBinarySensor("test_id", 1, config_entry, "S2 Bedroom", coordinator, alarm_device)
+        entity = SectorBinarySensor(
+            "test_id",
+            1,
+            config_entry,
+            "S2 Bedroom",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is True
+
+
+@pytest.mark.parametrize(
+    "entity_class,entity_id,category",
+    [(InputBinarySensor, 1, q.INPUTS), (SectorBinarySensor, 1, q.SECTORS), (AlertBinarySensor, 2, q.ALERTS)],
+)
+def test_binary_sensor_unavailable_when_stale(hass, config_entry, alarm_device, entity_class, entity_id, category):
+    # Ensure binary sensors are unavailable only when the data of their category is stale
+    coordinator = DataUpdateCoordinator(
+        hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
+    )
+    entity = entity_class(
+        "test_id",
+        entity_id,
+        config_entry,
+        "test_name",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
+    alarm_device.set_stale_ttl({"stale_state_ttl": 60})
+    assert entity.available is True
+    # Test
+    alarm_device._confirmed_at[category] -= 120
+    assert entity.available is False
+
+
+def test_connection_status_available_when_stale(hass, config_entry, alarm_device):
+    # Ensure the connection status is available when alerts data is stale, to report the disconnection
+    coordinator = DataUpdateCoordinator(
+        hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
+    )
+    entity = AlertBinarySensor(
+        "test_id",
+        -1,
+        config_entry,
+        "connection_status",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
+    alarm_device.set_stale_ttl({"stale_state_ttl": 60})
+    alarm_device.connected = False
+    # Test
+    alarm_device._confirmed_at[q.ALERTS] -= 120
+    assert entity.available is True
+    assert entity.is_on is True
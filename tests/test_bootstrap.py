@@ -0,0 +1,149 @@
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+from elmo.api.client import ElmoClient
+from homeassistant.config_entries import ConfigEntryState, current_entry
+
+from custom_components.econnect_metronet import async_setup_entry
+from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.helpers import flow_devices
+
+from .hass.fixtures import MockConfigEntry
+
+# Upper bounds (in seconds) for the integration import and the config entry setup. The import budget
+# is about twice the measured import time (about 45 ms, Home Assistant modules excluded), so that an
+# eager import of a heavy module fails the test. The setup budget includes the first refresh.
+IMPORT_BUDGET = 0.1
+SETUP_BUDGET = 1.0
+# The import time is the best of a few runs, so that a busy machine doesn't fail the test
+IMPORT_RUNS = 3
+
+# Home Assistant modules are imported before the integration, as it happens during the bootstrap
+HA_IMPORTS = (
+    "import homeassistant.core, homeassistant.config_entries, homeassistant.helpers.update_coordinator, "
+    "homeassistant.components.alarm_control_panel, homeassistant.components.binary_sensor, "
+    "homeassistant.components.sensor, homeassistant.components.switch"
+)
+
+
+def _run(code):
+    """Run the code in a fresh interpreter, so that no module is cached."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    return result.stdout, result.stderr
+
+
+def _import_time():
+    """Return the time (in seconds) spent importing the integration, after the Home Assistant modules."""
+    _, importtime = _run(f"{HA_IMPORTS}; import custom_components.econnect_metronet")
+    # `-X importtime` reports the cumulative time (in microseconds) of each module in the second column
+    lines = [
+        line for line in importtime.splitlines() if line.rstrip().endswith("| custom_components.econnect_metronet")
+    ]
+    return int(lines[-1].split("|")[1]) / 1_000_000
+
+
+def test_import_time_budget():
+    # Ensure the integration import (done during bootstrap) stays within the budget
+    elapsed = min(_import_time() for _ in range(IMPORT_RUNS))
+    assert elapsed < IMPORT_BUDGET
+
+
+def test_import_lazy_modules():
+    # Ensure modules that are not needed at import time are not loaded with the integration
+    output, _ = _run(
+        f"{HA_IMPORTS}; import sys, json, custom_components.econnect_metronet; print(json.dumps(list(sys.modules)))"
+    )
+    modules = json.loads(output)
+    assert "elmo.api.client" not in modules
+    assert "custom_components.econnect_metronet.traffic" not in modules
+    assert "custom_components.econnect_metronet.config_flow" not in modules
+    assert "custom_components.econnect_metronet.profiler" not in modules
+    assert "custom_components.econnect_metronet.views" not in modules
+    assert "cProfile" not in modules
+    assert "pstats" not in modules
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_time_budget(hass, config_entry, client, mocker):
+    # Ensure the config entry setup (including the first refresh) stays within the budget
+    mocker.patch("elmo.api.client.ElmoClient", return_value=client)
+    mocker.patch.object(hass.config_entries, "async_forward_entry_setups")
+    # The coordinator reads the entry being set up, like during a Home Assistant setup
+    current_entry.set(config_entry)
+    # Test
+    started_at = time.perf_counter()
+    assert await async_setup_entry(hass, config_entry) is True
+    elapsed = time.perf_counter() - started_at
+    assert elapsed < SETUP_BUDGET
+    assert hass.data[DOMAIN][config_entry.entry_id]["device"].connected is True
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_shares_connections(hass, config_entry, client, mocker):
+    # Ensure the client of the entry uses the connection pool shared by all entries
+    mocker.patch("elmo.api.client.ElmoClient", return_value=client)
+    mocker.patch.object(hass.config_entries, "async_forward_entry_setups")
+    current_entry.set(config_entry)
+    # Test
+    assert await async_setup_entry(hass, config_entry) is True
+    assert client._session.get_adapter("https://example.com") is hass.data[DOMAIN]["http_adapter"]
+
+
+@pytest.mark.asyncio
+async def test_setup_entries_share_adapter(hass, config_entry, client, mocker):
+    # Ensure entries of different panels mount the identical adapter on their own session
+    other_entry = MockConfigEntry(
+        domain=DOMAIN,
+        entry_id="other_entry_id",
+        data={**config_entry.data, "username": "other_user", "domain": "other_domain"},
+        state=ConfigEntryState.SETUP_IN_PROGRESS,
+    )
+    other_entry.add_to_hass(hass)
+    clients = [client, ElmoClient(base_url="https://example.com", domain="other_domain")]
+    mocker.patch("elmo.api.client.ElmoClient", side_effect=clients)
+    mocker.patch.object(hass.config_entries, "async_forward_entry_setups")
+    # Test
+    for entry in (config_entry, other_entry):
+        current_entry.set(entry)
+        assert await async_setup_entry(hass, entry) is True
+    first, second = [c._session.get_adapter("https://example.com") for c in clients]
+    assert first is second is hass.data[DOMAIN]["http_adapter"]
+    assert clients[0]._session is not clients[1]._session
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_reuses_flow_device(hass, config_entry, alarm_device, mocker):
+    # Ensure the setup reuses the session and inventory fetched by the config flow
+    flow_devices(hass)[("https://example.com", "econnect_metronet", "test_user")] = alarm_device
+    client = mocker.patch("elmo.api.client.ElmoClient")
+    mocker.patch.object(hass.config_entries, "async_forward_entry_setups")
+    connect = mocker.spy(alarm_device, "connect")
+    update = mocker.spy(alarm_device, "update")
+    current_entry.set(config_entry)
+    # Test
+    assert await async_setup_entry(hass, config_entry) is True
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    assert hass.data[DOMAIN][config_entry.entry_id]["device"] is alarm_device
+    assert coordinator.data == alarm_device._inventory
+    assert coordinator.last_update_success is True
+    assert client.call_count == 0
+    assert connect.call_count == 0
+    assert update.call_count == 0
+    assert flow_devices(hass) == {}
+
+
+@pytest.mark.asyncio
+async def test_setup_entry_failure_discards_flow_device(hass, config_entry, alarm_device, mocker):
+    # Ensure a failed setup doesn't keep the device of the config flow, so that a retry starts from scratch
+    flow_devices(hass)[("https://example.com", "econnect_metronet", "test_user")] = alarm_device
+    mocker.patch.object(hass.config_entries, "async_forward_entry_setups", side_effect=RuntimeError("setup failed"))
+    current_entry.set(config_entry)
+    # Test
+    with pytest.raises(RuntimeError):
+        await async_setup_entry(hass, config_entry)
+    assert flow_devices(hass) == {}
@@ -1,11 +1,14 @@
 import pytest
+from elmo import query as q
 from elmo.api.exceptions import CredentialError
 from homeassistant import config_entries
 from homeassistant.data_entry_flow import InvalidData
 from requests.exceptions import ConnectionError, HTTPError
 from requests.models import Response
 
-from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.config_flow import _async_evict_device
+from custom_components.econnect_metronet.const import DOMAIN, FLOW_DEVICE_TTL
+from custom_components.econnect_metronet.helpers import flow_devices
 
 from .helpers import _
 
@@ -21,9 +24,11 @@ async def test_form_fields(hass):
     assert form["data_schema"].schema["domain"] == str
 
 
+# The setup is mocked, so the timer that discards the unused device of the flow is still scheduled
+@pytest.mark.parametrize("expected_lingering_timers", [True])
 async def test_form_submit_successful_with_input(hass, mocker):
     # Ensure a properly submitted form initializes an ElmoClient
-    m_client = mocker.patch(_("config_flow.ElmoClient"))
+    m_client = mocker.patch("elmo.api.client.ElmoClient")
     m_setup = mocker.patch(_("async_setup"), return_value=True)
     m_setup_entry = mocker.patch(_("async_setup_entry"), return_value=True)
     form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
@@ -56,9 +61,91 @@ async def test_form_submit_successful_with_input(hass, mocker):
     }
 
 
+# The setup is mocked, so the timer that discards the unused device of the flow is still scheduled
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_form_submit_hands_inventory_to_setup(hass, client, mocker):
+    # Ensure the device validated by the flow, with its inventory, is stored for the entry setup
+    mocker.patch("elmo.api.client.ElmoClient", return_value=client)
+    mocker.patch(_("async_setup"), return_value=True)
+    mocker.patch(_("async_setup_entry"), return_value=True)
+    form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    # Test
+    await hass.config_entries.flow.async_configure(
+        form["flow_id"],
+        {
+            "username": "test-username",
+            "password": "test-password",
+            "domain": "default",
+            "system_base_url": "https://connect.elmospa.com",
+        },
+    )
+    await hass.async_block_till_done()
+    device = flow_devices(hass)[("https://connect.elmospa.com", "default", "test-username")]
+    assert device.connected is True
+    assert len(list(device.items(q.SECTORS))) == 3
+
+
+async def test_form_submit_device_expires(hass, client, mocker):
+    # Ensure the device stored for the entry setup is discarded if the setup doesn't pick it in time
+    mocker.patch("elmo.api.client.ElmoClient", return_value=client)
+    mocker.patch(_("async_setup"), return_value=True)
+    mocker.patch(_("async_setup_entry"), return_value=True)
+    call_later = mocker.patch(_("config_flow.async_call_later"))
+    form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    await hass.config_entries.flow.async_configure(
+        form["flow_id"],
+        {
+            "username": "test-username",
+            "password": "test-password",
+            "domain": "default",
+            "system_base_url": "https://connect.elmospa.com",
+        },
+    )
+    await hass.async_block_till_done()
+    _hass, delay, evict = call_later.call_args[0]
+    # Test
+    assert delay == FLOW_DEVICE_TTL
+    assert len(flow_devices(hass)) == 1
+    evict(None)
+    assert flow_devices(hass) == {}
+
+
+async def test_form_submit_device_expires_keeps_newer(hass, alarm_device, mocker):
+    # Ensure an expired flow doesn't discard the device stored by a newer flow for the same entry
+    key = ("https://connect.elmospa.com", "default", "test-username")
+    flow_devices(hass)[key] = alarm_device
+    # Test
+    _async_evict_device(hass, key, mocker.Mock(), None)
+    assert flow_devices(hass)[key] is alarm_device
+
+
+async def test_form_submit_inventory_error(hass, mocker):
+    # Ensure the entry is created even if the inventory can't be fetched during the flow
+    m_client = mocker.patch("elmo.api.client.ElmoClient")
+    m_client().query.side_effect = HTTPError()
+    mocker.patch(_("async_setup"), return_value=True)
+    mocker.patch(_("async_setup_entry"), return_value=True)
+    form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    # Test
+    result = await hass.config_entries.flow.async_configure(
+        form["flow_id"],
+        {
+            "username": "test-username",
+            "password": "test-password",
+            "domain": "default",
+            "system_base_url": "https://connect.elmospa.com",
+        },
+    )
+    await hass.async_block_till_done()
+    assert result["type"] == "create_entry"
+    assert flow_devices(hass) == {}
+
+
+# The setup is mocked, so the timer that discards the unused device of the flow is still scheduled
+@pytest.mark.parametrize("expected_lingering_timers", [True])
 async def test_form_submit_with_defaults(hass, mocker):
     # Ensure a properly submitted form with defaults
-    m_client = mocker.patch(_("config_flow.ElmoClient"))
+    m_client = mocker.patch("elmo.api.client.ElmoClient")
     m_setup = mocker.patch(_("async_setup"), return_value=True)
     m_setup_entry = mocker.patch(_("async_setup_entry"), return_value=True)
     form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
@@ -118,7 +205,7 @@ async def test_form_submit_required_fields(hass, mocker):
 
 async def test_form_submit_wrong_credential(hass, mocker):
     # Ensure the right error is raised for CredentialError exception
-    mocker.patch(_("config_flow.ElmoClient"), side_effect=CredentialError)
+    mocker.patch("elmo.api.client.ElmoClient", side_effect=CredentialError)
     mocker.patch(_("async_setup"), return_value=True)
     mocker.patch(_("async_setup_entry"), return_value=True)
     form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
@@ -138,7 +225,7 @@ async def test_form_submit_wrong_credential(hass, mocker):
 
 async def test_form_submit_connection_error(hass, mocker):
     # Ensure the right error is raised for connection errors
-    mocker.patch(_("config_flow.ElmoClient"), side_effect=ConnectionError)
+    mocker.patch("elmo.api.client.ElmoClient", side_effect=ConnectionError)
     mocker.patch(_("async_setup"), return_value=True)
     mocker.patch(_("async_setup_entry"), return_value=True)
     form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
@@ -160,7 +247,7 @@ async def test_form_client_errors(hass, mocker):
     # Ensure the right error is raised for 4xx API errors
     mocker.patch(_("async_setup"), return_value=True)
     mocker.patch(_("async_setup_entry"), return_value=True)
-    m_client = mocker.patch(_("config_flow.ElmoClient.auth"))
+    m_client = mocker.patch("elmo.api.client.ElmoClient.auth")
     err = HTTPError(response=Response())
     form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
     # Test 400-499 status codes
@@ -184,7 +271,7 @@ async def test_form_server_errors(hass, mocker):
     # Ensure the right error is raised for 5xx API errors
     mocker.patch(_("async_setup"), return_value=True)
     mocker.patch(_("async_setup_entry"), return_value=True)
-    m_client = mocker.patch(_("config_flow.ElmoClient.auth"))
+    m_client = mocker.patch("elmo.api.client.ElmoClient.auth")
     err = HTTPError(response=Response())
     form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
     # Test 500-599 status codes
@@ -210,7 +297,7 @@ async def test_form_unknown_errors(hass, mocker):
     mocker.patch(_("async_setup_entry"), return_value=True)
     err = HTTPError(response=Response())
     err.response.status_code = 999
-    mocker.patch(_("config_flow.ElmoClient.auth"), side_effect=err)
+    mocker.patch("elmo.api.client.ElmoClient.auth", side_effect=err)
     form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
     # Test non-error status codes
     result = await hass.config_entries.flow.async_configure(
@@ -230,7 +317,7 @@ async def test_form_generic_exception(hass, mocker):
     # Ensure we catch unexpected exceptions
     mocker.patch(_("async_setup"), return_value=True)
     mocker.patch(_("async_setup_entry"), return_value=True)
-    mocker.patch(_("config_flow.ElmoClient.auth"), side_effect=Exception("Random Exception"))
+    mocker.patch("elmo.api.client.ElmoClient.auth", side_effect=Exception("Random Exception"))
     form = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
     # Test
     result = await hass.config_entries.flow.async_configure(
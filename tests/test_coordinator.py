@@ -1,12 +1,27 @@
+import asyncio
+import threading
 from datetime import timedelta
 
 import pytest
-from elmo.api.exceptions import CredentialError, DeviceDisconnectedError, InvalidToken
+from elmo import query as q
+from elmo.api.exceptions import (
+    CommandError,
+    CredentialError,
+    DeviceDisconnectedError,
+    InvalidToken,
+)
 from homeassistant.exceptions import ConfigEntryNotReady
 from requests.exceptions import HTTPError
 
+from custom_components.econnect_metronet.const import (
+    EVENT_INPUT_CHANGED,
+    EVENT_SECTOR_CHANGED,
+)
 from custom_components.econnect_metronet.coordinator import AlarmCoordinator
 
+from .hass.common import async_capture_events
+from .helpers import _
+
 
 def test_coordinator_constructor(hass, alarm_device):
     # Ensure that the coordinator is initialized correctly
@@ -276,3 +291,407 @@ async def test_coordinator_async_update_disconnected_device(mocker, coordinator)
     await coordinator._async_update_data()
     assert coordinator._device.update.call_count == 1
     assert coordinator._device.has_updates.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fires_input_changed_event(hass, mocker, coordinator):
+    # Ensure an event is fired when an input changes its status between two updates
+    events = async_capture_events(hass, EVENT_INPUT_CHANGED)
+    mocker.patch.object(coordinator._device, "has_updates")
+    coordinator._device.has_updates.return_value = {"has_changes": True}
+    coordinator._device._inventory[q.INPUTS][0]["status"] = False
+    # Test
+    await coordinator._async_update_data()
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert events[0].data["entry_id"] == "test_entry_id"
+    assert events[0].data["id"] == 0
+    assert events[0].data["element"] == 1
+    assert events[0].data["name"] == "Entryway Sensor"
+    assert events[0].data["old_status"] is False
+    assert events[0].data["new_status"] is True
+    assert "timestamp" in events[0].data
+
+
+@pytest.mark.asyncio
+async def test_coordinator_records_transitions(mocker, coordinator):
+    # Ensure transitions detected during an update are stored in the device history
+    mocker.patch.object(coordinator._device, "has_updates")
+    coordinator._device.has_updates.return_value = {"has_changes": True}
+    coordinator._device._inventory[q.INPUTS][0]["status"] = False
+    # Test
+    await coordinator._async_update_data()
+    history = coordinator._device.history()
+    assert len(history) == 1
+    assert history[0]["category"] == "input"
+    assert history[0]["name"] == "Entryway Sensor"
+    assert history[0]["old_status"] is False
+    assert history[0]["new_status"] is True
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fires_sector_changed_event(hass, mocker, coordinator):
+    # Ensure an event is fired when a sector changes its status between two updates
+    events = async_capture_events(hass, EVENT_SECTOR_CHANGED)
+    mocker.patch.object(coordinator._device, "has_updates")
+    coordinator._device.has_updates.return_value = {"has_changes": True}
+    coordinator._device._inventory[q.SECTORS][2]["status"] = True
+    # Test
+    await coordinator._async_update_data()
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert events[0].data["id"] == 2
+    assert events[0].data["name"] == "S3 Outdoor"
+    assert events[0].data["old_status"] is True
+    assert events[0].data["new_status"] is False
+
+
+@pytest.mark.asyncio
+async def test_coordinator_no_events_without_transitions(hass, mocker, coordinator):
+    # Ensure no events are fired if the update doesn't change any status
+    input_events = async_capture_events(hass, EVENT_INPUT_CHANGED)
+    sector_events = async_capture_events(hass, EVENT_SECTOR_CHANGED)
+    mocker.patch.object(coordinator._device, "has_updates")
+    coordinator._device.has_updates.return_value = {"has_changes": True}
+    # Test
+    await coordinator._async_update_data()
+    await hass.async_block_till_done()
+    assert input_events == []
+    assert sector_events == []
+
+
+@pytest.mark.asyncio
+async def test_coordinator_no_events_on_first_refresh(hass, coordinator):
+    # Ensure the first refresh doesn't fire events for items that were not known before
+    events = async_capture_events(hass, EVENT_INPUT_CHANGED)
+    coordinator.data = None
+    coordinator._device._inventory = {}
+    # Test
+    await coordinator.async_config_entry_first_refresh()
+    await hass.async_block_till_done()
+    assert events == []
+
+
+@pytest.mark.asyncio
+async def test_coordinator_send_output(mocker, coordinator):
+    # Ensure an output command is sent and its result is returned to the caller
+    mocker.patch(_("coordinator.OUTPUT_QUEUE_WINDOW"), 0)
+    turn_on = mocker.patch.object(coordinator._device._connection, "turn_on")
+    fast_refresh = mocker.patch.object(coordinator, "async_schedule_fast_refresh")
+    # Test
+    assert await coordinator.async_send_output(0, True) is True
+    turn_on.assert_called_once_with(1)
+    fast_refresh.assert_called_once_with(q.OUTPUTS)
+
+
+@pytest.mark.asyncio
+async def test_coordinator_send_outputs_batched(mocker, coordinator):
+    # Ensure concurrent output commands are sent together with a single executor job
+    mocker.patch(_("coordinator.OUTPUT_QUEUE_WINDOW"), 0)
+    mocker.patch.object(coordinator._device._connection, "turn_on")
+    mocker.patch.object(coordinator._device._connection, "turn_off")
+    mocker.patch.object(coordinator, "async_schedule_fast_refresh")
+    turn_outputs = mocker.spy(coordinator._device, "turn_outputs")
+    # Test
+    results = await asyncio.gather(
+        coordinator.async_send_output(0, True),
+        coordinator.async_send_output(0, False),
+        coordinator.async_send_output(2, True),
+    )
+    assert results == [True, True, False]
+    assert turn_outputs.call_count == 1
+    assert turn_outputs.call_args[0][0] == [(0, True), (0, False), (2, True)]
+    assert coordinator._output_commands == []
+
+
+@pytest.mark.asyncio
+async def test_coordinator_send_outputs_error(mocker, coordinator):
+    # Ensure an error is reported only to the command that failed
+    mocker.patch(_("coordinator.OUTPUT_QUEUE_WINDOW"), 0)
+    mocker.patch.object(coordinator._device._connection, "turn_on")
+    turn_off = mocker.patch.object(coordinator._device._connection, "turn_off")
+    turn_off.side_effect = CommandError()
+    mocker.patch.object(coordinator, "async_schedule_fast_refresh")
+    # Test
+    results = await asyncio.gather(
+        coordinator.async_send_output(0, True),
+        coordinator.async_send_output(0, False),
+        return_exceptions=True,
+    )
+    assert results[0] is True
+    assert isinstance(results[1], CommandError)
+
+
+@pytest.mark.asyncio
+async def test_coordinator_send_outputs_executor_error(mocker, coordinator, caplog):
+    # Ensure a failure of the whole batch is logged and reported to all callers
+    mocker.patch(_("coordinator.OUTPUT_QUEUE_WINDOW"), 0)
+    mocker.patch.object(coordinator._device, "turn_outputs", side_effect=RuntimeError("executor failure"))
+    # Test
+    results = await asyncio.gather(
+        coordinator.async_send_output(0, True),
+        coordinator.async_send_output(2, False),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert "Coordinator | Unable to send 2 output commands: executor failure" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_coordinator_shutdown_cancels_output_flush(mocker, coordinator):
+    # Ensure the flush runs as a background task of the entry and is cancelled on unload, with its callers
+    turn_outputs = mocker.patch.object(coordinator._device, "turn_outputs")
+    background_task = mocker.spy(coordinator.config_entry, "async_create_background_task")
+    command = asyncio.ensure_future(coordinator.async_send_output(0, True))
+    await asyncio.sleep(0)
+    flush = coordinator._output_flush
+    # Test
+    await coordinator.async_shutdown()
+    with pytest.raises(asyncio.CancelledError):
+        await command
+    await asyncio.sleep(0)
+    assert flush.cancelled()
+    assert background_task.call_count == 1
+    assert coordinator._output_flush is None
+    assert coordinator._output_commands == []
+    assert turn_outputs.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_coordinator_no_changes_rolls_back_optimistic(mocker, coordinator):
+    # Ensure expired optimistic statuses are rolled back even if no changes are detected
+    mocker.patch.object(coordinator._device, "has_updates")
+    coordinator._device.has_updates.return_value = {"has_changes": False}
+    coordinator._device._optimistic[(q.OUTPUTS, 0)] = (False, 0)
+    # Test
+    await coordinator._async_update_data()
+    assert coordinator._device._optimistic == {}
+    assert coordinator._device.get_status(q.OUTPUTS, 0) is True
+
+
+@pytest.mark.asyncio
+async def test_coordinator_send_output_failed_no_fast_refresh(mocker, coordinator):
+    # Ensure no fast refresh is scheduled if no command succeeded
+    mocker.patch(_("coordinator.OUTPUT_QUEUE_WINDOW"), 0)
+    mocker.patch.object(coordinator._device._connection, "turn_on").side_effect = CommandError()
+    fast_refresh = mocker.patch.object(coordinator, "async_schedule_fast_refresh")
+    # Test
+    with pytest.raises(CommandError):
+        await coordinator.async_send_output(0, True)
+    assert fast_refresh.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fast_refresh_settled(mocker, coordinator):
+    # Ensure the fast refresh stops as soon as the expected statuses are reported
+    mocker.patch(_("coordinator.FAST_REFRESH_SCHEDULE"), (0, 0, 0))
+    refresh = mocker.patch.object(coordinator._device, "refresh", return_value=True)
+    update = mocker.spy(coordinator._device, "update")
+    update_listeners = mocker.spy(coordinator, "async_update_listeners")
+    # Test
+    await coordinator._async_fast_refresh(q.SECTORS)
+    refresh.assert_called_once_with(q.SECTORS)
+    assert update.call_count == 0
+    assert update_listeners.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fast_refresh_retries(mocker, coordinator):
+    # Ensure the fast refresh follows the schedule until the expected statuses are reported
+    mocker.patch(_("coordinator.FAST_REFRESH_SCHEDULE"), (0, 0, 0))
+    refresh = mocker.patch.object(coordinator._device, "refresh", side_effect=[False, False, True])
+    # Test
+    await coordinator._async_fast_refresh(q.OUTPUTS)
+    assert refresh.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fast_refresh_gives_up(mocker, coordinator):
+    # Ensure the fast refresh stops when the schedule is over
+    mocker.patch(_("coordinator.FAST_REFRESH_SCHEDULE"), (0, 0))
+    refresh = mocker.patch.object(coordinator._device, "refresh", return_value=False)
+    # Test
+    await coordinator._async_fast_refresh(q.OUTPUTS)
+    assert refresh.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fast_refresh_error(mocker, coordinator):
+    # Ensure errors stop the fast refresh without being raised
+    mocker.patch(_("coordinator.FAST_REFRESH_SCHEDULE"), (0, 0))
+    refresh = mocker.patch.object(coordinator._device, "refresh", side_effect=DeviceDisconnectedError())
+    # Test
+    await coordinator._async_fast_refresh(q.SECTORS)
+    assert refresh.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fast_refresh_fires_events(hass, mocker, coordinator):
+    # Ensure transitions detected by the fast refresh fire events and are recorded
+    mocker.patch(_("coordinator.FAST_REFRESH_SCHEDULE"), (0,))
+    events = async_capture_events(hass, EVENT_SECTOR_CHANGED)
+    coordinator._device._inventory[q.SECTORS][2]["status"] = True
+    # Test
+    await coordinator._async_fast_refresh(q.SECTORS)
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert events[0].data["id"] == 2
+    assert len(coordinator._device.history()) == 1
+
+
+@pytest.mark.asyncio
+async def test_coordinator_fast_refresh_overlaps_update(hass, mocker, coordinator):
+    # Ensure a change is reported once when a fast refresh starts while a full update is in progress
+    mocker.patch(_("coordinator.FAST_REFRESH_SCHEDULE"), (0,))
+    events = async_capture_events(hass, EVENT_SECTOR_CHANGED)
+    coordinator._device._inventory[q.SECTORS][2]["status"] = True
+    release = threading.Event()
+    query = coordinator._device._connection.query
+
+    def slow_query(*args):
+        release.wait(5)
+        return query(*args)
+
+    patched = mocker.patch.object(coordinator._device._connection, "query", side_effect=slow_query)
+    update = hass.async_create_task(coordinator._async_update_device())
+    while not patched.call_count:
+        await asyncio.sleep(0.01)
+    refresh = hass.async_create_task(coordinator._async_fast_refresh(q.SECTORS))
+    await asyncio.sleep(0.05)
+    # Test
+    release.set()
+    await asyncio.gather(update, refresh)
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert events[0].data["id"] == 2
+    assert len(coordinator._device.history()) == 1
+
+
+@pytest.mark.asyncio
+async def test_coordinator_schedule_fast_refresh_cancels_previous(hass, mocker, coordinator):
+    # Ensure a new fast refresh replaces the one scheduled for the same category
+    mocker.patch(_("coordinator.FAST_REFRESH_SCHEDULE"), (10,))
+    coordinator.async_schedule_fast_refresh(q.SECTORS)
+    first = coordinator._fast_refreshes[q.SECTORS]
+    # Test
+    coordinator.async_schedule_fast_refresh(q.SECTORS)
+    await asyncio.sleep(0)
+    assert first.cancelled()
+    assert coordinator._fast_refreshes[q.SECTORS] is not first
+    coordinator._fast_refreshes[q.SECTORS].cancel()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_concurrent_updates_joined(hass, mocker, coordinator):
+    # Ensure concurrent callers share the same update, that queries the backend and fires events once
+    events = async_capture_events(hass, EVENT_INPUT_CHANGED)
+    query = mocker.spy(coordinator._device._connection, "query")
+    coordinator._device._inventory[q.INPUTS][0]["status"] = False
+    # Test
+    results = await asyncio.gather(*[coordinator._async_update_device() for _ in range(3)])
+    await hass.async_block_till_done()
+    assert query.call_count == 5
+    assert results[0] is results[1] is results[2]
+    assert len(events) == 1
+    assert coordinator._update_flight is None
+
+
+@pytest.mark.asyncio
+async def test_coordinator_concurrent_updates_error(mocker, coordinator):
+    # Ensure the error of the shared update is raised to all callers
+    calls = []
+
+    def update():
+        # Not a mock, so that the update runs in the executor like the real one
+        calls.append(update)
+        raise HTTPError("500")
+
+    mocker.patch.object(coordinator._device, "update", new=update)
+    # Test
+    results = await asyncio.gather(*[coordinator._async_update_device() for _ in range(2)], return_exceptions=True)
+    assert len(calls) == 1
+    assert all(isinstance(result, HTTPError) for result in results)
+    assert coordinator._update_flight is None
+
+
+@pytest.mark.asyncio
+async def test_coordinator_update_caller_cancelled(mocker, coordinator):
+    # Ensure joined callers run the update again if the caller running it is cancelled
+    started = asyncio.Event()
+    calls = []
+
+    async def full_update():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            started.set()
+            await asyncio.sleep(10)
+        return {"update": len(calls)}
+
+    mocker.patch.object(coordinator, "_async_full_update", side_effect=full_update)
+    leader = asyncio.ensure_future(coordinator._async_update_device())
+    await started.wait()
+    joined = asyncio.ensure_future(coordinator._async_update_device())
+    await asyncio.sleep(0)
+    # Test
+    leader.cancel()
+    assert await joined == {"update": 2}
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_debounced_input_exposed_when_due(hass, mocker, coordinator):
+    # Ensure input changes delayed by the debouncer fire their event and notify entities once due
+    events = async_capture_events(hass, EVENT_INPUT_CHANGED)
+    device = coordinator._device
+    device.set_input_filter({"input_settle_time": 2})
+    device._debouncer.filter(0, False, now=0)
+    device._debouncer.filter(0, True, now=device._debouncer.clock())
+    device._inventory[q.INPUTS][0]["status"] = False
+    mocker.patch.object(device, "update")
+    call_later = mocker.patch("custom_components.econnect_metronet.coordinator.async_call_later")
+    listeners = mocker.patch.object(coordinator, "async_update_listeners")
+    await coordinator._async_update_device()
+    assert call_later.call_count == 1
+    assert 0 < call_later.call_args[0][1] <= 2
+    # Test
+    device._debouncer.clock = lambda: float("inf")
+    call_later.call_args[0][2](None)
+    await hass.async_block_till_done()
+    assert device.get_status(q.INPUTS, 0) is True
+    assert len(events) == 1
+    assert events[0].data["new_status"] is True
+    assert listeners.call_count == 1
+    assert call_later.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_coordinator_debounce_timer_replaced(mocker, coordinator):
+    # Ensure a new update replaces the pending debounce timer, and shutdown cancels it
+    unsub = mocker.Mock()
+    mocker.patch("custom_components.econnect_metronet.coordinator.async_call_later", return_value=unsub)
+    mocker.patch.object(coordinator._device, "update")
+    mocker.patch.object(coordinator._device, "debounce_delay", return_value=1)
+    await coordinator._async_update_device()
+    # Test
+    await coordinator._async_update_device()
+    assert unsub.call_count == 1
+    await coordinator.async_shutdown()
+    assert unsub.call_count == 2
+    assert coordinator._debounce_unsub is None
+
+
+@pytest.mark.asyncio
+async def test_coordinator_cycles_counted(mocker, coordinator):
+    # Ensure coordinator cycles are counted by result
+    metrics = coordinator._device.metrics
+    mocker.patch.object(coordinator._device, "has_updates", return_value={"has_changes": False})
+    await coordinator._async_update_data()
+    coordinator._device.has_updates.return_value = {"has_changes": True}
+    await coordinator._async_update_data()
+    coordinator._device.has_updates.side_effect = DeviceDisconnectedError
+    # Test
+    await coordinator._async_update_data()
+    assert metrics.counter("econnect_metronet_coordinator_cycles_total", (("result", "no_changes"),)) == 1
+    assert metrics.counter("econnect_metronet_coordinator_cycles_total", (("result", "updated"),)) >= 1
+    assert metrics.counter("econnect_metronet_coordinator_cycles_total", (("result", "disconnected"),)) == 1
+    assert metrics.counter("econnect_metronet_disconnections_total") == 1
@@ -0,0 +1,106 @@
+from custom_components.econnect_metronet.debounce import InputDebouncer
+
+
+def test_debouncer_disabled():
+    # Ensure statuses are reported as they are without durations
+    debouncer = InputDebouncer()
+    # Test
+    assert not debouncer.enabled
+    assert debouncer.filter(1, False, now=0) is False
+    assert debouncer.filter(1, True, now=0.1) is True
+    assert debouncer.filter(1, False, now=0.2) is False
+    assert debouncer.deadline() is None
+    assert debouncer.suppressed_total == 0
+
+
+def test_debouncer_first_status():
+    # Ensure the first status of an input is reported immediately
+    debouncer = InputDebouncer(settle=5)
+    # Test
+    assert debouncer.filter(1, True, now=0) is True
+    assert debouncer.deadline() is None
+
+
+def test_debouncer_settle_suppresses_flaps():
+    # Ensure changes reverted within the settle time are suppressed and counted
+    debouncer = InputDebouncer(settle=2)
+    debouncer.filter(1, False, now=0)
+    # Test
+    assert debouncer.filter(1, True, now=10) is False
+    assert debouncer.deadline() == 12
+    assert debouncer.filter(1, False, now=10.5) is False
+    assert debouncer.filter(1, True, now=11) is False
+    assert debouncer.filter(1, False, now=11.5) is False
+    assert debouncer.deadline() is None
+    assert debouncer.suppressed == {1: 2}
+    assert debouncer.suppressed_total == 2
+
+
+def test_debouncer_settle_reports_stable_change():
+    # Ensure a stable change is reported once the settle time is elapsed
+    debouncer = InputDebouncer(settle=2)
+    debouncer.filter(1, False, now=0)
+    debouncer.filter(1, True, now=10)
+    # Test
+    assert debouncer.filter(1, True, now=11) is False
+    assert debouncer.filter(1, None, now=12) is True
+    assert debouncer.deadline() is None
+    assert debouncer.suppressed_total == 0
+
+
+def test_debouncer_min_on():
+    # Ensure an input is reported as on for at least the minimum on time
+    debouncer = InputDebouncer(min_on=5)
+    debouncer.filter(1, False, now=0)
+    # Test
+    assert debouncer.filter(1, True, now=10) is True
+    assert debouncer.filter(1, False, now=11) is True
+    assert debouncer.deadline() == 15
+    assert debouncer.filter(1, None, now=15) is False
+
+
+def test_debouncer_min_off():
+    # Ensure an input is reported as off for at least the minimum off time
+    debouncer = InputDebouncer(min_off=5)
+    debouncer.filter(1, True, now=0)
+    # Test
+    assert debouncer.filter(1, False, now=10) is False
+    assert debouncer.filter(1, True, now=11) is False
+    assert debouncer.filter(1, False, now=12) is False
+    assert debouncer.suppressed_total == 1
+    assert debouncer.filter(1, True, now=13) is False
+    assert debouncer.filter(1, None, now=15) is True
+
+
+def test_debouncer_inputs_are_independent():
+    # Ensure each input has its own filter state
+    debouncer = InputDebouncer(settle=2)
+    debouncer.filter(1, False, now=0)
+    debouncer.filter(2, False, now=0)
+    # Test
+    debouncer.filter(1, True, now=10)
+    debouncer.filter(2, True, now=11)
+    assert debouncer.deadline() == 12
+    assert debouncer.filter(1, None, now=12) is True
+    assert debouncer.filter(2, None, now=12) is False
+    assert debouncer.deadline() == 13
+
+
+def test_debouncer_unknown_input_without_status():
+    # Ensure evaluating an unknown input without a status doesn't track it
+    debouncer = InputDebouncer(settle=2)
+    # Test
+    assert debouncer.filter(1, None, now=0) is None
+    assert debouncer.filter(1, True, now=1) is True
+
+
+def test_debouncer_clock():
+    # Ensure the clock is used when the current time is not provided
+    now = [0]
+    debouncer = InputDebouncer(settle=2, clock=lambda: now[0])
+    debouncer.filter(1, False)
+    now[0] = 10
+    debouncer.filter(1, True)
+    # Test
+    now[0] = 12
+    assert debouncer.filter(1, None) is True
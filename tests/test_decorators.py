@@ -1,4 +1,5 @@
 import pytest
+from elmo import query as q
 from elmo.api.exceptions import CodeError, LockError
 
 from custom_components.econnect_metronet.decorators import set_device_state
@@ -17,6 +18,22 @@ async def test_set_device_state_successful(panel):
     assert panel._device.state == "new_state"
 
 
+@pytest.mark.asyncio
+async def test_set_device_state_update_listeners(panel, mocker):
+    """Should notify other entities about the new (optimistic) statuses."""
+    update_listeners = mocker.spy(panel.coordinator, "async_update_listeners")
+    fast_refresh = mocker.patch.object(panel.coordinator, "async_schedule_fast_refresh")
+
+    @set_device_state("new_state", "loader_state")
+    async def test_func(self):
+        pass
+
+    # Test
+    await test_func(panel)
+    assert update_listeners.call_count == 1
+    fast_refresh.assert_called_once_with(q.SECTORS)
+
+
 @pytest.mark.asyncio
 async def test_set_device_state_lock_error(panel):
     """Should revert the device state to the previous state."""
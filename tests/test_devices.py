@@ -1,22 +1,47 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 import responses
 from elmo import query as q
-from elmo.api.exceptions import CodeError, CredentialError, LockError, ParseError
+from elmo.api.exceptions import (
+    CodeError,
+    CommandError,
+    CredentialError,
+    DeviceDisconnectedError,
+    LockError,
+    ParseError,
+)
 from homeassistant.components.alarm_control_panel import AlarmControlPanelState
 from requests.exceptions import HTTPError
 from requests.models import Response
 
 from custom_components.econnect_metronet.binary_sensor import SectorBinarySensor
 from custom_components.econnect_metronet.const import (
+    COMMAND_EXPIRATION,
     CONF_AREAS_ARM_AWAY,
     CONF_AREAS_ARM_HOME,
     CONF_AREAS_ARM_NIGHT,
     CONF_AREAS_ARM_VACATION,
+    CONF_INPUT_MIN_OFF,
+    CONF_INPUT_MIN_ON,
+    CONF_INPUT_SETTLE,
     CONF_MANAGE_SECTORS,
+    CONF_REFRESH_OUTPUTS,
+    CONF_REFRESH_PANEL,
+    CONF_STALE_TTL,
+    HISTORY_SIZE,
+    OPTIMISTIC_TIMEOUT,
+    REFRESH_ON_CHANGE,
+    REFRESH_PANEL_DEFAULT,
 )
 from custom_components.econnect_metronet.devices import AlarmDevice
+from custom_components.econnect_metronet.helpers import EntityFactory
+from custom_components.econnect_metronet.metrics import Metrics
 
 from .fixtures import responses as r
+from .helpers import _
 
 
 def test_device_constructor(client):
@@ -449,6 +474,27 @@ def test_device_has_updates_parse_errors(client, mocker):
     assert {9: 0, 10: 0, 11: 0, 12: 0} == device._last_ids
 
 
+def test_device_has_updates_errors_throttled(client, mocker, caplog):
+    """Should log repeated polling errors once, and report suppressed errors when polling succeeds again."""
+    device = AlarmDevice(client)
+    device.connect("username", "password")
+    poll = mocker.patch.object(device._connection, "poll")
+    poll.side_effect = ParseError("Error parsing the poll response")
+    # Test
+    for _attempt in range(5):
+        with pytest.raises(ParseError):
+            device.has_updates()
+    poll.side_effect = None
+    poll.return_value = {"has_changes": False}
+    device.has_updates()
+    errors = [record.getMessage() for record in caplog.records if record.levelname == "ERROR"]
+    assert errors == [
+        "Device | Error parsing the poll response: Error parsing the poll response",
+        "Suppressed 4 similar messages, last one: Device | Error parsing the poll response: "
+        "Error parsing the poll response",
+    ]
+
+
 def test_device_update_success(client, mocker):
     """Should check store the e-connect System status in the device object."""
     device = AlarmDevice(client)
@@ -924,6 +970,15 @@ def test_device_update_http_error(client, mocker):
         device.update()
 
 
+def test_device_update_http_error_without_response(client, mocker, caplog):
+    """Tests if device's update method logs HTTPError raised without a response."""
+    device = AlarmDevice(client)
+    mocker.patch.object(device._connection, "query", side_effect=HTTPError("Connection aborted"))
+    with pytest.raises(HTTPError):
+        device.update()
+    assert "Device | Error during the update: Connection aborted" in caplog.text
+
+
 def test_device_update_parse_error(client, mocker):
     """Tests if update method raises ParseError when querying."""
     device = AlarmDevice(client)
@@ -1214,7 +1269,15 @@ def test_device_update_query_not_valid(client, mocker):
 
 def test_device_register_sector(alarm_device, config_entry, coordinator):
     # Ensure a sector can register itself so the device can map entity ids to sector codes
-    sector = SectorBinarySensor("test_id", 0, config_entry, "S1 Living Room", coordinator, alarm_device)
+    sector = SectorBinarySensor(
+        "test_id",
+        0,
+        config_entry,
+        "S1 Living Room",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
     alarm_device._register_sector(sector)
     assert alarm_device._sectors["econnect_metronet_test_user_s1_living_room"] == 1
 
@@ -1699,3 +1762,861 @@ class TestTurnOn:
         # Test
         with pytest.raises(HTTPError):
             alarm_device.turn_on(0)
+
+
+def test_device_record_transition(alarm_device):
+    """Should store transitions in the history, from the oldest to the newest."""
+    alarm_device.record_transition(q.INPUTS, 0, False, True, 0)
+    alarm_device.record_transition(q.SECTORS, 1, True, False, 60)
+    # Test
+    assert alarm_device.history() == [
+        {
+            "timestamp": "1970-01-01T00:00:00+00:00",
+            "category": "input",
+            "id": 0,
+            "name": "Entryway Sensor",
+            "old_status": False,
+            "new_status": True,
+        },
+        {
+            "timestamp": "1970-01-01T00:01:00+00:00",
+            "category": "sector",
+            "id": 1,
+            "name": "S2 Bedroom",
+            "old_status": True,
+            "new_status": False,
+        },
+    ]
+
+
+def test_device_history_filters(alarm_device):
+    """Should filter transitions by category and timestamp."""
+    alarm_device.record_transition(q.INPUTS, 0, False, True, 0)
+    alarm_device.record_transition(q.SECTORS, 1, True, False, 60)
+    alarm_device.record_transition(q.INPUTS, 1, True, False, 120)
+    # Test
+    assert [t["id"] for t in alarm_device.history(category="input")] == [0, 1]
+    assert [t["id"] for t in alarm_device.history(category="sector")] == [1]
+    assert [t["timestamp"] for t in alarm_device.history(since=60)] == [
+        "1970-01-01T00:01:00+00:00",
+        "1970-01-01T00:02:00+00:00",
+    ]
+    assert alarm_device.history(category="sector", since=61) == []
+
+
+def test_device_history_is_bounded(alarm_device):
+    """Should drop the oldest transitions when the history is full."""
+    for timestamp in range(HISTORY_SIZE + 10):
+        alarm_device.record_transition(q.INPUTS, 0, False, True, timestamp)
+    # Test
+    history = alarm_device.history()
+    assert len(history) == HISTORY_SIZE
+    assert history[0]["timestamp"] == "1970-01-01T00:00:10+00:00"
+
+
+def test_device_pop_transitions(alarm_device):
+    """Should return the transitions detected by updates and refreshes once."""
+    alarm_device._inventory[q.SECTORS][2]["status"] = True
+    alarm_device._inventory[q.INPUTS][0]["status"] = False
+    # Test
+    alarm_device.update()
+    alarm_device.refresh(q.SECTORS)
+    assert [transition[:2] + transition[3:] for transition in alarm_device.pop_transitions()] == [
+        (q.SECTORS, 2, True, False),
+        (q.INPUTS, 0, False, True),
+    ]
+    assert alarm_device.pop_transitions() == []
+
+
+def test_device_no_transitions_for_new_items(alarm_device):
+    """Should not detect transitions for items that were not known before the update."""
+    alarm_device._inventory = {}
+    # Test
+    alarm_device.update()
+    assert alarm_device.pop_transitions() == []
+
+
+class TestCommandLatency:
+    def test_disarm_confirmed(self, alarm_device, mocker):
+        # Ensure the latency is measured when an update confirms the disarmed sectors
+        clock = mocker.patch(_("devices.time.monotonic"), return_value=100)
+        alarm_device.disarm("1234", sectors=[3])
+        # Test
+        clock.return_value = 104.5
+        alarm_device.update()
+        assert alarm_device.last_command_latency == 4.5
+        assert alarm_device.command_latency.count == 1
+        assert alarm_device._pending_commands == []
+
+    def test_arm_not_confirmed(self, alarm_device, mocker):
+        # Ensure the command is kept pending if the update doesn't confirm the armed sectors
+        clock = mocker.patch(_("devices.time.monotonic"), return_value=100)
+        alarm_device.arm("1234", sectors=[3])
+        # Test
+        clock.return_value = 104.5
+        alarm_device.update()
+        assert alarm_device.last_command_latency is None
+        assert alarm_device.command_latency.count == 0
+        assert alarm_device._pending_commands == [(100, q.SECTORS, {3: True})]
+
+    def test_arm_all_sectors(self, alarm_device, mocker):
+        # Ensure arming without sectors expects all sectors to be armed
+        mocker.patch(_("devices.time.monotonic"), return_value=100)
+        alarm_device.arm("1234")
+        # Test
+        assert alarm_device._pending_commands == [(100, q.SECTORS, {1: True, 2: True, 3: True})]
+
+    def test_command_expired(self, alarm_device, mocker):
+        # Ensure commands that are never confirmed are discarded after the expiration
+        clock = mocker.patch(_("devices.time.monotonic"), return_value=100)
+        alarm_device.arm("1234", sectors=[3])
+        # Test
+        clock.return_value = 100 + COMMAND_EXPIRATION
+        alarm_device.update()
+        assert alarm_device.last_command_latency is None
+        assert alarm_device._pending_commands == []
+
+    def test_output_confirmed(self, alarm_device, mocker):
+        # Ensure the latency is measured when an update confirms the output status
+        clock = mocker.patch(_("devices.time.monotonic"), return_value=100)
+        alarm_device.turn_on(0)
+        # Test
+        clock.return_value = 101
+        alarm_device.update()
+        assert alarm_device.last_command_latency == 1
+        assert alarm_device.command_latency.as_dict()["buckets"]["1"] == 1
+
+    def test_output_not_confirmed(self, alarm_device, mocker):
+        # Ensure the command is kept pending if the update doesn't confirm the output status
+        clock = mocker.patch(_("devices.time.monotonic"), return_value=100)
+        alarm_device.turn_off(0)
+        # Test
+        clock.return_value = 101
+        alarm_device.update()
+        assert alarm_device.last_command_latency is None
+        assert alarm_device._pending_commands == [(100, q.OUTPUTS, {1: False})]
+
+
+class TestTurnOutputs:
+    def test_commands_in_order(self, alarm_device, mocker):
+        # Ensure commands are sent in order and their results are returned
+        manager = mocker.Mock()
+        mocker.patch.object(alarm_device._connection, "turn_on", manager.turn_on)
+        mocker.patch.object(alarm_device._connection, "turn_off", manager.turn_off)
+        # Test
+        assert alarm_device.turn_outputs([(0, False), (0, True), (1, True)]) == [True, True, False]
+        assert manager.mock_calls == [mocker.call.turn_off(1), mocker.call.turn_on(1)]
+
+    def test_commands_with_errors(self, alarm_device, mocker):
+        # Ensure a failing command doesn't prevent the others from being sent
+        turn_on = mocker.patch.object(alarm_device._connection, "turn_on")
+        turn_off = mocker.patch.object(alarm_device._connection, "turn_off")
+        turn_off.side_effect = HTTPError(response=Response())
+        # Test
+        results = alarm_device.turn_outputs([(0, False), (0, True)])
+        assert isinstance(results[0], HTTPError)
+        assert results[1] is True
+        assert turn_on.call_count == 1
+
+
+class TestRunSequence:
+    @pytest.fixture(autouse=True)
+    def commands(self, alarm_device, mocker):
+        # Mock commands while using the real lock session
+        self.lock = mocker.spy(alarm_device._connection, "lock")
+        self.arm = mocker.patch.object(alarm_device._connection, "arm")
+        self.disarm = mocker.patch.object(alarm_device._connection, "disarm")
+        self.turn_on = mocker.patch.object(alarm_device._connection, "turn_on")
+        self.turn_off = mocker.patch.object(alarm_device._connection, "turn_off")
+
+    def test_success(self, alarm_device):
+        # Ensure all steps are executed within a single lock session
+        steps = [
+            {"action": "disarm", "sectors": [2]},
+            {"action": "turn_on", "output": 1},
+            {"action": "arm", "sectors": [3]},
+        ]
+        # Test
+        result = alarm_device.run_sequence("1234", steps)
+        assert self.lock.call_count == 1
+        assert self.disarm.call_args[1] == {"sectors": [2]}
+        assert self.turn_on.call_args[0] == (1,)
+        assert self.arm.call_args[1] == {"sectors": [3]}
+        assert result == {
+            "success": True,
+            "rolled_back": False,
+            "steps": [
+                {"step": 0, "action": "disarm", "success": True},
+                {"step": 1, "action": "turn_on", "success": True},
+                {"step": 2, "action": "arm", "success": True},
+            ],
+        }
+
+    def test_tracks_commands(self, alarm_device, mocker):
+        # Ensure each step is tracked to measure the confirmation latency
+        mocker.patch(_("devices.time.monotonic"), return_value=100)
+        steps = [{"action": "disarm", "sectors": [2]}, {"action": "turn_off", "output": 1}]
+        # Test
+        alarm_device.run_sequence("1234", steps)
+        assert alarm_device._pending_commands == [(100, q.SECTORS, {2: False}), (100, q.OUTPUTS, {1: False})]
+
+    def test_failure_with_rollback(self, alarm_device):
+        # Ensure completed steps are reverted when a step fails
+        steps = [
+            {"action": "disarm", "sectors": [2]},
+            {"action": "turn_on", "output": 3},
+            {"action": "arm", "sectors": [3]},
+        ]
+        # Test
+        result = alarm_device.run_sequence("1234", steps)
+        assert self.lock.call_count == 1
+        assert self.arm.call_count == 1
+        assert self.arm.call_args[1] == {"sectors": [2]}
+        assert result == {
+            "success": False,
+            "rolled_back": True,
+            "steps": [
+                {"step": 0, "action": "disarm", "success": True, "rolled_back": True},
+                {"step": 1, "action": "turn_on", "success": False, "error": "Output 3 can't be manually controlled"},
+                {"step": 2, "action": "arm", "success": False, "skipped": True},
+            ],
+        }
+
+    def test_failure_without_rollback(self, alarm_device):
+        # Ensure completed steps are kept if the rollback is disabled
+        self.turn_off.side_effect = CommandError()
+        steps = [{"action": "disarm", "sectors": [2]}, {"action": "turn_off", "output": 1}]
+        # Test
+        result = alarm_device.run_sequence("1234", steps, rollback=False)
+        assert self.arm.call_count == 0
+        assert result == {
+            "success": False,
+            "rolled_back": False,
+            "steps": [
+                {"step": 0, "action": "disarm", "success": True},
+                {"step": 1, "action": "turn_off", "success": False, "error": str(CommandError())},
+            ],
+        }
+
+    def test_rollback_only_changed_targets(self, alarm_device):
+        # Ensure the rollback doesn't change items that were already in the expected status
+        self.turn_off.side_effect = CommandError()
+        steps = [{"action": "disarm", "sectors": [2, 3]}, {"action": "turn_off", "output": 1}]
+        # Test
+        result = alarm_device.run_sequence("1234", steps)
+        assert self.arm.call_args[1] == {"sectors": [2]}
+        assert result["steps"][0]["rolled_back"] is True
+
+    def test_rollback_error(self, alarm_device):
+        # Ensure a failing rollback is reported
+        self.arm.side_effect = CommandError()
+        steps = [{"action": "disarm", "sectors": [2]}, {"action": "turn_on", "output": 3}]
+        # Test
+        result = alarm_device.run_sequence("1234", steps)
+        assert result["rolled_back"] is True
+        assert result["steps"][0]["rolled_back"] is False
+
+    def test_lock_error(self, alarm_device, mocker):
+        # Ensure no steps are executed if the lock can't be acquired
+        self.lock.side_effect = LockError()
+        # Test
+        with pytest.raises(LockError):
+            alarm_device.run_sequence("1234", [{"action": "disarm", "sectors": [2]}])
+        assert self.disarm.call_count == 0
+
+
+class TestOptimisticState:
+    def test_output_applied(self, alarm_device, mocker):
+        # Ensure the expected status is returned right after a successful command
+        mocker.patch.object(alarm_device._connection, "turn_off")
+        # Test
+        alarm_device.turn_off(0)
+        assert alarm_device.get_status(q.OUTPUTS, 0) is False
+        assert alarm_device._inventory[q.OUTPUTS][0]["status"] is True
+
+    def test_output_not_applied_on_error(self, alarm_device, mocker):
+        # Ensure the status is not changed if the command fails
+        mocker.patch.object(alarm_device._connection, "turn_off").side_effect = CommandError()
+        # Test
+        with pytest.raises(CommandError):
+            alarm_device.turn_off(0)
+        assert alarm_device.get_status(q.OUTPUTS, 0) is True
+        assert alarm_device._optimistic == {}
+
+    def test_sectors_applied(self, alarm_device, mocker):
+        # Ensure sectors and the alarm state are updated right after a successful command
+        mocker.patch.object(alarm_device._connection, "disarm")
+        # Test
+        alarm_device.disarm("1234", sectors=[1, 2])
+        assert alarm_device.get_status(q.SECTORS, 0) is False
+        assert alarm_device.get_status(q.SECTORS, 1) is False
+        assert alarm_device.state == AlarmControlPanelState.DISARMED
+
+    def test_pending_until_timeout(self, alarm_device, mocker):
+        # Ensure the optimistic status is kept while waiting for the confirmation
+        clock = mocker.patch(_("devices.time.monotonic"), return_value=100)
+        mocker.patch.object(alarm_device._connection, "turn_off")
+        alarm_device.turn_off(0)
+        # Test
+        clock.return_value = 100 + OPTIMISTIC_TIMEOUT - 1
+        alarm_device.update()
+        assert alarm_device.get_status(q.OUTPUTS, 0) is False
+
+    def test_rollback_after_timeout(self, alarm_device, mocker):
+        # Ensure the optimistic status is rolled back if it's not confirmed in time
+        clock = mocker.patch(_("devices.time.monotonic"), return_value=100)
+        mocker.patch.object(alarm_device._connection, "turn_off")
+        alarm_device.turn_off(0)
+        # Test
+        clock.return_value = 100 + OPTIMISTIC_TIMEOUT
+        assert alarm_device.reconcile() is True
+        assert alarm_device.get_status(q.OUTPUTS, 0) is True
+        assert alarm_device._optimistic == {}
+
+    def test_confirmed(self, alarm_device, mocker):
+        # Ensure the optimistic status is removed when the backend confirms it
+        mocker.patch.object(alarm_device._connection, "disarm")
+        alarm_device.disarm("1234", sectors=[1])
+        alarm_device._inventory[q.SECTORS][0]["status"] = False
+        # Test
+        assert alarm_device.reconcile() is True
+        assert alarm_device._optimistic == {}
+        assert alarm_device.get_status(q.SECTORS, 0) is False
+
+    def test_reconcile_without_changes(self, alarm_device):
+        # Ensure reconcile doesn't report changes if nothing is pending
+        assert alarm_device.reconcile() is False
+
+    def test_reconcile_waits_update(self, alarm_device, mocker):
+        # Ensure reconcile doesn't roll back statuses while an update or a refresh is in progress
+        clock = mocker.patch(_("devices.time.monotonic"), return_value=100)
+        mocker.patch.object(alarm_device._connection, "turn_off")
+        alarm_device.turn_off(0)
+        clock.return_value = 100 + OPTIMISTIC_TIMEOUT
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with alarm_device._inventory_lock:
+                reconcile = executor.submit(alarm_device.reconcile)
+                time.sleep(0.05)
+                # Test
+                assert not reconcile.done()
+                assert alarm_device._optimistic != {}
+            assert reconcile.result() is True
+        assert alarm_device._optimistic == {}
+
+
+class TestRefresh:
+    def test_refresh_single_category(self, alarm_device, mocker):
+        # Ensure only the requested category is queried and updated
+        query = mocker.spy(alarm_device._connection, "query")
+        alarm_device._inventory[q.SECTORS][2]["status"] = True
+        alarm_device._inventory[q.INPUTS][0]["status"] = False
+        alarm_device._last_ids[q.SECTORS] = 0
+        # Test
+        assert alarm_device.refresh(q.SECTORS) is True
+        query.assert_called_once_with(q.SECTORS)
+        assert alarm_device._inventory[q.SECTORS][2]["status"] is False
+        assert alarm_device._inventory[q.INPUTS][0]["status"] is False
+        assert alarm_device._last_ids[q.SECTORS] == 4
+
+    def test_refresh_managed_sectors(self, alarm_device):
+        # Ensure only managed sectors are kept in the inventory
+        alarm_device._managed_sectors = [2, 3]
+        # Test
+        alarm_device.refresh(q.SECTORS)
+        assert list(alarm_device._inventory[q.SECTORS].keys()) == [1, 2]
+
+    def test_refresh_confirms_optimistic(self, alarm_device, mocker):
+        # Ensure optimistic statuses confirmed by the refresh are removed
+        mocker.patch.object(alarm_device._connection, "turn_off")
+        alarm_device.turn_off(0)
+        # Test
+        assert alarm_device.is_pending(q.OUTPUTS) is True
+        alarm_device._connection.query = mocker.Mock(
+            return_value={
+                "last_id": 5,
+                "outputs": {
+                    0: {"element": 1, "id": 1, "index": 0, "name": "Output 1", "status": False},
+                },
+            }
+        )
+        assert alarm_device.refresh(q.OUTPUTS) is True
+        assert alarm_device.is_pending(q.OUTPUTS) is False
+
+    def test_refresh_not_confirmed(self, alarm_device, mocker):
+        # Ensure the refresh reports optimistic statuses that are still pending
+        mocker.patch.object(alarm_device._connection, "turn_off")
+        alarm_device.turn_off(0)
+        # Test
+        assert alarm_device.refresh(q.OUTPUTS) is False
+        assert alarm_device.get_status(q.OUTPUTS, 0) is False
+
+    def test_refresh_updates_state(self, alarm_device):
+        # Ensure the alarm state is computed with the refreshed sectors
+        alarm_device._inventory[q.SECTORS][0]["status"] = False
+        alarm_device._inventory[q.SECTORS][1]["status"] = False
+        alarm_device.state = AlarmControlPanelState.DISARMED
+        # Test
+        alarm_device.refresh(q.SECTORS)
+        assert alarm_device.state == AlarmControlPanelState.ARMED_AWAY
+
+    def test_refresh_connection_reset(self, alarm_device, mocker):
+        # Ensure the inventory is not updated after a connection reset
+        alarm_device._connection.query = mocker.Mock(return_value={"last_id": 1, "sectors": {}})
+        # Test
+        alarm_device.refresh(q.SECTORS)
+        assert len(alarm_device._inventory[q.SECTORS]) == 3
+
+    def test_refresh_disconnected(self, alarm_device, mocker):
+        # Ensure the device is marked as disconnected if the main unit is not reachable
+        mocker.patch.object(alarm_device._connection, "query").side_effect = DeviceDisconnectedError()
+        # Test
+        with pytest.raises(DeviceDisconnectedError):
+            alarm_device.refresh(q.SECTORS)
+        assert alarm_device.connected is False
+
+
+def test_device_set_arm_profiles(alarm_device):
+    # Ensure arm profiles can be changed and the state is computed again
+    assert alarm_device.state == AlarmControlPanelState.ARMED_AWAY
+    # Test
+    alarm_device.set_arm_profiles({"areas_arm_night": [1, 2]})
+    assert alarm_device._sectors_night == [1, 2]
+    assert alarm_device._sectors_away == []
+    assert alarm_device.state == AlarmControlPanelState.ARMED_NIGHT
+
+
+def test_device_set_arm_profiles_without_inventory(client):
+    # Ensure the state is not computed before the first update
+    device = AlarmDevice(client)
+    # Test
+    device.set_arm_profiles({"areas_arm_home": [1]})
+    assert device._sectors_home == [1]
+    assert device.state is None
+
+
+class TestRefreshPolicies:
+    def test_update_skips_categories_not_due(self, alarm_device, mocker):
+        # Ensure an update triggered by the long-polling skips unchanged outputs and the panel
+        alarm_device.has_updates()
+        query = mocker.spy(alarm_device._connection, "query")
+        # Test
+        alarm_device.update()
+        assert [call.args[0] for call in query.call_args_list] == [q.SECTORS, q.INPUTS, q.ALERTS]
+        assert q.OUTPUTS in alarm_device._inventory
+        assert q.PANEL in alarm_device._inventory
+
+    def test_update_changed_outputs(self, alarm_device, mocker):
+        # Ensure outputs are queried when the long-polling reports a change
+        poll = {"has_changes": True, "areas": False, "inputs": False, "outputs": True, "statusadv": False}
+        mocker.patch.object(alarm_device._connection, "poll", return_value=poll)
+        alarm_device.has_updates()
+        query = mocker.spy(alarm_device._connection, "query")
+        # Test
+        alarm_device.update()
+        assert q.OUTPUTS in [call.args[0] for call in query.call_args_list]
+
+    def test_update_panel_every_n_updates(self, alarm_device, mocker):
+        # Ensure the panel is queried once every N updates
+        query = mocker.spy(alarm_device._connection, "query")
+        # Test
+        for _update in range(REFRESH_PANEL_DEFAULT):
+            alarm_device.has_updates()
+            alarm_device.update()
+        assert [call.args[0] for call in query.call_args_list].count(q.PANEL) == 1
+
+    def test_update_without_poll_queries_all(self, alarm_device, mocker):
+        # Ensure updates not triggered by the long-polling (e.g. after an error) query all categories
+        alarm_device.has_updates()
+        alarm_device.update()
+        query = mocker.spy(alarm_device._connection, "query")
+        # Test
+        alarm_device.update()
+        assert query.call_count == 5
+
+    def test_update_error_queries_all(self, alarm_device, mocker):
+        # Ensure changes reported by the poll are discarded if the update fails
+        alarm_device.has_updates()
+        mocker.patch.object(alarm_device._connection, "query").side_effect = ParseError()
+        with pytest.raises(ParseError):
+            alarm_device.update()
+        mocker.stopall()
+        query = mocker.spy(alarm_device._connection, "query")
+        # Test
+        alarm_device.update()
+        assert query.call_count == 5
+
+    def test_update_keeps_skipped_last_ids(self, alarm_device):
+        # Ensure skipped categories keep their last known IDs, so the long-polling reports their changes
+        alarm_device._last_ids[q.OUTPUTS] = 0
+        alarm_device.has_updates()
+        # Test
+        alarm_device.update()
+        assert alarm_device._last_ids[q.OUTPUTS] == 0
+        assert alarm_device._last_ids[q.SECTORS] == 4
+
+    def test_set_refresh_policies(self, client):
+        # Ensure policies are loaded from the configuration, with defaults for missing ones
+        device = AlarmDevice(client, {CONF_REFRESH_OUTPUTS: 1})
+        # Test
+        assert device._refresh_policies == {q.OUTPUTS: 1, q.PANEL: REFRESH_PANEL_DEFAULT}
+        device.set_refresh_policies({CONF_REFRESH_PANEL: 5})
+        assert device._refresh_policies[q.PANEL] == 5
+
+    def test_set_refresh_policies_panel_on_change(self, client):
+        # Ensure the panel is refreshed periodically, as the long-polling doesn't report its changes
+        device = AlarmDevice(client, {CONF_REFRESH_PANEL: REFRESH_ON_CHANGE})
+        # Test
+        assert device._refresh_policies[q.PANEL] == REFRESH_PANEL_DEFAULT
+
+    def test_update_changed_outputs_periodic_policy(self, alarm_device, mocker):
+        # Ensure a reported change is queried even if the periodic refresh is not due
+        alarm_device.set_refresh_policies({CONF_REFRESH_OUTPUTS: 1000})
+        alarm_device._update_count = 1
+        alarm_device._last_ids[q.OUTPUTS] = 0
+        poll = {"has_changes": True, "areas": False, "inputs": False, "outputs": True, "statusadv": False}
+        mocker.patch.object(alarm_device._connection, "poll", return_value=poll)
+        alarm_device.has_updates()
+        query = mocker.spy(alarm_device._connection, "query")
+        # Test
+        alarm_device.update()
+        assert q.OUTPUTS in [call.args[0] for call in query.call_args_list]
+        assert alarm_device._last_ids[q.OUTPUTS] != 0
+
+
+class CountingLock:
+    """Lock that counts its acquisitions, used to know when threads have checked the in-flight update."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.acquired += 1
+
+    def __exit__(self, *args):
+        self._lock.release()
+
+
+class TestSingleFlightUpdate:
+    def test_concurrent_updates_joined(self, alarm_device, mocker):
+        # Ensure threads calling `update()` at the same time share the in-flight update
+        release = threading.Event()
+        query = alarm_device._connection.query
+
+        def slow_query(*args):
+            release.wait(5)
+            return query(*args)
+
+        patched = mocker.patch.object(alarm_device._connection, "query", side_effect=slow_query)
+        lock = alarm_device._update_lock = CountingLock()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            leader = executor.submit(alarm_device.update)
+            while not patched.call_count:
+                time.sleep(0.01)
+            joined = [executor.submit(alarm_device.update) for _ in range(2)]
+            # The leader and both callers have checked the in-flight update
+            while lock.acquired < 3:
+                time.sleep(0.01)
+            # Test
+            release.set()
+            results = [leader.result(), *(future.result() for future in joined)]
+        assert patched.call_count == 5
+        assert all(result is alarm_device._inventory for result in results)
+        assert alarm_device._update_flight is None
+
+    def test_concurrent_updates_error(self, alarm_device, mocker):
+        # Ensure the error of the in-flight update is raised to joined callers
+        release = threading.Event()
+
+        def failing_query(*args):
+            release.wait(5)
+            raise ParseError("Error parsing the response")
+
+        patched = mocker.patch.object(alarm_device._connection, "query", side_effect=failing_query)
+        lock = alarm_device._update_lock = CountingLock()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(alarm_device.update)
+            while not patched.call_count:
+                time.sleep(0.01)
+            joined = executor.submit(alarm_device.update)
+            while lock.acquired < 2:
+                time.sleep(0.01)
+            # Test
+            release.set()
+            with pytest.raises(ParseError):
+                leader.result()
+            with pytest.raises(ParseError):
+                joined.result()
+        assert patched.call_count == 1
+        assert alarm_device._update_flight is None
+
+    def test_refresh_waits_update(self, alarm_device, mocker):
+        # Ensure a refresh doesn't query and write the inventory while an update is in progress
+        release = threading.Event()
+        query = alarm_device._connection.query
+
+        def slow_query(*args):
+            release.wait(5)
+            return query(*args)
+
+        patched = mocker.patch.object(alarm_device._connection, "query", side_effect=slow_query)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            update = executor.submit(alarm_device.update)
+            while not patched.call_count:
+                time.sleep(0.01)
+            refresh = executor.submit(alarm_device.refresh, q.SECTORS)
+            time.sleep(0.05)
+            # Test
+            assert patched.call_count == 1
+            assert not refresh.done()
+            release.set()
+            update.result()
+            refresh.result()
+        assert [call.args[0] for call in patched.call_args_list] == [
+            q.SECTORS,
+            q.INPUTS,
+            q.OUTPUTS,
+            q.ALERTS,
+            q.PANEL,
+            q.SECTORS,
+        ]
+
+    def test_sequential_updates(self, alarm_device, mocker):
+        # Ensure an update that starts after the previous one is completed queries the backend again
+        query = mocker.spy(alarm_device._connection, "query")
+        # Test
+        alarm_device.update()
+        alarm_device.update()
+        assert query.call_count == 10
+
+
+class TestInputDebounce:
+    @pytest.fixture(autouse=True)
+    def setup(self, alarm_device, mocker):
+        self.now = 0
+        alarm_device._debouncer.clock = lambda: self.now
+        query = alarm_device._connection.query
+        self.inputs = {}
+
+        def patched_query(category):
+            # Override input statuses returned by the backend
+            data = query(category)
+            if category == q.INPUTS:
+                for input_id, status in self.inputs.items():
+                    data["inputs"][input_id]["status"] = status
+            return data
+
+        mocker.patch.object(alarm_device._connection, "query", side_effect=patched_query)
+
+    def test_disabled_by_default(self, alarm_device):
+        # Ensure input changes are exposed immediately without a configuration
+        alarm_device.update()
+        self.inputs[0] = False
+        # Test
+        alarm_device.update()
+        assert alarm_device.get_status(q.INPUTS, 0) is False
+        assert alarm_device.debounce_delay() is None
+
+    def test_set_input_filter(self, alarm_device):
+        # Ensure durations are loaded from the configuration
+        alarm_device.set_input_filter({CONF_INPUT_SETTLE: 2, CONF_INPUT_MIN_ON: 5, CONF_INPUT_MIN_OFF: 1.5})
+        # Test
+        assert alarm_device._debouncer.settle == 2
+        assert alarm_device._debouncer.min_on == 5
+        assert alarm_device._debouncer.min_off == 1.5
+        alarm_device.set_input_filter({})
+        assert not alarm_device._debouncer.enabled
+
+    def test_flap_suppressed(self, alarm_device):
+        # Ensure a change reverted within the settle time is never exposed, and it's counted
+        alarm_device.set_input_filter({CONF_INPUT_SETTLE: 2})
+        alarm_device.update()
+        self.inputs[0] = False
+        self.now = 1
+        alarm_device.update()
+        assert alarm_device.get_status(q.INPUTS, 0) is True
+        assert alarm_device.debounce_delay() == 2
+        # Test
+        self.inputs[0] = True
+        self.now = 2
+        alarm_device.update()
+        assert alarm_device.get_status(q.INPUTS, 0) is True
+        assert alarm_device.debounce_delay() is None
+        assert alarm_device.suppressed_transitions == 1
+
+    def test_stable_change_exposed_when_due(self, alarm_device):
+        # Ensure a stable change is exposed once due, without querying the backend
+        alarm_device.set_input_filter({CONF_INPUT_SETTLE: 2})
+        alarm_device.update()
+        self.inputs[0] = False
+        self.now = 1
+        alarm_device.update()
+        alarm_device._connection.query.reset_mock()
+        # Test
+        self.now = 3
+        alarm_device.debounce_inputs()
+        assert alarm_device.get_status(q.INPUTS, 0) is False
+        assert alarm_device.debounce_delay() is None
+        assert alarm_device._connection.query.call_count == 0
+        assert alarm_device.suppressed_transitions == 0
+        assert [transition[:2] + transition[3:] for transition in alarm_device.pop_transitions()] == [
+            (q.INPUTS, 0, True, False),
+        ]
+
+    def test_refresh_filtered(self, alarm_device):
+        # Ensure single category refreshes are filtered too
+        alarm_device.set_input_filter({CONF_INPUT_SETTLE: 2})
+        alarm_device.update()
+        self.inputs[0] = False
+        # Test
+        alarm_device.refresh(q.INPUTS)
+        assert alarm_device.get_status(q.INPUTS, 0) is True
+        assert alarm_device.debounce_delay() == 2
+
+
+class TestStaleState:
+    def test_update_confirms_queried_categories(self, alarm_device, mocker):
+        # Ensure a full update confirms the data of the queried categories
+        alarm_device._confirmed_at = {}
+        mocker.patch("custom_components.econnect_metronet.devices.time.monotonic", return_value=100)
+        # Test
+        alarm_device.update()
+        assert alarm_device._confirmed_at == {
+            q.SECTORS: 100,
+            q.INPUTS: 100,
+            q.OUTPUTS: 100,
+            q.ALERTS: 100,
+            q.PANEL: 100,
+        }
+
+    def test_poll_confirms_unchanged_categories(self, alarm_device, mocker):
+        # Ensure a poll confirms categories without changes, as they are still up to date
+        poll = {"has_changes": True, "areas": False, "inputs": True, "outputs": False, "statusadv": False}
+        mocker.patch.object(alarm_device._connection, "poll", return_value=poll)
+        alarm_device._confirmed_at = {}
+        # Test
+        alarm_device.has_updates()
+        assert set(alarm_device._confirmed_at) == {q.SECTORS, q.OUTPUTS, q.ALERTS}
+
+    def test_refresh_confirms_category(self, alarm_device):
+        # Ensure a single category refresh confirms its data
+        alarm_device._confirmed_at = {}
+        # Test
+        alarm_device.refresh(q.OUTPUTS)
+        assert set(alarm_device._confirmed_at) == {q.OUTPUTS}
+
+    def test_disconnected_device_not_confirmed(self, alarm_device, mocker):
+        # Ensure data is not confirmed when the central unit is disconnected
+        mocker.patch.object(alarm_device._connection, "poll", side_effect=DeviceDisconnectedError)
+        alarm_device._confirmed_at = {}
+        # Test
+        with pytest.raises(DeviceDisconnectedError):
+            alarm_device.has_updates()
+        assert alarm_device._confirmed_at == {}
+
+    def test_data_age(self, alarm_device, mocker):
+        # Ensure the age of a category, or of the oldest category, is returned
+        alarm_device._confirmed_at = {q.SECTORS: 100, q.INPUTS: 90, q.PANEL: 10}
+        mocker.patch("custom_components.econnect_metronet.devices.time.monotonic", return_value=130)
+        # Test
+        assert alarm_device.data_age(q.SECTORS) == 30
+        assert alarm_device.data_age() == 40
+        assert alarm_device.data_age(q.OUTPUTS) is None
+
+    def test_is_stale_disabled_by_default(self, alarm_device, mocker):
+        # Ensure the last known state is kept forever without a TTL
+        alarm_device._confirmed_at = {q.SECTORS: 0}
+        mocker.patch("custom_components.econnect_metronet.devices.time.monotonic", return_value=10**6)
+        # Test
+        assert alarm_device.is_stale(q.SECTORS) is False
+
+    def test_is_stale(self, alarm_device, mocker):
+        # Ensure a category is stale once its data is older than the TTL
+        alarm_device.set_stale_ttl({CONF_STALE_TTL: 60})
+        alarm_device._confirmed_at = {q.SECTORS: 100, q.INPUTS: 30}
+        mocker.patch("custom_components.econnect_metronet.devices.time.monotonic", return_value=130)
+        # Test
+        assert alarm_device.is_stale(q.SECTORS) is False
+        assert alarm_device.is_stale(q.INPUTS) is True
+        assert alarm_device.is_stale(q.OUTPUTS) is False
+
+
+class TestMetrics:
+    def test_poll_counters(self, alarm_device, mocker):
+        # Ensure polls and polls with changes are counted
+        poll = {"has_changes": True, "areas": True, "inputs": False, "outputs": False, "statusadv": False}
+        mocker.patch.object(alarm_device._connection, "poll", side_effect=[poll, {**poll, "has_changes": False}])
+        # Test
+        alarm_device.has_updates()
+        alarm_device.has_updates()
+        assert alarm_device.metrics.counter("econnect_metronet_poll_cycles_total") == 2
+        assert alarm_device.metrics.counter("econnect_metronet_poll_changes_total") == 1
+        histogram = alarm_device.metrics.histograms[("econnect_metronet_query_duration_seconds", (("query", "poll"),))]
+        assert histogram.count == 2
+
+    def test_query_duration(self, alarm_device):
+        # Ensure the duration of each query is recorded, labelled with the category
+        alarm_device.metrics = Metrics()
+        # Test
+        alarm_device.update()
+        alarm_device.refresh(q.SECTORS)
+        histograms = alarm_device.metrics.histograms
+        assert histograms[("econnect_metronet_query_duration_seconds", (("query", "sectors"),))].count == 2
+        assert histograms[("econnect_metronet_query_duration_seconds", (("query", "panel"),))].count == 1
+
+    def test_query_duration_on_error(self, alarm_device, mocker):
+        # Ensure the duration of failed queries is recorded too
+        mocker.patch.object(alarm_device._connection, "query", side_effect=ParseError("Error"))
+        alarm_device.metrics = Metrics()
+        # Test
+        with pytest.raises(ParseError):
+            alarm_device.refresh(q.INPUTS)
+        histogram = alarm_device.metrics.histograms[
+            ("econnect_metronet_query_duration_seconds", (("query", "inputs"),))
+        ]
+        assert histogram.count == 1
+
+    def test_auth_outcomes(self, alarm_device, mocker):
+        # Ensure authentications are counted by outcome
+        alarm_device.connect("username", "password")
+        mocker.patch.object(alarm_device._connection, "auth", side_effect=CredentialError)
+        # Test
+        with pytest.raises(CredentialError):
+            alarm_device.connect("username", "wrong")
+        assert alarm_device.metrics.counter("econnect_metronet_auth_total", (("outcome", "success"),)) >= 1
+        assert alarm_device.metrics.counter("econnect_metronet_auth_total", (("outcome", "CredentialError"),)) == 1
+
+    def test_command_outcomes(self, alarm_device, mocker):
+        # Ensure commands are counted by type and outcome
+        mocker.patch.object(alarm_device._connection, "lock")
+        mocker.patch.object(alarm_device._connection, "arm")
+        mocker.patch.object(alarm_device._connection, "disarm", side_effect=CommandError)
+        # Test
+        alarm_device.arm("1234", [1])
+        with pytest.raises(CommandError):
+            alarm_device.disarm("1234", [1])
+        assert (
+            alarm_device.metrics.counter(
+                "econnect_metronet_commands_total", (("command", "arm"), ("outcome", "success"))
+            )
+            == 1
+        )
+        assert (
+            alarm_device.metrics.counter(
+                "econnect_metronet_commands_total", (("command", "disarm"), ("outcome", "CommandError"))
+            )
+            == 1
+        )
+
+    def test_command_denied(self, alarm_device):
+        # Ensure commands that are not sent are counted as denied
+        alarm_device._inventory[q.OUTPUTS][0]["control_denied_to_users"] = True
+        # Test
+        assert alarm_device.turn_on(0) is False
+        assert (
+            alarm_device.metrics.counter(
+                "econnect_metronet_commands_total", (("command", "turn_on"), ("outcome", "denied"))
+            )
+            == 1
+        )
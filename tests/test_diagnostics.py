@@ -0,0 +1,44 @@
+from elmo import query as q
+
+from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.econnect_metronet.helpers import poll_scheduler
+
+
+async def test_diagnostics_redact_credentials(hass, config_entry, alarm_device):
+    # Ensure credentials are not exposed in the diagnostics
+    hass.data[DOMAIN][config_entry.entry_id] = {"device": alarm_device}
+    # Test
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["entry"]["data"]["username"] == "**REDACTED**"
+    assert diagnostics["entry"]["data"]["password"] == "**REDACTED**"
+    assert diagnostics["entry"]["data"]["domain"] == "econnect_metronet"
+
+
+async def test_diagnostics_history(hass, config_entry, alarm_device):
+    # Ensure the transitions history is included in the diagnostics
+    alarm_device.record_transition(q.SECTORS, 0, False, True, 0)
+    hass.data[DOMAIN][config_entry.entry_id] = {"device": alarm_device}
+    # Test
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["history"] == [
+        {
+            "timestamp": "1970-01-01T00:00:00+00:00",
+            "category": "sector",
+            "id": 0,
+            "name": "S1 Living Room",
+            "old_status": False,
+            "new_status": True,
+        }
+    ]
+
+
+async def test_diagnostics_schedule(hass, config_entry, alarm_device):
+    # Ensure the entry schedule slot is included in the diagnostics
+    hass.data[DOMAIN][config_entry.entry_id] = {"device": alarm_device}
+    poll_scheduler(hass).register(config_entry.entry_id)
+    # Test
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["schedule"] == {"slot": 0, "offset": 0, "running": False, "waiting": 0}
@@ -1,11 +1,20 @@
 from custom_components.econnect_metronet.binary_sensor import AlertBinarySensor
 from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.helpers import EntityFactory
 
 
 class TestExperimentalSettings:
     def test_sensor_force_update_default(self, coordinator, config_entry, alarm_device):
         # Ensure the default is to not force any update
-        entity = AlertBinarySensor("device_tamper", 7, config_entry, "device_tamper", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "device_tamper",
+            7,
+            config_entry,
+            "device_tamper",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity._attr_force_update is False
 
     def test_sensor_force_update_on(self, hass, coordinator, config_entry, alarm_device):
@@ -15,5 +24,13 @@ class TestExperimentalSettings:
                 "force_update": True,
             }
         }
-        entity = AlertBinarySensor("device_tamper", 7, config_entry, "device_tamper", coordinator, alarm_device)
+        entity = AlertBinarySensor(
+            "device_tamper",
+            7,
+            config_entry,
+            "device_tamper",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity._attr_force_update is True
@@ -1,10 +1,19 @@
 import logging
 
 import pytest
+from elmo import query as q
+from elmo.api.client import ElmoClient
 from elmo.api.exceptions import CodeError
 from homeassistant.core import valid_entity_id
 
-from custom_components.econnect_metronet.helpers import generate_entity_id, split_code
+from custom_components.econnect_metronet.binary_sensor import InputBinarySensor
+from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.helpers import (
+    EntityFactory,
+    generate_entity_id,
+    shared_connections,
+    split_code,
+)
 
 
 def test_generate_entity_name_empty(config_entry):
@@ -89,3 +98,69 @@ def test_split_code_with_empty_string_raises_error():
     with pytest.raises(CodeError) as exc_info:
         split_code("")
     assert "format <USER_ID><CODE> without spaces" in str(exc_info.value)
+
+
+@pytest.mark.parametrize("system_name", [None, "Home", "Villa Éclair", "  -- ", "1,000 Pines"])
+@pytest.mark.parametrize(
+    "name",
+    [None, "", "window", "1 Tamper Sirena", " -Garage- ", "Café ✓", "S1_Living Room", "--", "✓", "don't", "2,5"],
+)
+def test_entity_factory_entity_id(hass, config_entry, coordinator, alarm_device, system_name, name):
+    # Ensure the factory generates the same entity IDs of `generate_entity_id()`
+    hass.config_entries.async_update_entry(config_entry, data={"username": "test_user", "system_name": system_name})
+    factory = EntityFactory(config_entry, coordinator, alarm_device)
+    # Test
+    assert factory.entity_id(name) == generate_entity_id(config_entry, name)
+
+
+def test_entity_factory_unique_id(config_entry, coordinator, alarm_device):
+    # Ensure unique IDs are made by the entry ID, the domain and the given parts
+    factory = EntityFactory(config_entry, coordinator, alarm_device)
+    assert factory.unique_id(q.INPUTS, 3) == "test_entry_id_econnect_metronet_10_3"
+    assert factory.unique_id("connection_status") == "test_entry_id_econnect_metronet_connection_status"
+
+
+def test_entity_factory_force_update(hass, config_entry, coordinator, alarm_device):
+    # Ensure experimental settings are read once and shared by all entities
+    hass.data[DOMAIN] = {"experimental": {"force_update": True}}
+    factory = EntityFactory(config_entry, coordinator, alarm_device)
+    hass.data[DOMAIN] = {}
+    # Test
+    entities = factory.create(InputBinarySensor, alarm_device.inputs, q.INPUTS)
+    assert all(entity._attr_force_update is True for entity in entities)
+
+
+def test_entity_factory_create(config_entry, coordinator, alarm_device):
+    # Ensure entities created in bulk get the same IDs of `generate_entity_id()`
+    factory = EntityFactory(config_entry, coordinator, alarm_device)
+    # Test
+    entities = factory.create(InputBinarySensor, alarm_device.inputs, q.INPUTS)
+    assert len(entities) == len(list(alarm_device.inputs))
+    for entity, (input_id, name) in zip(entities, alarm_device.inputs):
+        assert entity.entity_id == generate_entity_id(config_entry, name)
+        assert entity.unique_id == f"test_entry_id_econnect_metronet_10_{input_id}"
+        assert entity.name == name
+        assert entity._input_id == input_id
+
+
+def test_entity_factory_create_by_name(config_entry, coordinator, alarm_device):
+    # Ensure items without a category get a unique ID made by their name
+    factory = EntityFactory(config_entry, coordinator, alarm_device)
+    # Test
+    [entity] = factory.create(InputBinarySensor, [(1, "window")])
+    assert entity.unique_id == "test_entry_id_econnect_metronet_window"
+    assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_window"
+
+
+def test_shared_connections(hass):
+    # Ensure clients of different panels share the connection pool, but not the session
+    first = ElmoClient("https://example.com", "domain_1")
+    second = ElmoClient("https://example.com", "domain_2")
+    # Test
+    assert shared_connections(hass, first) is first
+    shared_connections(hass, second)
+    adapter = hass.data[DOMAIN]["http_adapter"]
+    assert first._session.get_adapter("https://example.com/api/login") is adapter
+    assert second._session.get_adapter("https://example.com/api/login") is adapter
+    assert first._session is not second._session
+    assert first._session.cookies is not second._session.cookies
@@ -0,0 +1,106 @@
+import logging
+
+import pytest
+from requests.exceptions import HTTPError
+
+from custom_components.econnect_metronet.log import ResponseText, ThrottledLogger
+
+
+class Clock:
+    """Manual clock used to control the throttling interval."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def log():
+    return ThrottledLogger(logging.getLogger("econnect_test"), interval=60, clock=Clock())
+
+
+def _messages(caplog):
+    return [record.getMessage() for record in caplog.records]
+
+
+def test_lazy_formatting(log, caplog, mocker):
+    # Ensure arguments are not formatted when the level is filtered out
+    caplog.set_level(logging.INFO)
+    arg = mocker.MagicMock()
+    # Test
+    log.debug("Device | Debug %s", arg)
+    assert arg.__str__.call_count == 0
+    assert _messages(caplog) == []
+
+
+def test_error_throttled(log, caplog):
+    # Ensure the same template is logged once within the interval, with different arguments
+    log.error("Device | Error: %s", "first")
+    log.error("Device | Error: %s", "second")
+    log.error("Device | Other error")
+    # Test
+    assert _messages(caplog) == ["Device | Error: first", "Device | Other error"]
+
+
+def test_error_reports_suppressed(log, caplog):
+    # Ensure the first record after the interval reports how many messages were suppressed
+    for _ in range(3):
+        log.error("Device | Error: %s", "body")
+    log._clock.now = 61
+    # Test
+    log.error("Device | Error: %s", "body")
+    assert _messages(caplog) == ["Device | Error: body", "Device | Error: body (suppressed 2 similar messages)"]
+
+
+def test_warning_throttled(log, caplog):
+    # Ensure warnings are throttled with their level
+    log.warning("Device | Warning")
+    log.warning("Device | Warning")
+    # Test
+    assert [record.levelname for record in caplog.records] == ["WARNING"]
+
+
+def test_debug_not_throttled(log, caplog):
+    # Ensure debug messages are never suppressed
+    caplog.set_level(logging.DEBUG)
+    log.debug("Device | Debug %s", 1)
+    log.debug("Device | Debug %s", 2)
+    # Test
+    assert _messages(caplog) == ["Device | Debug 1", "Device | Debug 2"]
+
+
+def test_flush(log, caplog):
+    # Ensure flush reports suppressed messages with the last arguments, and keeps the throttling
+    log.error("Device | Error: %s", "first")
+    log.error("Device | Error: %s", "second")
+    log.error("Device | Error: %s", "third")
+    # Test
+    log.flush()
+    log.flush()
+    log.error("Device | Error: %s", "fourth")
+    assert _messages(caplog) == [
+        "Device | Error: first",
+        "Suppressed 2 similar messages, last one: Device | Error: third",
+    ]
+
+
+def test_response_text_lazy(log, caplog, mocker):
+    # Ensure the response body is read only when the record is emitted, not when it's suppressed
+    response = mocker.Mock()
+    text = mocker.PropertyMock(return_value="Service Unavailable")
+    type(response).text = text
+    err = HTTPError(response=response)
+    # Test
+    log.error("Device | Error: %s", ResponseText(err))
+    reads = text.call_count
+    log.error("Device | Error: %s", ResponseText(err))
+    assert reads > 0
+    assert text.call_count == reads
+    assert _messages(caplog) == ["Device | Error: Service Unavailable"]
+
+
+def test_response_text_without_response():
+    # Ensure errors without a response are rendered with their message
+    assert str(ResponseText(HTTPError("Connection aborted"))) == "Connection aborted"
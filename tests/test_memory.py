@@ -0,0 +1,194 @@
+import gc
+import tracemalloc
+
+import pytest
+from elmo import query as q
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.devices import AlarmDevice
+from custom_components.econnect_metronet.helpers import (
+    flow_device_key,
+    flow_devices,
+    sector_index,
+)
+
+# Panel sizes (total number of sectors, inputs and outputs) used to measure the memory footprint
+PANEL_SIZES = (64, 512, 4096)
+# Upper bound of memory allocated for each item, including the inventory and its entities (states and registry)
+BYTES_PER_ITEM_BUDGET = 16 * 1024
+# Update cycles used to detect leaks, and the memory growth allowed once the panel is warmed up
+UPDATE_CYCLES = 2000
+LEAK_BUDGET = 64 * 1024
+
+
+class SyntheticConnection:
+    """Connection that returns a synthetic panel, with new objects at each query like `ElmoClient`.
+
+    At each full update cycle one input and one output change their status, so that updates
+    produce transitions. Alerts and panel details are copied from the mocked `ElmoClient`.
+    """
+
+    def __init__(self, client, size):
+        client._session_id = "test_token"
+        self._alerts = client.query(q.ALERTS)
+        self._panel = client.query(q.PANEL)
+        self.sectors = max(size // 8, 1)
+        self.outputs = max(size // 8, 1)
+        self.inputs = size - self.sectors - self.outputs
+        self.cycle = 0
+
+    def _status(self, item_id):
+        """Return True only for the item that changes in the current cycle."""
+        return item_id == self.cycle % 32
+
+    def auth(self, username, password):
+        return "test_token"
+
+    def query(self, query):
+        if query == q.SECTORS:
+            self.cycle += 1
+            items = {
+                i: {"element": i + 1, "id": i + 1, "index": i, "name": f"S{i + 1}", "status": False, "activable": True}
+                for i in range(self.sectors)
+            }
+            return {"last_id": self.cycle + 1, "sectors": items}
+        if query == q.INPUTS:
+            items = {
+                i: {"element": i + 1, "id": i + 1, "index": i, "name": f"Input {i + 1}", "status": self._status(i)}
+                for i in range(self.inputs)
+            }
+            return {"last_id": self.cycle + 1, "inputs": items}
+        if query == q.OUTPUTS:
+            items = {
+                i: {
+                    "element": i + 1,
+                    "id": i + 1,
+                    "index": i,
+                    "name": f"Output {i + 1}",
+                    "status": self._status(i),
+                    "control_denied_to_users": False,
+                    "do_not_require_authentication": True,
+                }
+                for i in range(self.outputs)
+            }
+            return {"last_id": self.cycle + 1, "outputs": items}
+        if query == q.ALERTS:
+            return {**self._alerts, "last_id": self.cycle + 1}
+        return self._panel
+
+
+async def _setup_entry(hass, config_entry, device):
+    """Set up the config entry with all platforms, so that entities are added to Home Assistant.
+
+    The connected device is handed over like after a config flow, so that no request is sent
+    during the setup. Returns the coordinator of the entry.
+    """
+    flow_devices(hass)[flow_device_key(config_entry.data)] = device
+    config_entry.mock_state(hass, ConfigEntryState.NOT_LOADED)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    return hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+
+async def _unload_entry(hass, config_entry):
+    """Unload the config entry, removing its entities from Home Assistant."""
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+
+def _entities(hass, config_entry):
+    """Return the entities of the config entry registered in Home Assistant."""
+    return er.async_entries_for_config_entry(er.async_get(hass), config_entry.entry_id)
+
+
+@pytest.mark.parametrize("size", PANEL_SIZES)
+@pytest.mark.asyncio
+async def test_memory_per_item(hass, config_entry, client, size):
+    # Ensure the inventory and the full entity set stay within the memory budget for each item
+    connection = SyntheticConnection(client, size)
+    device = AlarmDevice(connection)
+    # Set up the entry with a smaller panel in advance, so that loading modules and registries is not measured
+    warm_up = AlarmDevice(SyntheticConnection(client, 8))
+    warm_up.connect("test_user", "test_password")
+    warm_up.update()
+    await _setup_entry(hass, config_entry, warm_up)
+    await _unload_entry(hass, config_entry)
+    registry = er.async_get(hass)
+    for entity in _entities(hass, config_entry):
+        registry.async_remove(entity.entity_id)
+        hass.states.async_remove(entity.entity_id)
+    # Test
+    tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        device.connect("test_user", "test_password")
+        device.update()
+        await _setup_entry(hass, config_entry, device)
+        gc.collect()
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert len(_entities(hass, config_entry)) >= size
+    assert allocated / size < BYTES_PER_ITEM_BUDGET
+
+
+@pytest.mark.asyncio
+async def test_memory_update_cycles(hass, config_entry, client, mocker):
+    # Ensure update cycles don't grow the memory once the panel is warmed up (e.g. full history)
+    connection = SyntheticConnection(client, 64)
+    device = AlarmDevice(connection)
+    device.connect("test_user", "test_password")
+    device.update()
+    coordinator = await _setup_entry(hass, config_entry, device)
+    sectors, listeners = len(device._sectors), len(coordinator._listeners)
+    # Run the executor jobs inline, to measure only the integration allocations
+    mocker.patch.object(hass, "async_add_executor_job", new=_run_inline)
+    # Test
+    tracemalloc.start()
+    try:
+        # Warm up until bounded buffers (e.g. the transitions history) are full
+        for _ in range(UPDATE_CYCLES):
+            await coordinator._async_update_device()
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(UPDATE_CYCLES):
+            await coordinator._async_update_device()
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert growth < LEAK_BUDGET
+    assert len(device._inventory[q.INPUTS]) == connection.inputs
+    assert len(device._sectors) == sectors
+    assert len(coordinator._listeners) == listeners > 0
+    # Entities are removed from the coordinator when the entry is unloaded
+    await _unload_entry(hass, config_entry)
+    assert len(coordinator._listeners) == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_entities_rebuilt(hass, config_entry, client):
+    # Ensure reloading the entry doesn't grow sector registries and listeners
+    connection = SyntheticConnection(client, 512)
+    device = AlarmDevice(connection)
+    device.connect("test_user", "test_password")
+    device.update()
+    coordinator = await _setup_entry(hass, config_entry, device)
+    sectors, index, listeners = len(device._sectors), len(sector_index(hass)), len(coordinator._listeners)
+    # Test
+    for _ in range(20):
+        await _unload_entry(hass, config_entry)
+        assert len(coordinator._listeners) == 0
+        assert len(sector_index(hass)) == 0
+        coordinator = await _setup_entry(hass, config_entry, device)
+    assert len(device._sectors) == sectors == connection.sectors
+    assert len(sector_index(hass)) == index
+    assert len(coordinator._listeners) == listeners
+
+
+async def _run_inline(func, *args):
+    """Replace `hass.async_add_executor_job` to run jobs in the event loop, without recording calls."""
+    return func(*args)
@@ -0,0 +1,111 @@
+from elmo import query as q
+
+from custom_components.econnect_metronet.devices import AlarmDevice
+from custom_components.econnect_metronet.metrics import (
+    Histogram,
+    Metrics,
+    collect,
+    render,
+)
+
+
+def test_histogram_observe():
+    # Ensure values are stored in the right bucket
+    histogram = Histogram([1, 5, 10])
+    histogram.observe(0.5)
+    histogram.observe(5)
+    histogram.observe(7)
+    histogram.observe(42)
+    # Test
+    assert histogram.counts == [1, 1, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 54.5
+
+
+def test_histogram_as_dict():
+    # Ensure buckets are exported with cumulative counts
+    histogram = Histogram([10, 1, 5])
+    histogram.observe(0.5)
+    histogram.observe(7)
+    # Test
+    assert histogram.as_dict() == {
+        "buckets": {"1": 1, "5": 1, "10": 2, "+Inf": 2},
+        "count": 2,
+        "sum": 7.5,
+    }
+
+
+def test_metrics_inc():
+    # Ensure counters are incremented for each set of labels
+    metrics = Metrics()
+    metrics.inc("test_total")
+    metrics.inc("test_total", (("outcome", "success"),))
+    metrics.inc("test_total", (("outcome", "success"),), 2)
+    # Test
+    assert metrics.counter("test_total") == 1
+    assert metrics.counter("test_total", (("outcome", "success"),)) == 3
+    assert metrics.counter("test_total", (("outcome", "error"),)) == 0
+
+
+def test_metrics_observe():
+    # Ensure histograms are created with the given buckets at their first sample
+    metrics = Metrics()
+    metrics.observe("test_seconds", 0.3, (("query", "sectors"),), buckets=(1, 5))
+    metrics.observe("test_seconds", 3, (("query", "sectors"),), buckets=(1, 5))
+    # Test
+    histogram = metrics.histograms[("test_seconds", (("query", "sectors"),))]
+    assert histogram.as_dict() == {"buckets": {"1": 1, "5": 2, "+Inf": 2}, "count": 2, "sum": 3.3}
+
+
+def test_collect(alarm_device):
+    # Ensure samples include counters, histograms and gauges computed from the device state
+    alarm_device.metrics.inc("econnect_metronet_poll_cycles_total", value=4)
+    alarm_device.metrics.inc("econnect_metronet_poll_changes_total")
+    # Test
+    samples = {(name, labels): value for name, labels, value in collect("entry", alarm_device)}
+    entry = (("entry_id", "entry"),)
+    assert samples[("econnect_metronet_poll_cycles_total", entry)] == 4
+    assert samples[("econnect_metronet_poll_has_changes_ratio", entry)] == 0.25
+    assert samples[("econnect_metronet_inventory_items", entry + (("category", "inputs"),))] == len(
+        alarm_device._inventory[q.INPUTS]
+    )
+    assert samples[("econnect_metronet_command_latency_seconds_count", entry)] == 0
+    assert samples[("econnect_metronet_query_duration_seconds_count", entry + (("query", "sectors"),))] == 1
+
+
+def test_collect_without_polls(client):
+    # Ensure the has_changes ratio is 0 before the first poll
+    device = AlarmDevice(client)
+    # Test
+    samples = {(name, labels): value for name, labels, value in collect("entry", device)}
+    assert samples[("econnect_metronet_poll_has_changes_ratio", (("entry_id", "entry"),))] == 0
+    assert samples[("econnect_metronet_inventory_items", (("entry_id", "entry"), ("category", "sectors")))] == 0
+
+
+def test_render(alarm_device):
+    # Ensure metrics are rendered in the Prometheus text format, with a single header for each family
+    alarm_device.metrics.inc("econnect_metronet_commands_total", (("command", "arm"), ("outcome", "success")))
+    # Test
+    text = render({"entry_1": alarm_device, "entry_2": alarm_device})
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert lines.count("# TYPE econnect_metronet_commands_total counter") == 1
+    assert lines.count("# TYPE econnect_metronet_query_duration_seconds histogram") == 1
+    assert lines.count("# TYPE econnect_metronet_inventory_items gauge") == 1
+    assert 'econnect_metronet_commands_total{entry_id="entry_1",command="arm",outcome="success"} 1' in lines
+    assert 'econnect_metronet_commands_total{entry_id="entry_2",command="arm",outcome="success"} 1' in lines
+    assert 'econnect_metronet_query_duration_seconds_bucket{entry_id="entry_1",query="sectors",le="+Inf"} 1' in lines
+    assert 'econnect_metronet_command_latency_seconds_bucket{entry_id="entry_1",le="+Inf"} 0' in lines
+
+
+def test_render_escapes_labels(client):
+    # Ensure label values are escaped
+    device = AlarmDevice(client)
+    # Test
+    text = render({'entry"\\\n': device})
+    assert 'entry_id="entry\\"\\\\\\n"' in text
+
+
+def test_render_empty():
+    # Ensure no metrics are rendered without config entries
+    assert render({}) == "\n"
@@ -1,8 +1,17 @@
+from datetime import timedelta
+
 import pytest
+from elmo import query as q
+from homeassistant.components.alarm_control_panel import AlarmControlPanelState
 from homeassistant.data_entry_flow import InvalidData
 from homeassistant.helpers.config_validation import multi_select as select
 
-from custom_components.econnect_metronet.const import DOMAIN, KEY_DEVICE
+from custom_components.econnect_metronet import options_update_listener
+from custom_components.econnect_metronet.const import (
+    DOMAIN,
+    KEY_COORDINATOR,
+    KEY_DEVICE,
+)
 
 
 class TestOptionsFlow:
@@ -30,6 +39,12 @@ class TestOptionsFlow:
             "areas_arm_night",
             "areas_arm_vacation",
             "scan_interval",
+            "refresh_outputs",
+            "refresh_panel",
+            "input_settle_time",
+            "input_min_on",
+            "input_min_off",
+            "stale_state_ttl",
         ]
         assert isinstance(form["data_schema"].schema["areas_arm_away"], select)
         assert isinstance(form["data_schema"].schema["areas_arm_home"], select)
@@ -74,6 +89,17 @@ class TestOptionsFlow:
             await hass.async_block_till_done()
         assert excinfo.value.schema_errors["areas_arm_home"] == "Not a list"
 
+    async def test_form_submit_refresh_panel_on_change(self, hass, config_entry):
+        # Ensure the panel can't be refreshed only on change, as the long-polling doesn't report it
+        form = await hass.config_entries.options.async_init(
+            config_entry.entry_id, context={"show_advanced_options": False}
+        )
+        # Test
+        with pytest.raises(InvalidData) as excinfo:
+            await hass.config_entries.options.async_configure(form["flow_id"], user_input={"refresh_panel": 0})
+            await hass.async_block_till_done()
+        assert "refresh_panel" in excinfo.value.schema_errors
+
     async def test_form_submit_invalid_input(self, hass, config_entry):
         # Ensure it fails if a user submits an option not in the allowed list
         form = await hass.config_entries.options.async_init(
@@ -171,3 +197,62 @@ class TestOptionsFlow:
             "areas_arm_night": [(1, "S1 Living Room")],
             "areas_arm_vacation": [(1, "S1 Living Room"), (2, "S2 Bedroom")],
         }
+
+
+class TestOptionsUpdateListener:
+    @pytest.fixture(autouse=True)
+    def setup(self, hass, config_entry, alarm_device, coordinator, mocker):
+        config_entry.add_to_hass(hass)
+        hass.data[DOMAIN][config_entry.entry_id] = {
+            KEY_DEVICE: alarm_device,
+            KEY_COORDINATOR: coordinator,
+        }
+        self.reload = mocker.patch.object(hass.config_entries, "async_reload")
+
+    async def test_apply_arm_profiles(self, hass, config_entry, alarm_device):
+        # Ensure arm profiles are applied in place and the alarm state is computed again
+        hass.config_entries.async_update_entry(config_entry, options={"areas_arm_home": [1, 2]})
+        # Test
+        await options_update_listener(hass, config_entry)
+        assert alarm_device._sectors_home == [1, 2]
+        assert alarm_device.state == AlarmControlPanelState.ARMED_HOME
+        assert self.reload.call_count == 0
+
+    async def test_apply_scan_interval(self, hass, config_entry, coordinator):
+        # Ensure the coordinator interval is changed in place
+        hass.config_entries.async_update_entry(config_entry, options={"scan_interval": 60})
+        # Test
+        await options_update_listener(hass, config_entry)
+        assert coordinator.update_interval == timedelta(seconds=60)
+        assert self.reload.call_count == 0
+
+    async def test_apply_refresh_policies(self, hass, config_entry, alarm_device):
+        # Ensure refresh policies are changed in place
+        hass.config_entries.async_update_entry(config_entry, options={"refresh_outputs": 3})
+        # Test
+        await options_update_listener(hass, config_entry)
+        assert alarm_device._refresh_policies[q.OUTPUTS] == 3
+        assert self.reload.call_count == 0
+
+    async def test_apply_input_filter(self, hass, config_entry, alarm_device):
+        # Ensure the input debounce is changed in place
+        hass.config_entries.async_update_entry(config_entry, options={"input_settle_time": 1.5})
+        # Test
+        await options_update_listener(hass, config_entry)
+        assert alarm_device._debouncer.settle == 1.5
+        assert self.reload.call_count == 0
+
+    async def test_apply_stale_ttl(self, hass, config_entry, alarm_device):
+        # Ensure the stale-state TTL is changed in place
+        hass.config_entries.async_update_entry(config_entry, options={"stale_state_ttl": 600})
+        # Test
+        await options_update_listener(hass, config_entry)
+        assert alarm_device._stale_ttl == 600
+        assert self.reload.call_count == 0
+
+    async def test_managed_sectors_reload(self, hass, config_entry):
+        # Ensure a change of managed sectors reloads the integration, as the entity set changes
+        hass.config_entries.async_update_entry(config_entry, options={"managed_sectors": [1]})
+        # Test
+        await options_update_listener(hass, config_entry)
+        self.reload.assert_called_once_with(config_entry.entry_id)
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from elmo import query as q
+
+from custom_components.econnect_metronet.devices import AlarmDevice
+
+from .fixtures.panels import SyntheticPanel
+
+
+def test_panel_size_and_ratios():
+    # Ensure items are generated with the requested size and distributions
+    panel = SyntheticPanel(sectors=8, inputs=1000, outputs=10, in_use={"inputs": 0.5}, active={"inputs": 0.2})
+    # Test
+    inputs = json.loads(panel.inputs())
+    assert len(json.loads(panel.areas())) == 8
+    assert len(inputs) == 1000
+    assert len(json.loads(panel.outputs())) == 10
+    assert 400 < sum(item["InUse"] for item in inputs) < 600
+    assert 100 < sum(item["Alarm"] for item in inputs) < 300
+    assert all(item["InUse"] for item in json.loads(panel.areas()))
+    assert not any(item["Active"] for item in json.loads(panel.areas()))
+
+
+def test_panel_seeded():
+    # Ensure the same seed produces the same panel and the same change stream
+    first = SyntheticPanel(inputs=100, in_use=0.5, seed=7)
+    second = SyntheticPanel(inputs=100, in_use=0.5, seed=7)
+    # Test
+    assert first.inputs() == second.inputs()
+    assert [next(first.changes) for _ in range(20)] == [next(second.changes) for _ in range(20)]
+
+
+def test_panel_changes_move_last_ids():
+    # Ensure a change moves the last ID of its category and is reported by the long-polling
+    panel = SyntheticPanel()
+    ids = panel.last_ids()
+    poll_ids = {"Areas": ids[q.SECTORS], "Inputs": ids[q.INPUTS], "Outputs": ids[q.OUTPUTS], "StatusAdv": 1}
+    assert json.loads(panel.updates(poll_ids))["HasChanges"] is False
+    # Test
+    panel.apply(("inputs", 3, True))
+    updates = json.loads(panel.updates(poll_ids))
+    assert updates["Inputs"] is True
+    assert updates["Areas"] is False
+    assert updates["HasChanges"] is True
+    assert panel.last_ids()[q.INPUTS] > ids[q.INPUTS]
+
+
+def test_panel_strings():
+    # Ensure every item has a description with the class of its category
+    panel = SyntheticPanel(sectors=2, inputs=3, outputs=1)
+    # Test
+    strings = json.loads(panel.strings())
+    assert [(item["Class"], item["Description"]) for item in strings] == [
+        (q.SECTORS, "Sector 1"),
+        (q.SECTORS, "Sector 2"),
+        (q.INPUTS, "Input 1"),
+        (q.INPUTS, "Input 2"),
+        (q.INPUTS, "Input 3"),
+        (q.OUTPUTS, "Output 1"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "synthetic_panel", [{"sectors": 64, "inputs": 1024, "outputs": 256, "in_use": 0.9, "seed": 1}], indirect=True
+)
+def test_synthetic_client_device_update(synthetic_client, synthetic_panel):
+    # Ensure the payloads are parsed by `ElmoClient` and the device follows the change stream
+    device = AlarmDevice(synthetic_client)
+    device.connect("username", "password")
+    device.update()
+    in_use = {category: [item for item in items if item["InUse"]] for category, items in synthetic_panel.items.items()}
+    assert len(device._inventory[q.SECTORS]) == len(in_use["sectors"])
+    assert len(device._inventory[q.INPUTS]) == len(in_use["inputs"])
+    assert len(device._inventory[q.OUTPUTS]) == len(in_use["outputs"])
+    # Test
+    for _ in range(50):
+        synthetic_panel.apply(next(synthetic_panel.changes))
+    assert device.has_updates()["has_changes"] is True
+    device.update()
+    for query, category in ((q.SECTORS, "sectors"), (q.INPUTS, "inputs")):
+        for item in in_use[category]:
+            assert device.get_status(query, item["Index"]) == item["Status"]
+        assert device._last_ids[query] == synthetic_panel.last_ids()[query]
+    assert device.has_updates()["has_changes"] is False
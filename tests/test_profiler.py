@@ -0,0 +1,143 @@
+import cProfile
+import pstats
+import threading
+
+import pytest
+from elmo import query as q
+
+from custom_components.econnect_metronet.profiler import CycleProfiler
+
+
+def _work(n):
+    return sum(range(n))
+
+
+def test_profiler_runcall():
+    # Ensure calls are profiled and their result is returned
+    profiler = CycleProfiler(1)
+    # Test
+    assert profiler.runcall(_work, 10) == 45
+    assert profiler.runcall(_work, 5) == 10
+    assert profiler.calls == 2
+    assert profiler.skipped == 0
+
+
+def test_profiler_runcall_exception():
+    # Ensure exceptions are raised to the caller, and the call is still profiled
+    profiler = CycleProfiler(1)
+
+    def fail():
+        raise ValueError("test")
+
+    # Test
+    with pytest.raises(ValueError):
+        profiler.runcall(fail)
+    assert profiler.calls == 1
+    assert profiler.runcall(_work, 3) == 3
+
+
+def test_profiler_runcall_nested():
+    # Ensure nested calls are profiled once, within the outer call
+    profiler = CycleProfiler(1)
+    # Test
+    assert profiler.runcall(profiler.runcall, _work, 4) == 6
+    assert profiler.calls == 1
+    assert profiler.skipped == 0
+
+
+def test_profiler_runcall_concurrent():
+    # Ensure calls started while another call is profiled run without the profiler
+    profiler = CycleProfiler(1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=profiler.runcall, args=(blocking,))
+    thread.start()
+    started.wait(5)
+    # Test
+    try:
+        assert profiler.runcall(_work, 4) == 6
+    finally:
+        release.set()
+        thread.join()
+    assert profiler.calls == 1
+    assert profiler.skipped == 1
+
+
+def test_profiler_runcall_other_profiler_active():
+    # Ensure calls are not profiled when another profiling tool is active
+    profiler = CycleProfiler(1)
+    other = cProfile.Profile()
+    other.enable()
+    # Test
+    try:
+        assert profiler.runcall(_work, 4) == 6
+    finally:
+        other.disable()
+    assert profiler.calls == 0
+    assert profiler.skipped == 1
+
+
+@pytest.mark.asyncio
+async def test_profiler_cycle_done():
+    # Ensure the session is done once all cycles are completed
+    profiler = CycleProfiler(2)
+    # Test
+    profiler.cycle_done()
+    assert not profiler.done.is_set()
+    profiler.cycle_done()
+    assert profiler.done.is_set()
+    assert profiler.completed == 2
+
+
+def test_profiler_write(tmp_path):
+    # Ensure statistics are written to the file and the top functions are summarized
+    profiler = CycleProfiler(1)
+    profiler.runcall(_work, 1000)
+    profiler.cycle_done()
+    path = str(tmp_path / "profile.pstats")
+    # Test
+    summary = profiler.write(path, 2)
+    assert summary["path"] == path
+    assert summary["cycles"] == 1
+    assert summary["calls"] == 1
+    assert summary["skipped"] == 0
+    assert len(summary["top"]) == 2
+    assert summary["top"][0]["cumulative_time"] >= summary["top"][1]["cumulative_time"]
+    assert any("_work" in entry["function"] for entry in summary["top"])
+    assert set(summary["top"][0]) == {"function", "calls", "total_time", "cumulative_time"}
+    stats = pstats.Stats(path)
+    assert any(function == "_work" for _, _, function in stats.stats)
+
+
+def test_profiler_write_without_calls(tmp_path):
+    # Ensure no file is written when nothing has been profiled
+    profiler = CycleProfiler(1)
+    path = tmp_path / "profile.pstats"
+    # Test
+    summary = profiler.write(str(path), 10)
+    assert summary["path"] is None
+    assert summary["top"] == []
+    assert not path.exists()
+
+
+def test_device_profiled_methods(alarm_device):
+    # Ensure device calls run through the active profiler
+    profiler = CycleProfiler(1)
+    alarm_device.profiler = profiler
+    # Test
+    alarm_device.update()
+    alarm_device.refresh(q.SECTORS)
+    assert profiler.calls == 2
+
+
+def test_device_without_profiler(alarm_device, mocker):
+    # Ensure device calls run as usual when no profiling session is running
+    runcall = mocker.patch.object(CycleProfiler, "runcall")
+    # Test
+    alarm_device.update()
+    assert alarm_device.profiler is None
+    assert runcall.call_count == 0
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from custom_components.econnect_metronet.helpers import poll_scheduler
+from custom_components.econnect_metronet.scheduler import PollScheduler
+
+
+class TestPollScheduler:
+    def test_register_slots(self):
+        # Ensure each entry gets the lowest free slot
+        scheduler = PollScheduler(stagger=2)
+        # Test
+        assert scheduler.register("entry_1") == 0
+        assert scheduler.register("entry_2") == 1
+        assert scheduler.register("entry_1") == 0
+        assert scheduler.offset("entry_2") == 2
+
+    def test_unregister_reuses_slot(self):
+        # Ensure released slots are assigned to new entries
+        scheduler = PollScheduler()
+        scheduler.register("entry_1")
+        scheduler.register("entry_2")
+        scheduler.register("entry_3")
+        # Test
+        scheduler.unregister("entry_2")
+        assert scheduler.register("entry_4") == 1
+        assert scheduler.register("entry_5") == 3
+
+    def test_offset_unknown_entry(self):
+        # Ensure entries without a slot are not delayed
+        scheduler = PollScheduler()
+        assert scheduler.offset("unknown") == 0
+
+    @pytest.mark.asyncio
+    async def test_full_update_cap(self):
+        # Ensure no more than `max_concurrent` full updates run at the same time
+        scheduler = PollScheduler(max_concurrent=2)
+        running = []
+        peak = []
+
+        async def update(entry_id):
+            async with scheduler.full_update(entry_id):
+                running.append(entry_id)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.remove(entry_id)
+
+        # Test
+        await asyncio.gather(*[update(f"entry_{i}") for i in range(5)])
+        assert max(peak) == 2
+        assert len(peak) == 5
+
+    @pytest.mark.asyncio
+    async def test_slots_report(self):
+        # Ensure the report includes running and waiting updates for each entry
+        scheduler = PollScheduler(max_concurrent=1, stagger=1)
+        scheduler.register("entry_1")
+        scheduler.register("entry_2")
+        release = asyncio.Event()
+
+        async def update(entry_id):
+            async with scheduler.full_update(entry_id):
+                await release.wait()
+
+        tasks = [asyncio.create_task(update("entry_1")), asyncio.create_task(update("entry_2"))]
+        await asyncio.sleep(0)
+        # Test
+        assert scheduler.slots() == {
+            "entry_1": {"slot": 0, "offset": 0, "running": True, "waiting": 0},
+            "entry_2": {"slot": 1, "offset": 1, "running": False, "waiting": 1},
+        }
+        assert scheduler.slots("entry_2")["waiting"] == 1
+        assert scheduler.slots("unknown") == {}
+        release.set()
+        await asyncio.gather(*tasks)
+        assert scheduler.slots("entry_2") == {"slot": 1, "offset": 1, "running": False, "waiting": 0}
+
+
+def test_poll_scheduler_shared(hass):
+    # Ensure the same scheduler is shared by all entries
+    assert poll_scheduler(hass) is poll_scheduler(hass)
+
+
+@pytest.mark.asyncio
+async def test_coordinator_first_refresh_staggered(hass, mocker, coordinator, config_entry):
+    # Ensure the first refresh waits for the entry slot
+    scheduler = poll_scheduler(hass)
+    scheduler.register("another_entry")
+    scheduler.register(config_entry.entry_id)
+    scheduler.stagger = 0
+    offset = mocker.spy(scheduler, "offset")
+    coordinator.data = None
+    # Test
+    await coordinator.async_config_entry_first_refresh()
+    offset.assert_called_once_with(config_entry.entry_id)
+    assert offset.spy_return == 0
+
+
+@pytest.mark.asyncio
+async def test_coordinator_full_update_scheduled(hass, mocker, coordinator, config_entry):
+    # Ensure full updates go through the shared scheduler
+    mocker.patch.object(coordinator._device, "has_updates", return_value={"has_changes": True})
+    full_update = mocker.spy(poll_scheduler(hass), "full_update")
+    # Test
+    await coordinator._async_update_data()
+    full_update.assert_called_once_with(config_entry.entry_id)
@@ -1,15 +1,24 @@
 import logging
 
 import pytest
+from elmo import query as q
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from custom_components.econnect_metronet.const import DOMAIN
-from custom_components.econnect_metronet.sensor import AlertSensor, async_setup_entry
+from custom_components.econnect_metronet.devices import AlarmDevice
+from custom_components.econnect_metronet.helpers import EntityFactory
+from custom_components.econnect_metronet.sensor import (
+    AlertSensor,
+    CommandLatencySensor,
+    DataAgeSensor,
+    SuppressedTransitionsSensor,
+    async_setup_entry,
+)
 
 
 @pytest.mark.asyncio
 async def test_async_setup_entry_only_sensors(hass, config_entry, alarm_device, coordinator):
-    # Ensure the async setup loads only alert sensors
+    # Ensure the async setup loads only alert sensors and diagnostic sensors
     hass.data[DOMAIN][config_entry.entry_id] = {
         "device": alarm_device,
         "coordinator": coordinator,
@@ -17,7 +26,10 @@ async def test_async_setup_entry_only_sensors(hass, config_entry, alarm_device,
 
     # Test
     def ensure_only_sensors(sensors):
-        assert len(sensors) == 3
+        assert len(sensors) == 6
+        assert isinstance(sensors[3], CommandLatencySensor)
+        assert isinstance(sensors[4], SuppressedTransitionsSensor)
+        assert isinstance(sensors[5], DataAgeSensor)
 
     await async_setup_entry(hass, config_entry, ensure_only_sensors)
 
@@ -43,7 +55,15 @@ class TestAlertSensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertSensor("test_id", 16, config_entry, "input_led", coordinator, alarm_device)
+        entity = AlertSensor(
+            "test_id",
+            16,
+            config_entry,
+            "input_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.native_value == 2
 
     def test_sensor_missing(self, hass, config_entry, alarm_device):
@@ -51,7 +71,15 @@ class TestAlertSensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertSensor("test_id", 1000, config_entry, "test_id", coordinator, alarm_device)
+        entity = AlertSensor(
+            "test_id",
+            1000,
+            config_entry,
+            "test_id",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         with pytest.raises(KeyError):
             assert entity.native_value == 1
 
@@ -60,7 +88,15 @@ class TestAlertSensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertSensor("test_id", 16, config_entry, "input_led", coordinator, alarm_device)
+        entity = AlertSensor(
+            "test_id",
+            16,
+            config_entry,
+            "input_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.translation_key == "input_led"
 
     def test_binary_sensor_name_with_system_name(self, hass, config_entry, alarm_device):
@@ -69,7 +105,15 @@ class TestAlertSensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertSensor("test_id", 0, config_entry, "input_led", coordinator, alarm_device)
+        entity = AlertSensor(
+            "test_id",
+            0,
+            config_entry,
+            "input_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.translation_key == "input_led"
 
     def test_sensor_entity_id(self, hass, config_entry, alarm_device):
@@ -77,7 +121,15 @@ class TestAlertSensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertSensor("test_id", 0, config_entry, "input_led", coordinator, alarm_device)
+        entity = AlertSensor(
+            "test_id",
+            0,
+            config_entry,
+            "input_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_input_led"
 
     def test_sensor_entity_id_with_system_name(self, hass, config_entry, alarm_device):
@@ -86,7 +138,15 @@ class TestAlertSensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertSensor("test_id", 0, config_entry, "input_led", coordinator, alarm_device)
+        entity = AlertSensor(
+            "test_id",
+            0,
+            config_entry,
+            "input_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_home_input_led"
 
     def test_sensor_unique_id(self, hass, config_entry, alarm_device):
@@ -94,7 +154,15 @@ class TestAlertSensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertSensor("test_id", 0, config_entry, "input_led", coordinator, alarm_device)
+        entity = AlertSensor(
+            "test_id",
+            0,
+            config_entry,
+            "input_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.unique_id == "test_id"
 
     def test_sensor_icon(self, hass, config_entry, alarm_device):
@@ -102,5 +170,136 @@ class TestAlertSensor:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = AlertSensor("test_id", 0, config_entry, "input_led", coordinator, alarm_device)
+        entity = AlertSensor(
+            "test_id",
+            0,
+            config_entry,
+            "input_led",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.icon == "hass:alarm-light"
+
+
+class TestCommandLatencySensor:
+    def test_sensor_native_value_empty(self, coordinator, config_entry, alarm_device):
+        # Ensure the sensor has no value if no commands have been confirmed
+        entity = CommandLatencySensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.native_value is None
+
+    def test_sensor_native_value(self, coordinator, config_entry, alarm_device):
+        # Ensure the sensor reports the latency of the last confirmed command
+        alarm_device.last_command_latency = 4.2
+        entity = CommandLatencySensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.native_value == 4.2
+
+    def test_sensor_attributes(self, coordinator, config_entry, alarm_device):
+        # Ensure the sensor exposes the system and the latency histogram
+        alarm_device.command_latency.observe(4.2)
+        entity = CommandLatencySensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.extra_state_attributes["system"] == "https://example.com"
+        assert entity.extra_state_attributes["histogram"]["count"] == 1
+        assert entity.extra_state_attributes["histogram"]["buckets"]["5"] == 1
+
+    def test_sensor_system_name(self, hass, coordinator, config_entry, alarm_device):
+        # Ensure the system is reported with its human readable name
+        hass.config_entries.async_update_entry(
+            config_entry, data={**config_entry.data, "system_base_url": "https://connect.elmospa.com"}
+        )
+        entity = CommandLatencySensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.extra_state_attributes["system"] == "Elmo e-Connect"
+
+    def test_sensor_entity_id(self, coordinator, config_entry, alarm_device):
+        # Ensure the sensor has a valid Entity ID and translation key
+        entity = CommandLatencySensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_last_command_latency"
+        assert entity.translation_key == "last_command_latency"
+        assert entity.entity_category == "diagnostic"
+
+
+class TestSuppressedTransitionsSensor:
+    def test_sensor_native_value(self, coordinator, config_entry, alarm_device):
+        # Ensure the sensor reports the input changes hidden by the debouncer
+        alarm_device._debouncer.suppressed = {0: 2, 1: 1}
+        entity = SuppressedTransitionsSensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.native_value == 3
+
+    def test_sensor_entity_id(self, coordinator, config_entry, alarm_device):
+        # Ensure the sensor has a valid Entity ID and translation key
+        entity = SuppressedTransitionsSensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_suppressed_transitions"
+        assert entity.translation_key == "suppressed_transitions"
+        assert entity.entity_category == "diagnostic"
+        assert entity.unique_id == "test_id"
+
+
+class TestDataAgeSensor:
+    def test_sensor_native_value_empty(self, coordinator, config_entry, client):
+        # Ensure the sensor has no value before the first update
+        device = AlarmDevice(client)
+        entity = DataAgeSensor(
+            "test_id", config_entry, coordinator, device, EntityFactory(config_entry, coordinator, device)
+        )
+        assert entity.native_value is None
+        assert entity.extra_state_attributes["inputs"] is None
+
+    def test_sensor_native_value(self, coordinator, config_entry, alarm_device, mocker):
+        # Ensure the sensor reports the age of the oldest category, and each category in the attributes
+        alarm_device._confirmed_at = {q.SECTORS: 100, q.INPUTS: 90, q.OUTPUTS: 95, q.ALERTS: 100}
+        mocker.patch("custom_components.econnect_metronet.devices.time.monotonic", return_value=130)
+        entity = DataAgeSensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.native_value == 40
+        assert entity.extra_state_attributes == {"sectors": 30, "inputs": 40, "outputs": 35, "alerts": 30}
+
+    def test_sensor_available_when_stale(self, coordinator, config_entry, alarm_device, mocker):
+        # Ensure the sensor stays available when the data is stale, to report its age
+        alarm_device.set_stale_ttl({"stale_state_ttl": 10})
+        alarm_device._confirmed_at = {query: 0 for query in (q.SECTORS, q.INPUTS, q.OUTPUTS, q.ALERTS)}
+        entity = DataAgeSensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.available is True
+
+    def test_sensor_entity_id(self, coordinator, config_entry, alarm_device):
+        # Ensure the sensor has a valid Entity ID and translation key
+        entity = DataAgeSensor(
+            "test_id", config_entry, coordinator, alarm_device, EntityFactory(config_entry, coordinator, alarm_device)
+        )
+        assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_data_age"
+        assert entity.translation_key == "data_age"
+        assert entity.entity_category == "diagnostic"
+
+
+def test_alert_sensor_unavailable_when_stale(coordinator, config_entry, alarm_device):
+    # Ensure alert sensors are unavailable when alerts data is stale
+    entity = AlertSensor(
+        "test_id",
+        16,
+        config_entry,
+        "input_led",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
+    alarm_device.set_stale_ttl({"stale_state_ttl": 60})
+    assert entity.available is True
+    # Test
+    alarm_device._confirmed_at[q.ALERTS] -= 120
+    assert entity.available is False
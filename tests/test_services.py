@@ -1,15 +1,40 @@
+import asyncio
+
+import pytest
+import voluptuous as vol
+from elmo import query as q
 from homeassistant.core import ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
 
 from custom_components.econnect_metronet import services
 from custom_components.econnect_metronet.binary_sensor import SectorBinarySensor
 from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.helpers import EntityFactory, sector_index
+from custom_components.econnect_metronet.profiler import CycleProfiler
 
 
 async def test_service_arm_sectors(hass, config_entry, alarm_device, coordinator, mocker):
     # Ensure `arm_sectors` activates the correct sectors
     arm = mocker.patch.object(alarm_device, "arm")
-    SectorBinarySensor("test_id", 0, config_entry, "S1 Living Room", coordinator, alarm_device)
-    SectorBinarySensor("test_id", 2, config_entry, "S3 Outdoor", coordinator, alarm_device)
+    SectorBinarySensor(
+        "test_id",
+        0,
+        config_entry,
+        "S1 Living Room",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
+    SectorBinarySensor(
+        "test_id",
+        2,
+        config_entry,
+        "S3 Outdoor",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
     hass.data[DOMAIN][config_entry.entry_id] = {
         "device": alarm_device,
         "coordinator": coordinator,
@@ -26,18 +51,141 @@ async def test_service_arm_sectors(hass, config_entry, alarm_device, coordinator
             "code": "1234",
         },
     )
+    update_listeners = mocker.spy(coordinator, "async_update_listeners")
+    fast_refresh = mocker.patch.object(coordinator, "async_schedule_fast_refresh")
     # Test
-    await services.arm_sectors(hass, config_entry.entry_id, call)
+    await services.arm_sectors(hass, call)
+    assert update_listeners.call_count == 1
+    fast_refresh.assert_called_once_with(q.SECTORS)
     assert arm.call_count == 1
     assert arm.call_args[0][0] == "1234"
     assert arm.call_args[0][1] == [1, 3]
 
 
+async def test_service_arm_sectors_multiple_entries(hass, config_entry, alarm_device, coordinator, mocker):
+    # Ensure targets are grouped by entry and each alarm panel receives only its sectors
+    arm = mocker.patch.object(alarm_device, "arm")
+    other_device = mocker.Mock()
+    SectorBinarySensor(
+        "test_id",
+        0,
+        config_entry,
+        "S1 Living Room",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
+    sector_index(hass)["econnect_metronet_seaside_home_s1_garage"] = ("other_entry_id", 1)
+    sector_index(hass)["econnect_metronet_seaside_home_s2_garden"] = ("other_entry_id", 2)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    hass.data[DOMAIN]["other_entry_id"] = {
+        "device": other_device,
+        "coordinator": mocker.Mock(),
+    }
+    call = ServiceCall(
+        hass=hass,
+        domain=DOMAIN,
+        service="arm_sectors",
+        data={
+            "entity_id": [
+                "binary_sensor.econnect_metronet_test_user_s1_living_room",
+                "binary_sensor.econnect_metronet_seaside_home_s1_garage",
+                "binary_sensor.econnect_metronet_seaside_home_s2_garden",
+            ],
+            "code": "1234",
+        },
+    )
+    mocker.patch.object(coordinator, "async_schedule_fast_refresh")
+    # Test
+    await services.arm_sectors(hass, call)
+    assert arm.call_args[0] == ("1234", [1])
+    assert other_device.arm.call_args[0] == ("1234", [1, 2])
+    assert hass.data[DOMAIN]["other_entry_id"]["coordinator"].async_schedule_fast_refresh.call_count == 1
+
+
+async def test_service_arm_sectors_error_other_entries(hass, config_entry, alarm_device, coordinator, mocker):
+    # Ensure an error on one alarm panel doesn't prevent commands on other panels
+    arm = mocker.patch.object(alarm_device, "arm", side_effect=Exception("Unexpected"))
+    other_device = mocker.Mock()
+    SectorBinarySensor(
+        "test_id",
+        0,
+        config_entry,
+        "S1 Living Room",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
+    sector_index(hass)["econnect_metronet_seaside_home_s1_garage"] = ("other_entry_id", 1)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    hass.data[DOMAIN]["other_entry_id"] = {
+        "device": other_device,
+        "coordinator": mocker.Mock(),
+    }
+    call = ServiceCall(
+        hass=hass,
+        domain=DOMAIN,
+        service="arm_sectors",
+        data={
+            "entity_id": [
+                "binary_sensor.econnect_metronet_test_user_s1_living_room",
+                "binary_sensor.econnect_metronet_seaside_home_s1_garage",
+            ],
+            "code": "1234",
+        },
+    )
+    # Test
+    with pytest.raises(Exception, match="Unexpected"):
+        await services.arm_sectors(hass, call)
+    assert arm.call_count == 1
+    assert other_device.arm.call_count == 1
+
+
+async def test_service_arm_sectors_unknown_entity(hass, config_entry, alarm_device, coordinator, mocker):
+    # Ensure entities that are not sectors of a configured alarm are skipped
+    arm = mocker.patch.object(alarm_device, "arm")
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(
+        hass=hass,
+        domain=DOMAIN,
+        service="arm_sectors",
+        data={"entity_id": ["binary_sensor.kitchen_window"], "code": "1234"},
+    )
+    # Test
+    await services.arm_sectors(hass, call)
+    assert arm.call_count == 0
+
+
 async def test_service_disarm_sectors(hass, config_entry, alarm_device, coordinator, mocker):
     # Ensure `disarm_sectors` activates the correct sectors
     disarm = mocker.patch.object(alarm_device, "disarm")
-    SectorBinarySensor("test_id", 0, config_entry, "S1 Living Room", coordinator, alarm_device)
-    SectorBinarySensor("test_id", 2, config_entry, "S3 Outdoor", coordinator, alarm_device)
+    SectorBinarySensor(
+        "test_id",
+        0,
+        config_entry,
+        "S1 Living Room",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
+    SectorBinarySensor(
+        "test_id",
+        2,
+        config_entry,
+        "S3 Outdoor",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
     hass.data[DOMAIN][config_entry.entry_id] = {
         "device": alarm_device,
         "coordinator": coordinator,
@@ -54,8 +202,12 @@ async def test_service_disarm_sectors(hass, config_entry, alarm_device, coordina
             "code": "1234",
         },
     )
+    update_listeners = mocker.spy(coordinator, "async_update_listeners")
+    fast_refresh = mocker.patch.object(coordinator, "async_schedule_fast_refresh")
     # Test
-    await services.disarm_sectors(hass, config_entry.entry_id, call)
+    await services.disarm_sectors(hass, call)
+    assert update_listeners.call_count == 1
+    fast_refresh.assert_called_once_with(q.SECTORS)
     assert disarm.call_count == 1
     assert disarm.call_args[0][0] == "1234"
     assert disarm.call_args[0][1] == [1, 3]
@@ -75,6 +227,238 @@ async def test_service_update_state(hass, config_entry, alarm_device, coordinato
         data={},
     )
     # Test
-    await services.update_state(hass, config_entry.entry_id, call)
+    await services.update_state(hass, call)
     assert update.call_count == 1
     assert update.call_args == ()
+
+
+async def test_service_update_state_multiple_entries(hass, config_entry, alarm_device, coordinator, mocker):
+    # Ensure `update_state` refreshes the selected alarm panel, or all of them if none is selected
+    other_coordinator = mocker.AsyncMock()
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    hass.data[DOMAIN]["other_entry_id"] = {
+        "device": mocker.Mock(),
+        "coordinator": other_coordinator,
+    }
+    refresh = mocker.patch.object(coordinator, "async_refresh")
+    # Test
+    await services.update_state(
+        hass, ServiceCall(hass=hass, domain=DOMAIN, service="update_state", data={"config_entry_id": "other_entry_id"})
+    )
+    assert refresh.call_count == 0
+    assert other_coordinator.async_refresh.call_count == 1
+    await services.update_state(hass, ServiceCall(hass=hass, domain=DOMAIN, service="update_state", data={}))
+    assert refresh.call_count == 1
+    assert other_coordinator.async_refresh.call_count == 2
+
+
+async def test_services_registered_once(hass, config_entry, alarm_device, coordinator, mocker):
+    # Ensure services are shared by all entries and run on the alarm panel selected in the call
+    other_device = mocker.Mock()
+    other_device.history.return_value = [{"id": 42}]
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    hass.data[DOMAIN]["other_entry_id"] = {
+        "device": other_device,
+        "coordinator": mocker.Mock(),
+    }
+    # Test
+    response = await hass.services.async_call(
+        DOMAIN, "get_history", {"config_entry_id": "other_entry_id"}, blocking=True, return_response=True
+    )
+    assert response == {"transitions": [{"id": 42}]}
+    response = await hass.services.async_call(
+        DOMAIN, "get_history", {"config_entry_id": config_entry.entry_id}, blocking=True, return_response=True
+    )
+    assert response == {"transitions": []}
+
+
+async def test_services_entry_required_with_multiple_entries(hass, config_entry, alarm_device, coordinator, mocker):
+    # Ensure the alarm panel must be selected if more than one is configured
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    hass.data[DOMAIN]["other_entry_id"] = {
+        "device": mocker.Mock(),
+        "coordinator": mocker.Mock(),
+    }
+    # Test
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(DOMAIN, "get_history", {}, blocking=True, return_response=True)
+
+
+async def test_services_entry_not_loaded(hass, config_entry, alarm_device, coordinator):
+    # Ensure a call for an alarm panel that is not loaded is rejected
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    # Test
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, "get_history", {"config_entry_id": "missing_entry_id"}, blocking=True, return_response=True
+        )
+
+
+async def test_service_get_history(hass, config_entry, alarm_device, coordinator):
+    # Ensure `get_history` returns the transitions stored in the device
+    alarm_device.record_transition(q.INPUTS, 0, False, True, 0)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(
+        hass=hass,
+        domain=DOMAIN,
+        service="get_history",
+        data={},
+    )
+    # Test
+    response = await services.get_history(hass, call)
+    assert response == {
+        "transitions": [
+            {
+                "timestamp": "1970-01-01T00:00:00+00:00",
+                "category": "input",
+                "id": 0,
+                "name": "Entryway Sensor",
+                "old_status": False,
+                "new_status": True,
+            }
+        ]
+    }
+
+
+async def test_service_get_history_filters(hass, config_entry, alarm_device, coordinator):
+    # Ensure `get_history` returns only transitions of the last minutes, for the given category
+    now = dt_util.utcnow().timestamp()
+    alarm_device.record_transition(q.INPUTS, 0, False, True, now - 3600)
+    alarm_device.record_transition(q.INPUTS, 1, True, False, now - 60)
+    alarm_device.record_transition(q.SECTORS, 0, True, False, now - 60)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(
+        hass=hass,
+        domain=DOMAIN,
+        service="get_history",
+        data={"category": "input", "minutes": 10},
+    )
+    # Test
+    response = await services.get_history(hass, call)
+    assert len(response["transitions"]) == 1
+    assert response["transitions"][0]["name"] == "Outdoor Sensor 1"
+
+
+async def test_service_run_sequence(hass, config_entry, alarm_device, coordinator, mocker):
+    # Ensure `run_sequence` runs all steps and returns the device result
+    run_sequence = mocker.patch.object(alarm_device, "run_sequence", return_value={"success": True})
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    data = services.RUN_SEQUENCE_SCHEMA(
+        {
+            "code": "1234",
+            "steps": [{"action": "disarm", "sectors": [2]}, {"action": "turn_on", "output": "5"}],
+        }
+    )
+    call = ServiceCall(hass=hass, domain=DOMAIN, service="run_sequence", data=data)
+    fast_refresh = mocker.patch.object(coordinator, "async_schedule_fast_refresh")
+    # Test
+    response = await services.run_sequence(hass, call)
+    assert response == {"success": True}
+    assert sorted(c[0][0] for c in fast_refresh.call_args_list) == [q.SECTORS, q.OUTPUTS]
+    assert run_sequence.call_args[0] == (
+        "1234",
+        [{"action": "disarm", "sectors": [2]}, {"action": "turn_on", "output": 5}],
+        True,
+    )
+
+
+@pytest.mark.parametrize(
+    "steps",
+    [
+        [],
+        [{"action": "arm"}],
+        [{"action": "arm", "sectors": []}],
+        [{"action": "turn_on", "sectors": [1]}],
+        [{"action": "exclude", "output": 1}],
+    ],
+)
+def test_service_run_sequence_invalid_steps(steps):
+    # Ensure invalid steps are rejected before reaching the device
+    with pytest.raises(vol.Invalid):
+        services.RUN_SEQUENCE_SCHEMA({"code": "1234", "steps": steps})
+
+
+async def test_service_profile(hass, config_entry, alarm_device, coordinator, mocker, tmp_path):
+    # Ensure `profile` collects statistics of the next update cycles and writes them to the config folder
+    mocker.patch.object(hass.config, "config_dir", str(tmp_path))
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    data = services.PROFILE_SCHEMA({"cycles": 3, "top": 5})
+    call = ServiceCall(hass=hass, domain=DOMAIN, service="profile", data=data)
+    # Cycles without changes (long-polling only) are mixed with a full update
+    mocker.patch.object(
+        alarm_device,
+        "has_updates",
+        side_effect=[{"has_changes": False}, {"has_changes": True}, {"has_changes": False}],
+    )
+    # Test
+    task = hass.async_create_task(services.profile(hass, call))
+    await asyncio.sleep(0)
+    for _ in range(3):
+        await coordinator._async_update_data()
+    response = await task
+    assert response["cycles"] == 3
+    assert response["calls"] == 1
+    assert response["path"] == str(tmp_path / f"{DOMAIN}_profile_{config_entry.entry_id}.pstats")
+    assert (tmp_path / f"{DOMAIN}_profile_{config_entry.entry_id}.pstats").exists()
+    assert len(response["top"]) == 5
+    assert alarm_device.profiler is None
+
+
+async def test_service_profile_timeout(hass, config_entry, alarm_device, coordinator, mocker, tmp_path):
+    # Ensure `profile` stops after the timeout, returning the statistics collected so far
+    mocker.patch.object(hass.config, "config_dir", str(tmp_path))
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(hass=hass, domain=DOMAIN, service="profile", data={"cycles": 1, "top": 5, "timeout": 0.01})
+    # Test
+    response = await services.profile(hass, call)
+    assert response["cycles"] == 0
+    assert response["calls"] == 0
+    assert response["path"] is None
+    assert alarm_device.profiler is None
+
+
+async def test_service_profile_already_running(hass, config_entry, alarm_device, coordinator):
+    # Ensure only one profiling session runs at a time
+    alarm_device.profiler = CycleProfiler(1)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "device": alarm_device,
+        "coordinator": coordinator,
+    }
+    call = ServiceCall(hass=hass, domain=DOMAIN, service="profile", data=services.PROFILE_SCHEMA({}))
+    # Test
+    with pytest.raises(HomeAssistantError):
+        await services.profile(hass, call)
+
+
+def test_profile_schema_defaults():
+    # Ensure the `profile` service has sensible defaults and bounds
+    assert services.PROFILE_SCHEMA({}) == {"cycles": 3, "top": 20, "timeout": 300}
+    with pytest.raises(vol.Invalid):
+        services.PROFILE_SCHEMA({"cycles": 0})
@@ -0,0 +1,36 @@
+from elmo import query as q
+from homeassistant.components.alarm_control_panel import AlarmControlPanelState
+
+# Operations run by the stress test, and the number of concurrent callers
+OPERATIONS = 300
+CONCURRENCY = 8
+# Upper bound (in seconds) of the slowest operations, including commands waiting for the system lock
+P99_LATENCY_BUDGET = 2.0
+
+
+async def test_stress_concurrent_operations(stress):
+    # Ensure concurrent commands, refreshes and token expiries leave the integration aligned with the backend
+    report = await stress.run(operations=OPERATIONS, concurrency=CONCURRENCY)
+    await stress.settle()
+    device, backend = stress.device, stress.backend
+    # Long-polling cursors match the backend, so no change is reported twice or skipped
+    for query in (q.SECTORS, q.INPUTS, q.OUTPUTS, q.ALERTS):
+        assert device._last_ids[query] == backend.last_ids[query]
+    # No lost updates: the inventory and the statuses shown by entities match the backend
+    for query in (q.SECTORS, q.INPUTS, q.OUTPUTS):
+        for item_id, item in device.items(query):
+            assert item["status"] == backend.status[query][item["element"]]
+            assert device.get_status(query, item_id) == backend.status[query][item["element"]]
+    # The alarm state is computed from the sectors armed in the backend
+    expected = AlarmControlPanelState.ARMED_AWAY if any(backend.status[q.SECTORS].values()) else "disarmed"
+    assert device.get_state() == expected
+    assert device.state == expected
+    assert stress.coordinator._output_commands == []
+    assert stress.coordinator._update_flight is None
+    assert report.operations == OPERATIONS
+    assert report.percentile(0.99) < P99_LATENCY_BUDGET
+    # All kinds of operations ran, and only switch commands can fail (e.g. with an expired token)
+    assert set(report.latencies) == set(stress.operations)
+    assert set(report.errors) <= {"switch_turn_on", "switch_turn_off"}
+    assert report.elapsed > 0
+    assert report.throughput > 0
@@ -1,9 +1,11 @@
 import logging
 
 import pytest
+from elmo import query as q
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from custom_components.econnect_metronet.const import DOMAIN
+from custom_components.econnect_metronet.helpers import EntityFactory
 from custom_components.econnect_metronet.switch import OutputSwitch, async_setup_entry
 
 
@@ -59,7 +61,15 @@ class TestOutputSwitch:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = OutputSwitch("test_id", 1, config_entry, "Output 2", coordinator, alarm_device)
+        entity = OutputSwitch(
+            "test_id",
+            1,
+            config_entry,
+            "Output 2",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.name == "Output 2"
 
     def test_switch_name_with_system_name(self, hass, config_entry, alarm_device):
@@ -68,7 +78,15 @@ class TestOutputSwitch:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = OutputSwitch("test_id", 1, config_entry, "Output 2", coordinator, alarm_device)
+        entity = OutputSwitch(
+            "test_id",
+            1,
+            config_entry,
+            "Output 2",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.name == "Output 2"
 
     def test_switch_entity_id(self, hass, config_entry, alarm_device):
@@ -76,7 +94,15 @@ class TestOutputSwitch:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = OutputSwitch("test_id", 1, config_entry, "Output 2", coordinator, alarm_device)
+        entity = OutputSwitch(
+            "test_id",
+            1,
+            config_entry,
+            "Output 2",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_test_user_output_2"
 
     def test_switch_entity_id_with_system_name(self, hass, config_entry, alarm_device):
@@ -85,7 +111,15 @@ class TestOutputSwitch:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = OutputSwitch("test_id", 1, config_entry, "Output 2", coordinator, alarm_device)
+        entity = OutputSwitch(
+            "test_id",
+            1,
+            config_entry,
+            "Output 2",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.entity_id == "econnect_metronet.econnect_metronet_home_output_2"
 
     def test_switch_unique_id(self, hass, config_entry, alarm_device):
@@ -93,7 +127,15 @@ class TestOutputSwitch:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = OutputSwitch("test_id", 1, config_entry, "Output 2", coordinator, alarm_device)
+        entity = OutputSwitch(
+            "test_id",
+            1,
+            config_entry,
+            "Output 2",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.unique_id == "test_id"
 
     def test_switch_icon(self, hass, config_entry, alarm_device):
@@ -101,7 +143,15 @@ class TestOutputSwitch:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = OutputSwitch("test_id", 1, config_entry, "Output 2", coordinator, alarm_device)
+        entity = OutputSwitch(
+            "test_id",
+            1,
+            config_entry,
+            "Output 2",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.icon == "hass:toggle-switch-variant"
 
     def test_switch_is_off(self, hass, config_entry, alarm_device):
@@ -109,7 +159,15 @@ class TestOutputSwitch:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = OutputSwitch("test_id", 2, config_entry, "Output 3", coordinator, alarm_device)
+        entity = OutputSwitch(
+            "test_id",
+            2,
+            config_entry,
+            "Output 3",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is False
 
     def test_switch_is_on(self, hass, config_entry, alarm_device):
@@ -117,5 +175,70 @@ class TestOutputSwitch:
         coordinator = DataUpdateCoordinator(
             hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
         )
-        entity = OutputSwitch("test_id", 1, config_entry, "Output 1", coordinator, alarm_device)
+        entity = OutputSwitch(
+            "test_id",
+            1,
+            config_entry,
+            "Output 1",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
         assert entity.is_on is True
+
+    async def test_switch_turn_on(self, coordinator, config_entry, alarm_device, mocker):
+        # Ensure the switch sends the command through the coordinator queue
+        send_output = mocker.patch.object(coordinator, "async_send_output", return_value=True)
+        entity = OutputSwitch(
+            "test_id",
+            0,
+            config_entry,
+            "Output 1",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
+        write_state = mocker.patch.object(entity, "async_write_ha_state")
+        # Test
+        await entity.async_turn_on()
+        assert write_state.call_count == 1
+        send_output.assert_called_once_with(0, True)
+
+    async def test_switch_turn_off(self, coordinator, config_entry, alarm_device, mocker):
+        # Ensure the switch sends the command through the coordinator queue
+        send_output = mocker.patch.object(coordinator, "async_send_output", return_value=True)
+        entity = OutputSwitch(
+            "test_id",
+            0,
+            config_entry,
+            "Output 1",
+            coordinator,
+            alarm_device,
+            EntityFactory(config_entry, coordinator, alarm_device),
+        )
+        write_state = mocker.patch.object(entity, "async_write_ha_state")
+        # Test
+        await entity.async_turn_off()
+        assert write_state.call_count == 1
+        send_output.assert_called_once_with(0, False)
+
+
+def test_switch_unavailable_when_stale(hass, config_entry, alarm_device):
+    # Ensure the switch is unavailable when outputs data is stale
+    coordinator = DataUpdateCoordinator(
+        hass, logging.getLogger(__name__), config_entry=config_entry, name="econnect_metronet"
+    )
+    entity = OutputSwitch(
+        "test_id",
+        1,
+        config_entry,
+        "Output 2",
+        coordinator,
+        alarm_device,
+        EntityFactory(config_entry, coordinator, alarm_device),
+    )
+    alarm_device.set_stale_ttl({"stale_state_ttl": 60})
+    assert entity.available is True
+    # Test
+    alarm_device._confirmed_at[q.OUTPUTS] -= 120
+    assert entity.available is False
@@ -0,0 +1,202 @@
+import json
+
+import pytest
+from elmo import query as q
+from elmo.api.exceptions import CodeError, DeviceDisconnectedError
+from requests.exceptions import HTTPError
+from requests.models import Response
+
+from custom_components.econnect_metronet.devices import AlarmDevice
+from custom_components.econnect_metronet.traffic import (
+    REDACTED,
+    TrafficRecorder,
+    TrafficReplay,
+)
+
+from .helpers import _
+
+
+def _read(path):
+    with open(path) as traffic:
+        return [json.loads(line) for line in traffic]
+
+
+class TestTrafficRecorder:
+    def test_record_query(self, client, tmp_path):
+        # Ensure a call is recorded with its arguments, result and duration
+        path = tmp_path / "traffic.jsonl"
+        recorder = TrafficRecorder(client, path)
+        client._session_id = "test_token"
+        # Test
+        result = recorder.query(q.SECTORS)
+        entries = _read(path)
+        assert len(entries) == 1
+        assert entries[0]["method"] == "query"
+        assert entries[0]["args"] == [q.SECTORS]
+        assert entries[0]["result"]["last_id"] == result["last_id"]
+        assert entries[0]["duration"] >= 0
+        assert entries[0]["offset"] >= 0
+
+    def test_record_redacts_credentials(self, client, tmp_path):
+        # Ensure credentials and access tokens are never stored
+        path = tmp_path / "traffic.jsonl"
+        recorder = TrafficRecorder(client, path)
+        # Test
+        recorder.auth("test_user", "test_password")
+        with recorder.lock("123456", "1"):
+            pass
+        entries = _read(path)
+        assert entries[0]["args"] == [REDACTED, REDACTED]
+        assert entries[0]["result"] == REDACTED
+        assert entries[1]["method"] == "lock"
+        assert entries[1]["args"] == [REDACTED, REDACTED]
+        assert "test_password" not in path.read_text()
+        assert "123456" not in path.read_text()
+
+    def test_record_error(self, client, tmp_path, mocker):
+        # Ensure exceptions are recorded and raised to the caller
+        path = tmp_path / "traffic.jsonl"
+        recorder = TrafficRecorder(client, path)
+        mocker.patch.object(client, "poll").side_effect = DeviceDisconnectedError()
+        # Test
+        with pytest.raises(DeviceDisconnectedError):
+            recorder.poll({q.SECTORS: 1})
+        entries = _read(path)
+        assert entries[0]["error"]["type"] == "DeviceDisconnectedError"
+        assert "result" not in entries[0]
+
+    def test_record_lock_error(self, client, tmp_path, mocker):
+        # Ensure a failed lock acquisition is recorded
+        path = tmp_path / "traffic.jsonl"
+        recorder = TrafficRecorder(client, path)
+        mocker.patch.object(client, "lock").side_effect = CodeError()
+        # Test
+        with pytest.raises(CodeError):
+            with recorder.lock("123456"):
+                pass
+        assert _read(path)[0]["error"]["type"] == "CodeError"
+
+    def test_delegates_attributes(self, client, tmp_path):
+        # Ensure attributes that are not recorded are read from the wrapped client
+        recorder = TrafficRecorder(client, tmp_path / "traffic.jsonl")
+        client._session_id = "test_token"
+        # Test
+        assert recorder._session_id == "test_token"
+
+
+class TestTrafficReplay:
+    def test_replay_results(self, client, tmp_path):
+        # Ensure recorded results are played back with the original types
+        path = tmp_path / "traffic.jsonl"
+        recorder = TrafficRecorder(client, path)
+        recorder.auth("test_user", "test_password")
+        sectors = recorder.query(q.SECTORS)
+        inputs = recorder.query(q.INPUTS)
+        replay = TrafficReplay(path, speed=0)
+        # Test
+        replay.auth("test_user", "test_password")
+        assert replay.query(q.INPUTS) == inputs
+        assert replay.query(q.SECTORS) == sectors
+
+    def test_replay_error(self, tmp_path):
+        # Ensure recorded exceptions are raised again, including the HTTP response
+        path = tmp_path / "traffic.jsonl"
+        entry = {
+            "offset": 0,
+            "duration": 0,
+            "method": "poll",
+            "args": [{}],
+            "error": {"type": "HTTPError", "message": "500", "status_code": 500, "text": "Server Error"},
+        }
+        path.write_text(json.dumps(entry) + "\n")
+        replay = TrafficReplay(path, speed=0)
+        # Test
+        with pytest.raises(HTTPError) as err:
+            replay.poll({})
+        assert err.value.response.status_code == 500
+        assert err.value.response.text == "Server Error"
+
+    def test_replay_library_error(self, tmp_path, client, mocker):
+        # Ensure library exceptions are raised with their original type
+        path = tmp_path / "traffic.jsonl"
+        recorder = TrafficRecorder(client, path)
+        mocker.patch.object(client, "lock").side_effect = CodeError()
+        with pytest.raises(CodeError):
+            with recorder.lock("123456"):
+                pass
+        replay = TrafficReplay(path, speed=0)
+        # Test
+        with pytest.raises(CodeError):
+            with replay.lock("123456"):
+                pass
+
+    def test_replay_speed(self, tmp_path, mocker):
+        # Ensure recorded durations are scaled by the replay speed
+        path = tmp_path / "traffic.jsonl"
+        entry = {"offset": 0, "duration": 2.0, "method": "turn_on", "args": [1], "result": True}
+        path.write_text(json.dumps(entry) + "\n")
+        sleep = mocker.patch(_("traffic.time.sleep"))
+        replay = TrafficReplay(path, speed=4)
+        # Test
+        assert replay.turn_on(1) is True
+        sleep.assert_called_once_with(0.5)
+
+    def test_replay_exhausted(self, tmp_path):
+        # Ensure an error is raised when the recorded traffic is over
+        path = tmp_path / "traffic.jsonl"
+        path.write_text("")
+        replay = TrafficReplay(path, speed=0)
+        # Test
+        with pytest.raises(IndexError):
+            replay.query(q.SECTORS)
+
+    def test_replay_device_update(self, client, tmp_path):
+        # Ensure `AlarmDevice` can use the replay connector in place of `ElmoClient`
+        path = tmp_path / "traffic.jsonl"
+        recorded = AlarmDevice(TrafficRecorder(client, path))
+        recorded.connect("test_user", "test_password")
+        recorded.update()
+        device = AlarmDevice(TrafficReplay(path, speed=0))
+        # Test
+        device.connect("test_user", "test_password")
+        device.update()
+        assert device._inventory == recorded._inventory
+        assert device._last_ids == recorded._last_ids
+        assert device.state == recorded.state
+
+    def test_replay_device_arm(self, client, tmp_path):
+        # Ensure commands sent with keyword arguments are recorded and played back
+        path = tmp_path / "traffic.jsonl"
+        recorded = AlarmDevice(TrafficRecorder(client, path))
+        recorded.connect("test_user", "test_password")
+        recorded.update()
+        recorded.arm("1234", sectors=[1])
+        entries = _read(path)
+        assert entries[-1]["method"] == "arm"
+        assert entries[-1]["kwargs"] == {"sectors": [1]}
+        device = AlarmDevice(TrafficReplay(path, speed=0))
+        device.connect("test_user", "test_password")
+        device.update()
+        # Test
+        device.arm("1234", sectors=[1])
+        replay = TrafficReplay(path, speed=0)
+        with pytest.raises(IndexError):
+            replay.arm(sectors=[2])
+        assert replay.arm(sectors=[1]) == entries[-1]["result"]
+
+
+def test_http_error_response_roundtrip(client, tmp_path, mocker):
+    # Ensure HTTP errors keep the response text used in device logs
+    path = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(client, path)
+    response = Response()
+    response.status_code = 403
+    response._content = b"Forbidden"
+    mocker.patch.object(client, "query").side_effect = HTTPError(response=response)
+    with pytest.raises(HTTPError):
+        recorder.query(q.SECTORS)
+    replay = TrafficReplay(path, speed=0)
+    # Test
+    with pytest.raises(HTTPError) as err:
+        replay.query(q.SECTORS)
+    assert err.value.response.text == "Forbidden"
@@ -0,0 +1,43 @@
+import pytest
+from homeassistant.setup import async_setup_component
+
+from custom_components.econnect_metronet import async_setup
+from custom_components.econnect_metronet.const import DOMAIN
+
+
+@pytest.fixture
+async def http(hass, config_entry, alarm_device, coordinator):
+    """Set up the HTTP server, then the integration so that views are registered."""
+    await async_setup_component(hass, "http", {})
+    await async_setup(hass, {})
+    hass.data[DOMAIN][config_entry.entry_id] = {"device": alarm_device, "coordinator": coordinator}
+
+
+async def test_metrics_view(http, hass_client, config_entry, alarm_device):
+    # Ensure metrics of all config entries are exported in the Prometheus text format
+    alarm_device.metrics.inc("econnect_metronet_disconnections_total")
+    client = await hass_client()
+    # Test
+    response = await client.get(f"/api/{DOMAIN}/metrics")
+    assert response.status == 200
+    assert response.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+    body = await response.text()
+    assert f'econnect_metronet_disconnections_total{{entry_id="{config_entry.entry_id}"}} 1' in body
+    assert "# TYPE econnect_metronet_inventory_items gauge" in body
+
+
+async def test_metrics_view_requires_auth(http, hass_client_no_auth):
+    # Ensure metrics are not exported without authentication
+    client = await hass_client_no_auth()
+    # Test
+    response = await client.get(f"/api/{DOMAIN}/metrics")
+    assert response.status == 401
+
+
+async def test_metrics_view_requires_admin(http, hass_client, hass_admin_user):
+    # Ensure metrics are exported only to administrators
+    hass_admin_user.groups = []
+    client = await hass_client()
+    # Test
+    response = await client.get(f"/api/{DOMAIN}/metrics")
+    assert response.status == 401